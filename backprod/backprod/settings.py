@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 from datetime import timedelta
 
@@ -44,6 +45,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'produccion.middleware.IdCorrelacionMiddleware',
+    'produccion.middleware.InstrumentacionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -81,11 +84,25 @@ WSGI_APPLICATION = 'backprod.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'chocolateria_test',
-        'USER': 'postgres',
-        'PASSWORD': 'naxo21',
-        'HOST': 'localhost',
-        'PORT': '5432',
+        'NAME': os.environ.get('PRODUCCION_DB_NOMBRE', 'chocolateria_test'),
+        'USER': os.environ.get('PRODUCCION_DB_USUARIO', 'postgres'),
+        'PASSWORD': os.environ.get('PRODUCCION_DB_CLAVE', 'naxo21'),
+        'HOST': os.environ.get('PRODUCCION_DB_HOST', 'localhost'),
+        'PORT': os.environ.get('PRODUCCION_DB_PUERTO', '5432'),
+        # Conexiones persistentes: cada worker reutiliza su conexión hasta
+        # CONN_MAX_AGE segundos y la verifica antes de reusarla. Por defecto
+        # 0 (una por petición), porque la app también se sirve por ASGI
+        # (stream de tiempo real) y ahí las conexiones no se reutilizan y
+        # quedarían abiertas. En despliegues WSGI (gunicorn sync) subirlo,
+        # p. ej. PRODUCCION_DB_CONN_MAX_AGE=60; bajo ASGI usar PgBouncer
+        'CONN_MAX_AGE': int(os.environ.get('PRODUCCION_DB_CONN_MAX_AGE', '0')),
+        'CONN_HEALTH_CHECKS': os.environ.get('PRODUCCION_DB_HEALTH_CHECKS', '1') == '1',
+        # Detrás de PgBouncer en modo transacción los cursores del servidor
+        # (exportaciones con .iterator()) no sobreviven entre transacciones
+        'DISABLE_SERVER_SIDE_CURSORS': os.environ.get('PRODUCCION_DB_PGBOUNCER', '0') == '1',
+        'OPTIONS': {
+            'connect_timeout': int(os.environ.get('PRODUCCION_DB_TIMEOUT_CONEXION', '5')),
+        },
     }
 }
 
@@ -228,8 +245,11 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    'x-request-id',
 ]
 
+CORS_EXPOSE_HEADERS = ['x-request-id']
+
 
 # ============================================================================
 # FILE UPLOAD SETTINGS
@@ -243,3 +263,71 @@ ALLOWED_IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.webp']
 
 # Tamaño máximo de Excel para colaboradores (5MB)
 MAX_EXCEL_SIZE = 5242880  # 5MB en bytes
+
+# Las importaciones de colaboradores se encolan en la base de datos. Con True
+# se procesan en un hilo del mismo proceso web; con False se deja el trabajo
+# al comando `python manage.py procesar_importaciones`
+IMPORTACIONES_EN_SEGUNDO_PLANO = True
+
+# Reparto de eventos en tiempo real (/api/tiempo-real/):
+# 'local' = sólo dentro del proceso; 'postgres' = LISTEN/NOTIFY entre workers
+TIEMPO_REAL_BACKEND = 'local'
+
+
+# ============================================================================
+# LOGGING
+# ============================================================================
+# Logs de la app en JSON (una línea por registro) con el id de correlación de
+# la petición. PRODUCCION_LOG_LEVEL=DEBUG activa el volcado de payloads, que
+# además se muestrea con LOG_MUESTREO_PAYLOADS (fracción de peticiones).
+# PRODUCCION_LOG_FORMATO=texto deja una salida legible para desarrollo
+LOG_MUESTREO_PAYLOADS = float(os.environ.get('PRODUCCION_LOG_MUESTREO', '0.1'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'id_correlacion': {
+            '()': 'produccion.registro.IdCorrelacionFilter',
+        },
+    },
+    'formatters': {
+        'json': {
+            '()': 'produccion.registro.FormatoJSON',
+        },
+        'texto': {
+            'format': '%(asctime)s %(levelname)s [%(id_correlacion)s] %(name)s: %(message)s',
+        },
+    },
+    'handlers': {
+        'consola': {
+            'class': 'logging.StreamHandler',
+            'filters': ['id_correlacion'],
+            'formatter': os.environ.get('PRODUCCION_LOG_FORMATO', 'json'),
+        },
+    },
+    'loggers': {
+        'produccion': {
+            'handlers': ['consola'],
+            'level': os.environ.get('PRODUCCION_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
+
+# ============================================================================
+# INSTRUMENTACIÓN (produccion.middleware.InstrumentacionMiddleware)
+# ============================================================================
+# Consultas, tiempo SQL, serialización y render por petición en la cabecera
+# Server-Timing. Las peticiones más lentas que el umbral se registran con
+# sus SQL más repetidas (logger produccion.instrumentacion)
+INSTRUMENTACION_ACTIVA = os.environ.get('PRODUCCION_INSTRUMENTACION', '1') == '1'
+INSTRUMENTACION_SERVER_TIMING = True
+INSTRUMENTACION_UMBRAL_LENTO_MS = int(os.environ.get('PRODUCCION_UMBRAL_LENTO_MS', '1000'))
+
+# Métricas en /metrics (formato Prometheus). Si hay token, el scraper debe
+# mandar 'Authorization: Bearer <token>'. Los indicadores de planta se
+# recalculan como mucho cada METRICAS_SEGUNDOS_CACHE segundos por proceso
+METRICAS_TOKEN = os.environ.get('PRODUCCION_METRICAS_TOKEN', '')
+METRICAS_SEGUNDOS_CACHE = 30
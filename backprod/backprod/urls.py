@@ -19,9 +19,12 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from produccion.views import metricas
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('produccion.urls')),
+    path('metrics', metricas, name='metricas'),
 ]
 
 # Servir archivos media en desarrollo
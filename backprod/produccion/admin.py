@@ -2,6 +2,8 @@
 
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.db.models import Count, DecimalField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
 from django.utils.html import format_html
 from .models import (
     Usuario, Linea, Turno, Colaborador, 
@@ -9,7 +11,8 @@ from .models import (
     Tarea, TareaColaborador, Maquina, TipoEvento,
     HojaProcesos, EventoProceso, EventoMaquina,
     Trazabilidad, TrazabilidadMateriaPrima,
-    Reproceso, Merma, FirmaTrazabilidad, TrazabilidadColaborador
+    Reproceso, Merma, FirmaTrazabilidad, TrazabilidadColaborador,
+    ImportacionColaboradores, OperacionSincronizada, ResumenProduccionDiario
 )
 
 
@@ -96,6 +99,25 @@ class ColaboradorAdmin(admin.ModelAdmin):
     readonly_fields = ['fecha_carga', 'fecha_actualizacion']
 
 
+# ============================================================================
+# ADMIN: Importación de Colaboradores
+# ============================================================================
+@admin.register(ImportacionColaboradores)
+class ImportacionColaboradoresAdmin(admin.ModelAdmin):
+    list_display = [
+        'id', 'estado', 'usuario', 'filas_procesadas', 'creados',
+        'actualizados', 'desactivados', 'total_errores', 'fecha_creacion'
+    ]
+    list_filter = ['estado', 'fecha_creacion']
+    ordering = ['-fecha_creacion']
+    
+    readonly_fields = [
+        'total_filas', 'filas_procesadas', 'creados', 'actualizados',
+        'desactivados', 'total_errores', 'errores', 'mensaje_error',
+        'fecha_creacion', 'fecha_inicio', 'fecha_finalizacion', 'fecha_actualizacion'
+    ]
+
+
 # ============================================================================
 # ADMIN: Producto
 # ============================================================================
@@ -108,7 +130,7 @@ class ProductoAdmin(admin.ModelAdmin):
     
     fieldsets = (
         ('Información del Producto', {
-            'fields': ('codigo', 'nombre', 'unidad_medida', 'activo')
+            'fields': ('codigo', 'nombre', 'unidad_medida', 'unidades_por_hora', 'activo')
         }),
         ('Descripción', {
             'fields': ('descripcion',),
@@ -532,6 +554,28 @@ class MermaAdmin(admin.ModelAdmin):
 # ============================================================================
 # ADMIN: TrazabilidadMateriaPrima (Inline para Trazabilidad)
 # ============================================================================
+def con_totales_calidad(queryset):
+    """
+    Anota cantidad de registros y total de reprocesos y mermas de cada
+    materia prima usada con subconsultas, en vez de sumar en Python por fila.
+    """
+    anotaciones = {}
+    for modelo, nombre in ((Reproceso, 'reprocesos'), (Merma, 'mermas')):
+        por_mp = (
+            modelo.objects
+            .filter(trazabilidad_materia_prima=OuterRef('pk'))
+            .values('trazabilidad_materia_prima')
+        )
+        anotaciones[f'{nombre}_count'] = Coalesce(
+            Subquery(por_mp.annotate(n=Count('id')).values('n')), 0
+        )
+        anotaciones[f'{nombre}_total'] = Subquery(
+            por_mp.annotate(t=Sum('cantidad')).values('t'),
+            output_field=DecimalField(max_digits=12, decimal_places=2)
+        )
+    return queryset.annotate(**anotaciones)
+
+
 class TrazabilidadMateriaPrimaInline(admin.TabularInline):
     model = TrazabilidadMateriaPrima
     extra = 1
@@ -545,31 +589,26 @@ class TrazabilidadMateriaPrimaInline(admin.TabularInline):
     ]
     readonly_fields = ['get_reprocesos_count', 'get_mermas_count']
     
+    def get_queryset(self, request):
+        return con_totales_calidad(super().get_queryset(request).select_related('materia_prima'))
+    
     def get_reprocesos_count(self, obj):
-        if obj.pk:
-            count = obj.reprocesos.count()
-            if count > 0:
-                total = sum(r.cantidad for r in obj.reprocesos.all())
-                return format_html(
-                    '<span style="color: orange; font-weight: bold;"> {} ({} total)</span>',
-                    count,
-                    total
-                )
-            return '-'
+        if obj.pk and getattr(obj, 'reprocesos_count', 0):
+            return format_html(
+                '<span style="color: orange; font-weight: bold;"> {} ({} total)</span>',
+                obj.reprocesos_count,
+                obj.reprocesos_total
+            )
         return '-'
     get_reprocesos_count.short_description = 'Reprocesos'
     
     def get_mermas_count(self, obj):
-        if obj.pk:
-            count = obj.mermas.count()
-            if count > 0:
-                total = sum(m.cantidad for m in obj.mermas.all())
-                return format_html(
-                    '<span style="color: red; font-weight: bold;"> {} ({} total)</span>',
-                    count,
-                    total
-                )
-            return '-'
+        if obj.pk and getattr(obj, 'mermas_count', 0):
+            return format_html(
+                '<span style="color: red; font-weight: bold;"> {} ({} total)</span>',
+                obj.mermas_count,
+                obj.mermas_total
+            )
         return '-'
     get_mermas_count.short_description = 'Mermas'
     
@@ -592,27 +631,33 @@ class TrazabilidadMateriaPrimaAdmin(admin.ModelAdmin):
     search_fields = ['materia_prima__nombre', 'lote']
     inlines = [ReprocesoInline, MermaInline]
     
+    def get_queryset(self, request):
+        return con_totales_calidad(
+            super().get_queryset(request).select_related(
+                'materia_prima',
+                'trazabilidad__hoja_procesos__tarea__linea',
+                'trazabilidad__hoja_procesos__tarea__turno',
+                'trazabilidad__hoja_procesos__tarea__producto',
+            )
+        )
+    
     def get_reprocesos_info(self, obj):
-        count = obj.reprocesos.count()
-        if count > 0:
-            total = sum(r.cantidad for r in obj.reprocesos.all())
+        if obj.reprocesos_count > 0:
             return format_html(
                 '<span style="color: orange; font-weight: bold;"> {} reprocesos ({} {})</span>',
-                count,
-                total,
+                obj.reprocesos_count,
+                obj.reprocesos_total,
                 obj.unidad_medida
             )
         return '-'
     get_reprocesos_info.short_description = 'Reprocesos'
     
     def get_mermas_info(self, obj):
-        count = obj.mermas.count()
-        if count > 0:
-            total = sum(m.cantidad for m in obj.mermas.all())
+        if obj.mermas_count > 0:
             return format_html(
                 '<span style="color: red; font-weight: bold;"> {} mermas ({} {})</span>',
-                count,
-                total,
+                obj.mermas_count,
+                obj.mermas_total,
                 obj.unidad_medida
             )
         return '-'
@@ -747,3 +792,35 @@ class TrazabilidadAdmin(admin.ModelAdmin):
         return "Sin foto"
     preview_foto_etiquetas.short_description = 'Vista Previa de Foto'
 
+
+# ============================================================================
+# ADMIN: Operaciones sincronizadas desde tablets
+# ============================================================================
+@admin.register(OperacionSincronizada)
+class OperacionSincronizadaAdmin(admin.ModelAdmin):
+    list_display = ['clave', 'tipo', 'accion', 'objeto_id', 'fecha_creacion']
+    list_filter = ['tipo', 'accion', 'fecha_creacion']
+    search_fields = ['clave']
+    ordering = ['-fecha_creacion']
+    readonly_fields = ['clave', 'tipo', 'accion', 'objeto_id', 'resultado', 'fecha_creacion']
+
+
+# ============================================================================
+# ADMIN: Resumen de producción diario (se recalcula solo)
+# ============================================================================
+@admin.register(ResumenProduccionDiario)
+class ResumenProduccionDiarioAdmin(admin.ModelAdmin):
+    list_display = [
+        'fecha', 'linea', 'turno', 'producto', 'trazabilidades',
+        'cantidad_producida', 'meta_produccion', 'merma_kg', 'reproceso_kg',
+    ]
+    list_filter = ['fecha', 'linea', 'turno']
+    list_select_related = ['linea', 'turno', 'producto']
+    date_hierarchy = 'fecha'
+    ordering = ['-fecha']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,409 @@
+from datetime import timedelta
+
+from django.db.models import (
+    Count, DateTimeField, DurationField, ExpressionWrapper, F, Sum,
+)
+from django.db.models.functions import Coalesce, Now, TruncWeek
+
+from .models import Tarea, EventoProceso, TrazabilidadMateriaPrima, Merma, Reproceso
+
+
+# Tipos de evento que cuentan como tiempo productivo
+CODIGOS_PRODUCCION = ['PRODUCCION']
+
+# Pausas planificadas: no son tiempo disponible ni paradas
+CODIGOS_PAUSA_PLANIFICADA = ['COLACION']
+
+# Tareas que entran al cálculo (las pendientes no han usado la línea)
+ESTADOS_CON_PRODUCCION = ['en_curso', 'finalizada']
+
+# Dimensiones de agrupación: nombre -> (id, nombre) relativos a Tarea
+AGRUPACIONES = {
+    'linea': ('linea_id', 'linea__nombre'),
+    'turno': ('turno_id', 'turno__nombre'),
+    'producto': ('producto_id', 'producto__nombre'),
+}
+
+# Ruta desde EventoProceso hasta su Tarea
+PREFIJO_TAREA = 'hoja_procesos__tarea__'
+
+# Tasa ideal (unidades por hora) del producto, relativa a Tarea
+CAMPO_TASA_IDEAL = 'producto__unidades_por_hora'
+
+
+# ============================================================================
+# EXPRESIONES
+# ============================================================================
+def duracion_evento():
+    """
+    Duración de un evento. Los eventos abiertos (sin hora_fin) terminan al
+    cerrar la hoja o la tarea; si siguen en curso, ahora.
+    """
+    fin = Coalesce(
+        'hora_fin',
+        'hoja_procesos__fecha_finalizacion',
+        'hoja_procesos__tarea__fecha_finalizacion',
+        Now(),
+        output_field=DateTimeField()
+    )
+    return ExpressionWrapper(fin - F('hora_inicio'), output_field=DurationField())
+
+
+def _minutos(duracion):
+    return round(duracion.total_seconds() / 60, 1) if duracion else 0.0
+
+
+def _razon(numerador, denominador):
+    return round(numerador / denominador, 4) if denominador else None
+
+
+def _redondear(valor):
+    return round(valor, 4) if valor is not None else None
+
+
+def indicadores(planificado, operacion, ideal, sin_tasa_ideal, meta, producida):
+    """
+    OEE = disponibilidad x rendimiento x calidad:
+
+    - disponibilidad = tiempo en PRODUCCION / tiempo disponible (todo lo
+      registrado menos pausas planificadas)
+    - rendimiento = producido / `ideal`, lo que se habría producido a la tasa
+      ideal del producto (Producto.unidades_por_hora) en el tiempo en PRODUCCION
+    - calidad = 1: no hay registro de unidades defectuosas de producto terminado
+
+    Si algún producto del grupo no tiene tasa ideal, rendimiento y OEE quedan
+    en None con `sin_tasa_ideal`; no se deducen de la meta. El avance contra
+    la meta va aparte, en `cumplimiento_meta`.
+    """
+    planificado = planificado or timedelta(0)
+    operacion = operacion or timedelta(0)
+    producida = producida or 0
+
+    disponibilidad = operacion / planificado if planificado else None
+    rendimiento = producida / ideal if ideal and not sin_tasa_ideal else None
+    calidad = 1
+    oee = (
+        disponibilidad * rendimiento * calidad
+        if None not in (disponibilidad, rendimiento) else None
+    )
+
+    return {
+        'minutos_disponibles': _minutos(planificado),
+        'minutos_produccion': _minutos(operacion),
+        'minutos_parada': _minutos(planificado - operacion),
+        'meta': meta or 0,
+        'producida': producida,
+        'producida_ideal': round(ideal, 1),
+        'sin_tasa_ideal': sin_tasa_ideal,
+        'disponibilidad': _redondear(disponibilidad),
+        'rendimiento': _redondear(rendimiento),
+        'calidad': calidad,
+        'oee': _redondear(oee),
+        'cumplimiento_meta': _razon(producida, meta),
+    }
+
+
+# ============================================================================
+# CONSULTAS
+# ============================================================================
+def tareas_del_periodo(desde, hasta, filtros=None):
+    return Tarea.objects.filter(
+        fecha__gte=desde,
+        fecha__lte=hasta,
+        estado__in=ESTADOS_CON_PRODUCCION,
+        **(filtros or {})
+    )
+
+
+def eventos_del_periodo(desde, hasta, filtros=None):
+    return EventoProceso.objects.filter(
+        **{f'{PREFIJO_TAREA}fecha__gte': desde},
+        **{f'{PREFIJO_TAREA}fecha__lte': hasta},
+        **{f'{PREFIJO_TAREA}estado__in': ESTADOS_CON_PRODUCCION},
+        **{f'{PREFIJO_TAREA}{campo}': valor for campo, valor in (filtros or {}).items()}
+    )
+
+
+def _filas_tiempos(desde, hasta, filtros):
+    """
+    Una sola pasada sobre los eventos: duración sumada por línea, turno,
+    producto y tipo de evento. Todos los desgloses y el Pareto salen de aquí.
+    """
+    campos = [f'{PREFIJO_TAREA}{campo}' for par in AGRUPACIONES.values() for campo in par]
+    return list(
+        eventos_del_periodo(desde, hasta, filtros)
+        .values(*campos, f'{PREFIJO_TAREA}{CAMPO_TASA_IDEAL}', 'tipo_evento_id', 'tipo_evento__codigo', 'tipo_evento__nombre')
+        .annotate(duracion=Sum(duracion_evento()), eventos=Count('id'))
+        .order_by()
+    )
+
+
+def _filas_cantidades(desde, hasta, filtros):
+    """Meta y cantidad producida por línea, turno y producto"""
+    campos = [campo for par in AGRUPACIONES.values() for campo in par]
+    return list(
+        tareas_del_periodo(desde, hasta, filtros)
+        .values(*campos, CAMPO_TASA_IDEAL)
+        .annotate(
+            tareas=Count('id'),
+            meta=Sum('meta_produccion'),
+            producida=Sum('hoja_procesos__trazabilidad__cantidad_producida'),
+        )
+        .order_by()
+    )
+
+
+def oee_agrupado(filas_tiempos, filas_cantidades, agrupacion=None):
+    """
+    Suma las filas precalculadas por línea, turno o producto (o total si
+    `agrupacion` es None) y calcula los indicadores de cada grupo.
+    """
+    campos = AGRUPACIONES[agrupacion] if agrupacion else ()
+    grupos = {}
+
+    def grupo(fila, prefijo_campos):
+        clave = tuple(fila[f'{prefijo_campos}{campo}'] for campo in campos)
+        return grupos.setdefault(clave, {
+            'planificado': timedelta(0), 'operacion': timedelta(0), 'ideal': 0.0,
+            'sin_tasa_ideal': False, 'tareas': 0, 'meta': 0, 'producida': 0,
+        })
+
+    for fila in filas_tiempos:
+        actual = grupo(fila, PREFIJO_TAREA)
+        duracion = fila['duracion'] or timedelta(0)
+        if fila['tipo_evento__codigo'] not in CODIGOS_PAUSA_PLANIFICADA:
+            actual['planificado'] += duracion
+        if fila['tipo_evento__codigo'] in CODIGOS_PRODUCCION:
+            actual['operacion'] += duracion
+            tasa = fila[f'{PREFIJO_TAREA}{CAMPO_TASA_IDEAL}']
+            if tasa is None:
+                actual['sin_tasa_ideal'] = True
+            else:
+                actual['ideal'] += float(tasa) * duracion.total_seconds() / 3600
+
+    for fila in filas_cantidades:
+        actual = grupo(fila, '')
+        actual['tareas'] += fila['tareas']
+        actual['meta'] += fila['meta'] or 0
+        actual['producida'] += fila['producida'] or 0
+        if fila[CAMPO_TASA_IDEAL] is None and fila['producida']:
+            actual['sin_tasa_ideal'] = True
+
+    if not agrupacion:
+        grupos.setdefault((), {
+            'planificado': None, 'operacion': None, 'ideal': 0.0,
+            'sin_tasa_ideal': False, 'tareas': 0, 'meta': 0, 'producida': 0,
+        })
+
+    resultado = []
+    for clave in sorted(grupos, key=lambda k: [str(v) for v in k]):
+        actual = grupos[clave]
+        fila = dict(zip([agrupacion, f'{agrupacion}_nombre'], clave)) if agrupacion else {}
+        fila['tareas'] = actual['tareas']
+        fila.update(indicadores(
+            actual['planificado'], actual['operacion'], actual['ideal'],
+            actual['sin_tasa_ideal'], actual['meta'], actual['producida']
+        ))
+        resultado.append(fila)
+    return resultado
+
+
+def pareto_paradas(filas_tiempos):
+    """Minutos de parada por tipo de evento, de mayor a menor, con % acumulado"""
+    por_tipo = {}
+    for fila in filas_tiempos:
+        if fila['tipo_evento__codigo'] in CODIGOS_PRODUCCION + CODIGOS_PAUSA_PLANIFICADA:
+            continue
+        actual = por_tipo.setdefault(fila['tipo_evento_id'], {
+            'tipo_evento': fila['tipo_evento_id'],
+            'codigo': fila['tipo_evento__codigo'],
+            'nombre': fila['tipo_evento__nombre'],
+            'eventos': 0,
+            'duracion': timedelta(0),
+        })
+        actual['eventos'] += fila['eventos']
+        actual['duracion'] += fila['duracion'] or timedelta(0)
+
+    paradas = sorted(por_tipo.values(), key=lambda p: p['duracion'], reverse=True)
+    total = sum(p['duracion'].total_seconds() for p in paradas)
+    acumulado = 0
+    resultado = []
+    for parada in paradas:
+        segundos = parada.pop('duracion').total_seconds()
+        acumulado += segundos
+        resultado.append({
+            **parada,
+            'minutos': round(segundos / 60, 1),
+            'porcentaje': round(segundos * 100 / total, 1) if total else 0.0,
+            'porcentaje_acumulado': round(acumulado * 100 / total, 1) if total else 0.0,
+        })
+    return resultado
+
+
+def resumen_oee(desde, hasta, filtros=None):
+    """
+    Total, desgloses por línea/turno/producto y Pareto de paradas.
+    Dos consultas agregadas en total, sin importar el largo del rango.
+    """
+    tiempos = _filas_tiempos(desde, hasta, filtros)
+    cantidades = _filas_cantidades(desde, hasta, filtros)
+
+    return {
+        'desde': desde,
+        'hasta': hasta,
+        'total': oee_agrupado(tiempos, cantidades)[0],
+        'por_linea': oee_agrupado(tiempos, cantidades, 'linea'),
+        'por_turno': oee_agrupado(tiempos, cantidades, 'turno'),
+        'por_producto': oee_agrupado(tiempos, cantidades, 'producto'),
+        'pareto_paradas': pareto_paradas(tiempos),
+    }
+
+
+# ============================================================================
+# MERMAS Y REPROCESOS
+# ============================================================================
+# Ruta desde TrazabilidadMateriaPrima hasta su Tarea
+PREFIJO_TAREA_MP = 'trazabilidad__hoja_procesos__tarea__'
+
+# Dimensiones de agrupación: nombre -> {campo de salida: ruta desde
+# TrazabilidadMateriaPrima}. 'causa' se arma aparte porque cada modelo
+# tiene sus propias causas
+AGRUPACIONES_CALIDAD = {
+    'materia_prima': {
+        'materia_prima': 'materia_prima_id',
+        'materia_prima_codigo': 'materia_prima__codigo',
+        'materia_prima_nombre': 'materia_prima__nombre',
+    },
+    'producto': {
+        'producto': f'{PREFIJO_TAREA_MP}producto_id',
+        'producto_codigo': f'{PREFIJO_TAREA_MP}producto__codigo',
+        'producto_nombre': f'{PREFIJO_TAREA_MP}producto__nombre',
+    },
+    'linea': {
+        'linea': f'{PREFIJO_TAREA_MP}linea_id',
+        'linea_nombre': f'{PREFIJO_TAREA_MP}linea__nombre',
+    },
+    'semana': {
+        'semana': 'trazabilidad__fecha_produccion',
+    },
+}
+
+AGRUPACIONES_MERMAS = ['causa', *AGRUPACIONES_CALIDAD]
+
+# Ruta desde Merma/Reproceso hasta TrazabilidadMateriaPrima
+PREFIJO_MP = 'trazabilidad_materia_prima__'
+
+
+def _filtro_calidad(prefijo, desde, hasta, filtros):
+    """Filtro por fecha de producción y tarea, relativo a `prefijo`"""
+    return {
+        f'{prefijo}trazabilidad__fecha_produccion__range': (desde, hasta),
+        **{f'{prefijo}{PREFIJO_TAREA_MP}{campo}': valor for campo, valor in (filtros or {}).items()},
+    }
+
+
+def _agrupado(queryset, agrupacion, prefijo, **agregados):
+    """
+    values() + annotate() por los campos de `agrupacion` y la unidad de
+    medida. Los alias evitan choques con nombres de campos del modelo.
+    """
+    expresiones = {
+        f'grupo_{salida}': TruncWeek(f'{prefijo}{ruta}') if salida == 'semana' else F(f'{prefijo}{ruta}')
+        for salida, ruta in AGRUPACIONES_CALIDAD[agrupacion].items()
+    }
+    expresiones['grupo_unidad_medida'] = F(f'{prefijo}unidad_medida')
+    return (
+        queryset
+        .annotate(**expresiones)
+        .values(*expresiones)
+        .annotate(**agregados)
+        .order_by()
+    )
+
+
+def _clave_grupo(fila):
+    return tuple(valor for campo, valor in fila.items() if campo.startswith('grupo_'))
+
+
+def mermas_por_dimension(agrupacion, desde, hasta, filtros=None):
+    """
+    Merma y reproceso por materia prima, producto, línea o semana, con sus
+    tasas sobre la cantidad usada del mismo grupo y unidad de medida.
+    Tres consultas: cantidad usada, mermas y reprocesos.
+    """
+    usadas = _agrupado(
+        TrazabilidadMateriaPrima.objects.filter(**_filtro_calidad('', desde, hasta, filtros)),
+        agrupacion, '',
+        total=Sum('cantidad_usada'),
+    )
+    grupos = {}
+    for fila in usadas:
+        grupos[_clave_grupo(fila)] = {
+            **{campo[len('grupo_'):]: valor for campo, valor in fila.items() if campo.startswith('grupo_')},
+            'cantidad_usada': fila['total'] or 0,
+            'merma': 0, 'registros_merma': 0,
+            'reproceso': 0, 'registros_reproceso': 0,
+        }
+
+    for modelo, nombre in ((Merma, 'merma'), (Reproceso, 'reproceso')):
+        filas = _agrupado(
+            modelo.objects.filter(**_filtro_calidad(PREFIJO_MP, desde, hasta, filtros)),
+            agrupacion, PREFIJO_MP,
+            total=Sum('cantidad'), registros=Count('id'),
+        )
+        for fila in filas:
+            grupo = grupos.get(_clave_grupo(fila))
+            if grupo is not None:
+                grupo[nombre] = fila['total'] or 0
+                grupo[f'registros_{nombre}'] = fila['registros']
+
+    resultado = []
+    for clave in sorted(grupos, key=lambda k: [str(v) for v in k]):
+        grupo = grupos[clave]
+        grupo['tasa_merma'] = _razon(grupo['merma'], grupo['cantidad_usada'])
+        grupo['tasa_reproceso'] = _razon(grupo['reproceso'], grupo['cantidad_usada'])
+        resultado.append(grupo)
+    return resultado
+
+
+def mermas_por_causa(desde, hasta, filtros=None):
+    """
+    Merma y reproceso por causa. La tasa es sobre toda la cantidad usada en
+    el periodo con la misma unidad de medida.
+    """
+    usadas = dict(
+        TrazabilidadMateriaPrima.objects
+        .filter(**_filtro_calidad('', desde, hasta, filtros))
+        .values_list('unidad_medida')
+        .annotate(total=Sum('cantidad_usada'))
+        .order_by()
+    )
+
+    resultado = []
+    for modelo, nombre in ((Merma, 'merma'), (Reproceso, 'reproceso')):
+        causas = dict(modelo.CAUSAS_CHOICES)
+        filas = (
+            modelo.objects
+            .filter(**_filtro_calidad(PREFIJO_MP, desde, hasta, filtros))
+            .values('causas', f'{PREFIJO_MP}unidad_medida')
+            .annotate(total=Sum('cantidad'), registros=Count('id'))
+            .order_by('-total')
+        )
+        for fila in filas:
+            unidad = fila[f'{PREFIJO_MP}unidad_medida']
+            resultado.append({
+                'tipo': nombre,
+                'causa': fila['causas'],
+                'causa_display': causas.get(fila['causas'], 'Sin causa'),
+                'unidad_medida': unidad,
+                'cantidad': fila['total'] or 0,
+                'registros': fila['registros'],
+                'tasa': _razon(fila['total'] or 0, usadas.get(unidad)),
+            })
+    return resultado
+
+
+def resumen_mermas(agrupacion, desde, hasta, filtros=None):
+    if agrupacion == 'causa':
+        return mermas_por_causa(desde, hasta, filtros)
+    return mermas_por_dimension(agrupacion, desde, hasta, filtros)
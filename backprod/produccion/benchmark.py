@@ -0,0 +1,345 @@
+import json
+import math
+import re
+import time
+import urllib.error
+import urllib.request
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.db import connections, transaction
+from django.test import Client
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .models import (
+    Usuario, Linea, Turno, Colaborador, Tarea, TareaColaborador, HojaProcesos,
+    Trazabilidad, Receta,
+)
+from .sinteticos import (
+    PREFIJO_PRODUCTO, CODIGO_COLABORADOR_INICIAL, USUARIO_SUPERVISOR, USUARIO_CALIDAD,
+)
+
+
+# Una petición de un escenario. `endpoint` agrupa las mediciones (la ruta
+# real puede llevar ids) y `rol` elige con qué usuario se autentica
+Peticion = namedtuple('Peticion', ['endpoint', 'metodo', 'ruta', 'datos', 'rol'])
+Medida = namedtuple('Medida', ['endpoint', 'estado', 'segundos', 'consultas'])
+
+# Consultas por petición según la cabecera de InstrumentacionMiddleware
+_CONSULTAS_SERVER_TIMING = re.compile(r'desc="(\d+) consultas"')
+
+# Una regresión de latencia tiene que superar también este margen absoluto,
+# para no marcar ruido en endpoints de pocos milisegundos
+MARGEN_MINIMO_MS = 5
+
+
+# ============================================================================
+# CLIENTES
+# ============================================================================
+def _consultas(server_timing):
+    coincidencia = _CONSULTAS_SERVER_TIMING.search(server_timing or '')
+    return int(coincidencia.group(1)) if coincidencia else None
+
+
+class ClienteDjango:
+    """Dentro del proceso, con el Client de Django (sin red ni servidor)"""
+
+    def __init__(self, usuarios):
+        self.tokens = {rol: str(AccessToken.for_user(usuario)) for rol, usuario in usuarios.items()}
+
+    def pedir(self, peticion):
+        cliente = Client(raise_request_exception=False)
+        respuesta = cliente.generic(
+            peticion.metodo,
+            peticion.ruta,
+            json.dumps(peticion.datos) if peticion.datos is not None else '',
+            content_type='application/json',
+            HTTP_AUTHORIZATION=f'Bearer {self.tokens[peticion.rol]}',
+        )
+        if respuesta.streaming:
+            b''.join(respuesta.streaming_content)
+        return respuesta.status_code, respuesta.get('Server-Timing')
+
+
+class ClienteHttp:
+    """Contra un servidor levantado (runserver, gunicorn, uvicorn...)"""
+
+    def __init__(self, url, credenciales):
+        self.url = url.rstrip('/')
+        self.tokens = {
+            rol: self._login(username, clave) for rol, (username, clave) in credenciales.items()
+        }
+
+    def _login(self, username, clave):
+        estado, cuerpo, _ = self._enviar('POST', '/api/auth/login/', {'username': username, 'password': clave})
+        if estado != 200:
+            raise ValueError(f'No se pudo iniciar sesión como {username} (HTTP {estado})')
+        return json.loads(cuerpo)['access']
+
+    def _enviar(self, metodo, ruta, datos=None, token=None):
+        solicitud = urllib.request.Request(
+            self.url + ruta,
+            data=json.dumps(datos).encode() if datos is not None else None,
+            method=metodo,
+            headers={'Content-Type': 'application/json'},
+        )
+        if token:
+            solicitud.add_header('Authorization', f'Bearer {token}')
+        try:
+            with urllib.request.urlopen(solicitud, timeout=60) as respuesta:
+                return respuesta.status, respuesta.read(), respuesta.headers
+        except urllib.error.HTTPError as error:
+            return error.code, error.read(), error.headers
+
+    def pedir(self, peticion):
+        estado, _, cabeceras = self._enviar(
+            peticion.metodo, peticion.ruta, peticion.datos, self.tokens[peticion.rol]
+        )
+        return estado, cabeceras.get('Server-Timing')
+
+
+# ============================================================================
+# ESCENARIOS
+# ============================================================================
+# Cada escenario prepara sus datos con el ORM (la misma base que usa el
+# servidor) y retorna sus fases: listas de peticiones que se lanzan a la vez.
+# Una fase empieza cuando terminó la anterior
+def escenario_dashboard(rng, repeticiones=20):
+    """Lecturas de supervisores y pantallas de planta"""
+    hasta = timezone.localdate() - timedelta(days=1)
+    desde = hasta - timedelta(days=29)
+    rango = f'desde={desde}&hasta={hasta}'
+    trazabilidades = list(
+        Trazabilidad.objects.filter(fecha_produccion__gte=desde).values_list('id', 'hoja_procesos_id')[:500]
+    )
+    if not trazabilidades:
+        raise ValueError('No hay trazabilidades recientes; generar datos con generar_datos_sinteticos')
+
+    peticiones = []
+    for _ in range(repeticiones):
+        trazabilidad_id, hoja_id = rng.choice(trazabilidades)
+        peticiones += [
+            Peticion('GET /api/catalogo/', 'GET', '/api/catalogo/', None, 'supervisor'),
+            Peticion('GET /api/tareas/', 'GET', f'/api/tareas/?fecha={hasta}', None, 'supervisor'),
+            Peticion('GET /api/trazabilidades/', 'GET', '/api/trazabilidades/', None, 'supervisor'),
+            Peticion('GET /api/trazabilidades/{id}/', 'GET', f'/api/trazabilidades/{trazabilidad_id}/', None, 'supervisor'),
+            Peticion('GET /api/hojas-procesos/{id}/', 'GET', f'/api/hojas-procesos/{hoja_id}/', None, 'supervisor'),
+            Peticion('GET /api/analytics/oee/', 'GET', f'/api/analytics/oee/?{rango}', None, 'supervisor'),
+            Peticion('GET /api/analytics/mermas/', 'GET', f'/api/analytics/mermas/?{rango}', None, 'supervisor'),
+            Peticion(
+                'GET /api/resumenes-diarios/totales/', 'GET',
+                f'/api/resumenes-diarios/totales/?agrupar=linea&{rango}', None, 'supervisor'
+            ),
+        ]
+    rng.shuffle(peticiones)
+    return [peticiones]
+
+
+def escenario_fin_turno(rng, lineas=20):
+    """
+    Cierre de turno: cada línea tiene una tarea en curso y todas registran
+    su trazabilidad al mismo tiempo.
+    """
+    supervisor = Usuario.objects.get(username=USUARIO_SUPERVISOR)
+    colaboradores = list(
+        Colaborador.objects.filter(codigo__gte=CODIGO_COLABORADOR_INICIAL).values_list('codigo', flat=True)[:500]
+    )
+    recetas = {}
+    for producto_id, codigo in Receta.objects.filter(
+        producto__codigo__startswith=PREFIJO_PRODUCTO
+    ).values_list('producto_id', 'materia_prima__codigo'):
+        recetas.setdefault(producto_id, []).append(codigo)
+    turnos = list(Turno.objects.filter(activo=True).values_list('id', flat=True))
+    if not colaboradores or not recetas:
+        raise ValueError('Faltan datos sintéticos; ejecutar generar_datos_sinteticos')
+
+    with transaction.atomic():
+        # Cierra las tareas sintéticas que quedaron en curso de corridas anteriores
+        Tarea.objects.filter(producto__codigo__startswith=PREFIJO_PRODUCTO, estado='en_curso').update(
+            estado='finalizada', fecha_finalizacion=timezone.now()
+        )
+        libres = Linea.objects.filter(activa=True).exclude(tareas__estado='en_curso').order_by('id')[:lineas]
+        hojas = []
+        for linea in libres:
+            tarea = Tarea.objects.create(
+                linea=linea,
+                turno_id=rng.choice(turnos),
+                producto_id=rng.choice(list(recetas)),
+                supervisor_asignador=supervisor,
+                meta_produccion=500,
+                estado='en_curso',
+                fecha_inicio=timezone.now() - timedelta(hours=7),
+            )
+            equipo = rng.sample(colaboradores, min(4, len(colaboradores)))
+            TareaColaborador.objects.bulk_create([
+                TareaColaborador(tarea=tarea, colaborador_id=colaborador_id)
+                for colaborador_id in Colaborador.objects.filter(codigo__in=equipo).values_list('id', flat=True)
+            ])
+            hojas.append((HojaProcesos.objects.create(tarea=tarea), tarea, equipo))
+
+    peticiones = [
+        Peticion('POST /api/trazabilidades/', 'POST', '/api/trazabilidades/', {
+            'hoja_procesos': hoja.id,
+            'cantidad_producida': rng.randint(400, 520),
+            'colaboradores_codigos': equipo,
+            'codigo_colaborador_lote': str(equipo[0]),
+            'materias_primas': [
+                {
+                    'materia_prima_id': codigo,
+                    'lote': f'L{rng.randint(1, 9999):04d}',
+                    'cantidad_usada': f'{rng.uniform(2, 60):.2f}',
+                    'mermas': [{'cantidad': '0.50', 'causas': 'cayo_al_suelo'}] if rng.random() < 0.3 else [],
+                }
+                for codigo in recetas[tarea.producto_id]
+            ],
+        }, 'supervisor')
+        for hoja, tarea, equipo in hojas
+    ]
+    return [peticiones]
+
+
+def escenario_firmas(rng, cantidad=50):
+    """Ráfaga de firmas: primero supervisores, después control de calidad"""
+    ids = list(
+        Trazabilidad.objects
+        .filter(hoja_procesos__tarea__producto__codigo__startswith=PREFIJO_PRODUCTO, firmas__isnull=True)
+        .order_by('-fecha_creacion')
+        .values_list('id', flat=True)[:cantidad]
+    )
+    if not ids:
+        raise ValueError('No hay trazabilidades sintéticas sin firmar; ejecutar el escenario fin_turno o regenerar datos')
+
+    ruta = '/api/firmas-trazabilidad/firmar/'
+    return [
+        [Peticion(f'POST {ruta} (supervisor)', 'POST', ruta, {'trazabilidad_id': i}, 'supervisor') for i in ids],
+        [Peticion(f'POST {ruta} (calidad)', 'POST', ruta, {'trazabilidad_id': i}, 'control_calidad') for i in ids],
+    ]
+
+
+def escenario_conexiones(rng, clientes=50, repeticiones=20):
+    """
+    Cambio de turno: `clientes` pantallas piden a la vez lecturas livianas,
+    donde abrir la conexión a la base pesa más que las consultas. Compara
+    PRODUCCION_DB_CONN_MAX_AGE=0 contra conexiones persistentes o PgBouncer;
+    sólo tiene sentido con --url (el Client de Django no las reutiliza)
+    """
+    rutas = [
+        ('GET /api/usuarios/me/', '/api/usuarios/me/', 'supervisor'),
+        ('GET /api/usuarios/me/', '/api/usuarios/me/', 'control_calidad'),
+        ('GET /api/tareas/hoy/', '/api/tareas/hoy/', 'supervisor'),
+        ('GET /api/lineas/', '/api/lineas/', 'supervisor'),
+        ('GET /api/catalogo/', '/api/catalogo/', 'supervisor'),
+    ]
+    # Cada fase es una ráfaga de un pedido por cliente
+    return [
+        [Peticion(endpoint, 'GET', ruta, None, rol) for endpoint, ruta, rol in rng.choices(rutas, k=clientes)]
+        for _ in range(repeticiones)
+    ]
+
+
+ESCENARIOS = {
+    'dashboard': escenario_dashboard,
+    'fin_turno': escenario_fin_turno,
+    'firmas': escenario_firmas,
+    'conexiones': escenario_conexiones,
+}
+
+
+# ============================================================================
+# EJECUCIÓN Y REPORTE
+# ============================================================================
+def _medir(cliente, peticion):
+    inicio = time.perf_counter()
+    estado, server_timing = cliente.pedir(peticion)
+    return Medida(peticion.endpoint, estado, time.perf_counter() - inicio, _consultas(server_timing))
+
+
+def _medir_en_hilo(cliente, peticion):
+    try:
+        return _medir(cliente, peticion)
+    finally:
+        # Con ClienteDjango cada hilo abre sus propias conexiones
+        connections.close_all()
+
+
+def ejecutar(cliente, fases, concurrencia=10):
+    """
+    Lanza cada fase con `concurrencia` hilos (1 = en el hilo actual).
+
+    Returns:
+        tuple: (lista de Medida, segundos totales)
+    """
+    medidas = []
+    inicio = time.perf_counter()
+    for peticiones in fases:
+        if concurrencia <= 1:
+            medidas += [_medir(cliente, peticion) for peticion in peticiones]
+            continue
+        with ThreadPoolExecutor(max_workers=concurrencia) as ejecutor:
+            medidas += ejecutor.map(lambda peticion: _medir_en_hilo(cliente, peticion), peticiones)
+    return medidas, time.perf_counter() - inicio
+
+
+def percentil(valores, p):
+    """Percentil por rango más cercano sobre valores ya ordenados"""
+    if not valores:
+        return None
+    return valores[max(0, math.ceil(p / 100 * len(valores)) - 1)]
+
+
+def resumir(medidas, segundos):
+    """Una fila por endpoint: rendimiento, latencias (ms) y consultas"""
+    por_endpoint = {}
+    for medida in medidas:
+        por_endpoint.setdefault(medida.endpoint, []).append(medida)
+
+    filas = []
+    for endpoint, grupo in sorted(por_endpoint.items()):
+        tiempos = sorted(medida.segundos * 1000 for medida in grupo)
+        consultas = [medida.consultas for medida in grupo if medida.consultas is not None]
+        filas.append({
+            'endpoint': endpoint,
+            'peticiones': len(grupo),
+            'errores': sum(1 for medida in grupo if medida.estado >= 400),
+            'por_segundo': round(len(grupo) / segundos, 1) if segundos else None,
+            'p50_ms': round(percentil(tiempos, 50), 1),
+            'p95_ms': round(percentil(tiempos, 95), 1),
+            'max_ms': round(tiempos[-1], 1),
+            'consultas_promedio': round(sum(consultas) / len(consultas), 1) if consultas else None,
+            'consultas_max': max(consultas) if consultas else None,
+        })
+    return filas
+
+
+def comparar(filas, base, tolerancia=0.2):
+    """
+    Compara contra un reporte anterior (mismo formato). Es regresión un p95
+    más de `tolerancia` sobre la base o cualquier consulta de más.
+
+    Returns:
+        list: descripciones de las regresiones
+    """
+    anteriores = {fila['endpoint']: fila for fila in base}
+    regresiones = []
+    for fila in filas:
+        anterior = anteriores.get(fila['endpoint'])
+        if not anterior:
+            continue
+        limite = max(anterior['p95_ms'] * (1 + tolerancia), anterior['p95_ms'] + MARGEN_MINIMO_MS)
+        if fila['p95_ms'] > limite:
+            regresiones.append(f"{fila['endpoint']}: p95 {anterior['p95_ms']} -> {fila['p95_ms']} ms")
+        if None not in (fila['consultas_max'], anterior['consultas_max']) and fila['consultas_max'] > anterior['consultas_max']:
+            regresiones.append(
+                f"{fila['endpoint']}: consultas {anterior['consultas_max']} -> {fila['consultas_max']}"
+            )
+    return regresiones
+
+
+def usuarios_benchmark():
+    return {
+        'supervisor': Usuario.objects.get(username=USUARIO_SUPERVISOR),
+        'control_calidad': Usuario.objects.get(username=USUARIO_CALIDAD),
+    }
+
@@ -0,0 +1,149 @@
+import re
+import unicodedata
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Func, Q, TextField, Value
+from django.db.models.constants import LOOKUP_SEP
+from django.db.models.functions import Greatest
+from rest_framework import filters
+from rest_framework.settings import api_settings
+
+
+def normalizar(texto):
+    """Minúsculas y sin acentos ("Bañado" -> "banado")"""
+    descompuesto = unicodedata.normalize('NFKD', str(texto).lower())
+    return ''.join(c for c in descompuesto if not unicodedata.combining(c))
+
+
+def terminos(consulta):
+    """Palabras de la búsqueda ya normalizadas: "COB. LECHE" -> ['cob', 'leche']"""
+    return list(dict.fromkeys(re.findall(r'[^\W_]+', normalizar(consulta))))
+
+
+def usa_trigramas():
+    return connection.vendor == 'postgresql'
+
+
+def registrar_funciones_sqlite(sender, connection, **kwargs):
+    """
+    f_unaccent para SQLite (tests y desarrollo), así las búsquedas tampoco
+    distinguen acentos. En Postgres la crea la migración 0015.
+    """
+    if connection.vendor == 'sqlite':
+        connection.connection.create_function('f_unaccent', 1, normalizar, deterministic=True)
+
+
+# ============================================================================
+# EXPRESIONES
+# ============================================================================
+class Normalizado(Func):
+    """f_unaccent(lower(campo)): la misma expresión de los índices GIN"""
+    function = 'f_unaccent'
+    template = '%(function)s(LOWER(%(expressions)s))'
+    output_field = TextField()
+
+
+class Contiene(Func):
+    """texto LIKE '%termino%' (con pg_trgm usa el índice GIN)"""
+    arg_joiner = ' LIKE '
+    template = '%(expressions)s'
+    output_field = BooleanField()
+
+    def __init__(self, expresion, termino):
+        super().__init__(expresion, Value(f'%{termino}%'))
+
+
+class SimilarPalabra(Func):
+    """
+    termino <% texto: alguna parte del texto se parece al término
+    (word_similarity >= pg_trgm.word_similarity_threshold, 0.6 por defecto)
+    """
+    arg_joiner = ' <%% '
+    template = '%(expressions)s'
+    output_field = BooleanField()
+
+    def __init__(self, termino, expresion):
+        super().__init__(Value(termino), expresion)
+
+
+class SimilitudPalabra(Func):
+    function = 'word_similarity'
+    output_field = FloatField()
+
+
+# ============================================================================
+# BÚSQUEDA
+# ============================================================================
+def _es_texto(modelo, ruta):
+    campo = None
+    for nombre in ruta.split(LOOKUP_SEP):
+        campo = modelo._meta.get_field(nombre)
+        modelo = campo.related_model or modelo
+    return campo.get_internal_type() in ('CharField', 'TextField')
+
+
+def buscar(queryset, consulta, campos):
+    """
+    Filtra `queryset` con cada término de `consulta` presente (o parecido)
+    en alguno de `campos`, sin distinguir mayúsculas ni acentos.
+
+    En Postgres, además de la coincidencia parcial acepta errores de tipeo
+    (pg_trgm) y anota `relevancia` para ordenar. En SQLite sólo hay
+    coincidencia parcial.
+
+    Returns:
+        tuple: (queryset filtrado, hay_relevancia)
+    """
+    palabras = terminos(consulta)
+    if not palabras:
+        return queryset, False
+
+    trigramas = usa_trigramas()
+    textos = [Normalizado(campo) for campo in campos if _es_texto(queryset.model, campo)]
+    numericos = [campo for campo in campos if not _es_texto(queryset.model, campo)]
+
+    filtro = Q()
+    for palabra in palabras:
+        coincide = Q()
+        for expresion in textos:
+            coincide |= Q(Contiene(expresion, palabra))
+            # Con menos de 3 letras no hay trigramas que comparar
+            if trigramas and len(palabra) >= 3:
+                coincide |= Q(SimilarPalabra(palabra, expresion))
+        if palabra.isdigit():
+            for campo in numericos:
+                coincide |= Q(**{campo: int(palabra)})
+        filtro &= coincide
+
+    queryset = queryset.filter(filtro)
+    if not (trigramas and textos):
+        return queryset, False
+
+    frase = ' '.join(palabras)
+    similitudes = [SimilitudPalabra(Value(frase), expresion) for expresion in textos]
+    relevancia = Greatest(*similitudes) if len(similitudes) > 1 else similitudes[0]
+    return queryset.annotate(relevancia=relevancia), True
+
+
+class BusquedaFilter(filters.SearchFilter):
+    """
+    SearchFilter de DRF con `buscar()`: sin acentos, tolerante a errores y,
+    en Postgres, ordenado por relevancia salvo que se pida ?ordering=.
+    Va después de OrderingFilter en filter_backends.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        search_fields = self.get_search_fields(view, request)
+        consulta = request.query_params.get(self.search_param, '')
+        if not search_fields or not consulta.strip():
+            return queryset
+
+        campos = [campo.lstrip('^=@$') for campo in search_fields]
+        resultado, hay_relevancia = buscar(queryset, consulta, campos)
+
+        if self.must_call_distinct(queryset, search_fields):
+            resultado = resultado.distinct()
+        if hay_relevancia and api_settings.ORDERING_PARAM not in request.query_params:
+            orden = resultado.query.order_by or resultado.model._meta.ordering
+            resultado = resultado.order_by('-relevancia', *orden)
+        return resultado
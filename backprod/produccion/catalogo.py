@@ -0,0 +1,94 @@
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from rest_framework.renderers import JSONRenderer
+
+from .models import Linea, Turno, Producto, MateriaPrima, Maquina, TipoEvento
+from .serializers import (
+    LineaSerializer, TurnoSerializer, ProductoSerializer,
+    MateriaPrimaSerializer, MaquinaSerializer, TipoEventoSerializer,
+)
+
+
+# Modelos que componen el catálogo; sus cambios invalidan la caché (signals.py)
+MODELOS_CATALOGO = (Linea, Turno, Producto, MateriaPrima, Maquina, TipoEvento)
+
+# Vigencia máxima de la caché. Las señales sólo llegan al proceso que guardó
+# el cambio; con varios workers este plazo acota cuánto puede atrasarse el resto
+SEGUNDOS_CACHE_CATALOGO = 300
+
+
+_bloqueo = threading.Lock()
+_cache = {
+    'contenido': None,
+    'etag': None,
+    'generado': 0.0,
+    'generacion': 0,
+}
+
+
+def construir_catalogo():
+    """Lee y serializa los catálogos activos que usan las tablets"""
+    return {
+        'lineas': LineaSerializer(
+            Linea.objects.filter(activa=True).order_by('nombre'), many=True
+        ).data,
+        'turnos': TurnoSerializer(
+            Turno.objects.filter(activo=True).order_by('hora_inicio'), many=True
+        ).data,
+        'productos': ProductoSerializer(
+            Producto.objects.filter(activo=True).order_by('codigo'), many=True
+        ).data,
+        'materias_primas': MateriaPrimaSerializer(
+            MateriaPrima.objects.filter(activo=True).order_by('nombre'), many=True
+        ).data,
+        'maquinas': MaquinaSerializer(
+            Maquina.objects.filter(activa=True).order_by('nombre'), many=True
+        ).data,
+        'tipos_eventos': TipoEventoSerializer(
+            TipoEvento.objects.filter(activo=True).order_by('orden'), many=True
+        ).data,
+    }
+
+
+def obtener_catalogo():
+    """
+    Retorna el catálogo ya renderizado a JSON y su ETag.
+
+    Mientras la caché esté vigente no se consulta la base. La versión es el
+    hash del contenido, así que dos procesos con los mismos datos entregan
+    el mismo ETag.
+
+    Returns:
+        tuple: (contenido en bytes, etag)
+    """
+    vigencia = getattr(settings, 'CATALOGO_SEGUNDOS_CACHE', SEGUNDOS_CACHE_CATALOGO)
+
+    with _bloqueo:
+        if _cache['contenido'] is not None and time.monotonic() - _cache['generado'] < vigencia:
+            return _cache['contenido'], _cache['etag']
+        generacion = _cache['generacion']
+
+    datos = construir_catalogo()
+    version = hashlib.sha1(JSONRenderer().render(datos)).hexdigest()
+    contenido = JSONRenderer().render({'version': version, **datos})
+    etag = f'"{version}"'
+
+    with _bloqueo:
+        # Si hubo una invalidación mientras se construía, no guardar datos viejos
+        if _cache['generacion'] == generacion:
+            _cache['contenido'] = contenido
+            _cache['etag'] = etag
+            _cache['generado'] = time.monotonic()
+
+    return contenido, etag
+
+
+def invalidar_catalogo():
+    """Descarta el catálogo en caché; se reconstruye en la próxima consulta"""
+    with _bloqueo:
+        _cache['contenido'] = None
+        _cache['etag'] = None
+        _cache['generacion'] += 1
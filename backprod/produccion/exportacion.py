@@ -0,0 +1,138 @@
+import csv
+import tempfile
+
+from django.db.models import Prefetch
+from django.utils import timezone
+from openpyxl import Workbook
+
+from .models import TrazabilidadMateriaPrima
+
+
+# Trazabilidades leídas por vuelta del cursor del servidor. Cada vuelta hace
+# además una consulta por relación precargada
+TRAZABILIDADES_POR_LOTE = 2000
+
+COLUMNAS_EXPORTACION = [
+    'id', 'lote', 'fecha_produccion', 'juliano', 'estado',
+    'producto_codigo', 'producto_nombre', 'linea', 'turno',
+    'cantidad_producida', 'meta_produccion', 'colaboradores', 'firmas',
+    'materia_prima_codigo', 'materia_prima_nombre', 'lote_materia_prima',
+    'cantidad_usada', 'unidad_medida',
+    'merma', 'causas_merma', 'reproceso', 'causas_reproceso',
+    'fecha_creacion',
+]
+
+
+# ============================================================================
+# FILAS
+# ============================================================================
+def preparar_exportacion(queryset):
+    """Relaciones necesarias para exportar sin consultas por fila"""
+    return queryset.prefetch_related(None).select_related(
+        'hoja_procesos__tarea__linea',
+        'hoja_procesos__tarea__turno',
+        'hoja_procesos__tarea__producto',
+    ).prefetch_related(
+        Prefetch(
+            'materias_primas_usadas',
+            queryset=TrazabilidadMateriaPrima.objects.select_related('materia_prima')
+        ),
+        'materias_primas_usadas__mermas',
+        'materias_primas_usadas__reprocesos',
+        'colaboradores_reales__colaborador',
+        'firmas__usuario',
+    )
+
+
+def _causas(registros):
+    return ', '.join(sorted({r.get_causas_display() or 'Sin causa' for r in registros}))
+
+
+def filas_exportacion(queryset):
+    """
+    Genera una fila por materia prima usada (una sola si la trazabilidad no
+    registró materias primas). Lee con un cursor del servidor de a
+    TRAZABILIDADES_POR_LOTE, así la memoria no depende del rango exportado.
+    """
+    for trazabilidad in preparar_exportacion(queryset).iterator(chunk_size=TRAZABILIDADES_POR_LOTE):
+        tarea = trazabilidad.hoja_procesos.tarea
+        base = [
+            trazabilidad.id,
+            trazabilidad.lote,
+            trazabilidad.fecha_produccion,
+            trazabilidad.juliano,
+            trazabilidad.get_estado_display(),
+            tarea.producto.codigo,
+            tarea.producto.nombre,
+            tarea.linea.nombre,
+            tarea.turno.nombre,
+            trazabilidad.cantidad_producida,
+            tarea.meta_produccion,
+            ' | '.join(
+                f'{tc.colaborador.codigo} {tc.colaborador.nombre} {tc.colaborador.apellido}'
+                for tc in trazabilidad.colaboradores_reales.all()
+            ),
+            ' | '.join(
+                f'{firma.get_tipo_firma_display()}: {firma.usuario.username} '
+                f'{timezone.localtime(firma.fecha_firma):%Y-%m-%d %H:%M}'
+                for firma in trazabilidad.firmas.all()
+            ),
+        ]
+        fecha_creacion = timezone.localtime(trazabilidad.fecha_creacion).replace(tzinfo=None)
+
+        materias_primas = trazabilidad.materias_primas_usadas.all()
+        if not materias_primas:
+            yield base + [None] * 9 + [fecha_creacion]
+            continue
+
+        for mp_usada in materias_primas:
+            mermas = mp_usada.mermas.all()
+            reprocesos = mp_usada.reprocesos.all()
+            yield base + [
+                mp_usada.materia_prima.codigo,
+                mp_usada.materia_prima.nombre,
+                mp_usada.lote,
+                mp_usada.cantidad_usada,
+                mp_usada.unidad_medida,
+                sum(m.cantidad for m in mermas) if mermas else None,
+                _causas(mermas),
+                sum(r.cantidad for r in reprocesos) if reprocesos else None,
+                _causas(reprocesos),
+                fecha_creacion,
+            ]
+
+
+# ============================================================================
+# FORMATOS
+# ============================================================================
+class _Eco:
+    """Pseudo-archivo para csv.writer: retorna lo escrito en vez de guardarlo"""
+
+    def write(self, valor):
+        return valor
+
+
+def exportar_csv(queryset):
+    """Generador de líneas CSV para StreamingHttpResponse"""
+    escritor = csv.writer(_Eco())
+    # BOM para que Excel reconozca los acentos
+    yield '\ufeff' + escritor.writerow(COLUMNAS_EXPORTACION)
+    for fila in filas_exportacion(queryset):
+        yield escritor.writerow(fila)
+
+
+def exportar_xlsx(queryset):
+    """
+    Escribe el XLSX con openpyxl en modo write-only (las filas van a disco,
+    no quedan en memoria) y retorna el archivo temporal listo para leer.
+    """
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet('Trazabilidades')
+    hoja.append(COLUMNAS_EXPORTACION)
+    for fila in filas_exportacion(queryset):
+        hoja.append(fila)
+
+    archivo = tempfile.TemporaryFile(suffix='.xlsx')
+    libro.save(archivo)
+    archivo.seek(0)
+    return archivo
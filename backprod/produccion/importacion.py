@@ -0,0 +1,393 @@
+import threading
+from datetime import timedelta
+
+import openpyxl
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Colaborador, ImportacionColaboradores
+
+
+# Filas por INSERT ... ON CONFLICT al importar colaboradores
+TAMANO_LOTE_IMPORTACION = 1000
+
+# Máximo de errores por fila que se devuelven en la respuesta
+MAX_ERRORES_REPORTADOS = 200
+
+# Largo máximo de nombre/apellido (ver modelo Colaborador)
+MAX_LARGO_NOMBRE = 100
+
+# Minutos sin avance tras los cuales una importación 'procesando' se considera
+# abandonada (worker caído) y puede volver a tomarse
+MINUTOS_IMPORTACION_ABANDONADA = 10
+
+
+def normalizar_codigo(valor):
+    """
+    Convierte el código de un colaborador a entero.
+    Acepta enteros, textos ("96") y los flotantes que entrega Excel ("96.0").
+    Lanza ValueError si el código no es un entero válido.
+    """
+    if isinstance(valor, bool):
+        raise ValueError(f'Código inválido: {valor}')
+
+    if isinstance(valor, float):
+        if not valor.is_integer():
+            raise ValueError(f'Código inválido: {valor}')
+        return int(valor)
+
+    texto = str(valor).strip()
+    try:
+        return int(texto)
+    except ValueError:
+        try:
+            numero = float(texto)
+        except ValueError:
+            raise ValueError(f'Código inválido: {valor}')
+        if not numero.is_integer():
+            raise ValueError(f'Código inválido: {valor}')
+        return int(numero)
+
+
+def upsert_colaboradores(colaboradores, tamano_lote=TAMANO_LOTE_IMPORTACION):
+    """
+    Crea o actualiza colaboradores por código de forma masiva.
+
+    Compara los códigos entrantes con los existentes en una sola consulta y
+    luego usa bulk_create(update_conflicts=True) sobre `codigo` en lotes de
+    `tamano_lote`. Si un código viene repetido gana la última fila.
+
+    Args:
+        colaboradores: lista de dicts con 'codigo' (int), 'nombre' y 'apellido'
+
+    Returns:
+        tuple: (creados, actualizados)
+    """
+    por_codigo = {data['codigo']: data for data in colaboradores}
+    if not por_codigo:
+        return 0, 0
+
+    existentes = set(
+        Colaborador.objects.filter(codigo__in=por_codigo.keys()).values_list('codigo', flat=True)
+    )
+
+    Colaborador.objects.bulk_create(
+        [
+            Colaborador(
+                codigo=codigo,
+                nombre=data['nombre'],
+                apellido=data['apellido'],
+                activo=True
+            )
+            for codigo, data in por_codigo.items()
+        ],
+        batch_size=tamano_lote,
+        update_conflicts=True,
+        unique_fields=['codigo'],
+        update_fields=['nombre', 'apellido', 'activo', 'fecha_actualizacion'],
+    )
+
+    return len(por_codigo) - len(existentes), len(existentes)
+
+
+def desactivar_ausentes(codigos, tamano_lote=TAMANO_LOTE_IMPORTACION):
+    """
+    Desactiva los colaboradores activos cuyo código no viene en `codigos`
+    (los códigos de la planilla).
+
+    Los ausentes se calculan contra los códigos activos y se desactivan en
+    lotes de `tamano_lote`, para no enviar a la base una lista NOT IN con
+    miles de códigos.
+
+    Returns:
+        int: cantidad de colaboradores desactivados
+    """
+    ausentes = [
+        codigo
+        for codigo in Colaborador.objects.filter(activo=True).values_list('codigo', flat=True)
+        if codigo not in codigos
+    ]
+    ahora = timezone.now()
+    desactivados = 0
+    for i in range(0, len(ausentes), tamano_lote):
+        desactivados += Colaborador.objects.filter(
+            activo=True,
+            codigo__in=ausentes[i:i + tamano_lote]
+        ).update(activo=False, fecha_actualizacion=ahora)
+    return desactivados
+
+
+def importar_colaboradores(colaboradores, desactivar=False, tamano_lote=TAMANO_LOTE_IMPORTACION):
+    """
+    Importa una planilla completa de colaboradores en una transacción.
+
+    Returns:
+        dict: {'creados': int, 'actualizados': int, 'desactivados': int}
+    """
+    with transaction.atomic():
+        creados, actualizados = upsert_colaboradores(colaboradores, tamano_lote=tamano_lote)
+        desactivados = desactivar_ausentes(
+            {data['codigo'] for data in colaboradores}, tamano_lote=tamano_lote
+        ) if desactivar else 0
+
+    return {
+        'creados': creados,
+        'actualizados': actualizados,
+        'desactivados': desactivados
+    }
+
+
+# ============================================================================
+# LECTURA EN STREAMING DE EXCEL
+# ============================================================================
+def filas_de_hoja(sheet):
+    """
+    Filas de datos de una hoja abierta en modo solo lectura.
+
+    Yields:
+        tuple: (numero_fila, valores) desde la fila 2 (la fila 1 son headers)
+    """
+    yield from enumerate(sheet.iter_rows(min_row=2, values_only=True), start=2)
+
+
+def iterar_filas_excel(archivo):
+    """
+    Recorre la hoja activa de un Excel en modo solo lectura, sin cargar estilos
+    ni la hoja completa en memoria. Ver filas_de_hoja().
+    """
+    workbook = openpyxl.load_workbook(archivo, read_only=True, data_only=True)
+    try:
+        yield from filas_de_hoja(workbook.active)
+    finally:
+        workbook.close()
+
+
+def total_filas_hoja(sheet):
+    """
+    Estima la cantidad de filas de datos a partir de las dimensiones que
+    declara la hoja (no recorre las filas). Retorna None si no las declara.
+    """
+    return max(sheet.max_row - 1, 0) if sheet.max_row else None
+
+
+def _texto(valor):
+    return str(valor).strip() if valor is not None else ''
+
+
+def validar_fila(valores):
+    """
+    Valida una fila (codigo, nombre, apellido) del Excel de colaboradores.
+
+    Returns:
+        dict con el colaborador, o None si la fila está vacía
+    Raises:
+        ValueError con la descripción del problema
+    """
+    valores = tuple(valores or ()) + (None, None, None)
+    codigo, nombre, apellido = valores[0], _texto(valores[1]), _texto(valores[2])
+
+    if codigo is None or _texto(codigo) == '':
+        if nombre or apellido:
+            raise ValueError('Falta el código del colaborador')
+        return None
+
+    codigo = normalizar_codigo(codigo)
+
+    if not nombre:
+        raise ValueError('Falta el nombre del colaborador')
+    if len(nombre) > MAX_LARGO_NOMBRE or len(apellido) > MAX_LARGO_NOMBRE:
+        raise ValueError(f'Nombre o apellido supera los {MAX_LARGO_NOMBRE} caracteres')
+
+    return {'codigo': codigo, 'nombre': nombre, 'apellido': apellido}
+
+
+def importar_filas(filas, desactivar=False, tamano_lote=TAMANO_LOTE_IMPORTACION, al_avanzar=None):
+    """
+    Valida e importa filas de colaboradores en bloques de `tamano_lote`.
+
+    Nunca guarda más de un bloque de filas en memoria (de las anteriores sólo
+    quedan los códigos), por lo que el consumo se mantiene plano aunque la
+    planilla tenga decenas de miles de filas. Las filas
+    inválidas se informan con su número y no detienen la importación; en ese
+    caso no se desactivan ausentes, para no dar de baja a quien venía en una
+    fila con error.
+
+    Args:
+        filas: iterable de (numero_fila, valores), ver iterar_filas_excel()
+        al_avanzar: callback opcional que recibe el resultado parcial después
+            de cada bloque
+
+    Returns:
+        dict con creados, actualizados, desactivados, filas_procesadas,
+        total_errores y errores (máximo MAX_ERRORES_REPORTADOS)
+    """
+    resultado = {
+        'creados': 0,
+        'actualizados': 0,
+        'desactivados': 0,
+        'filas_procesadas': 0,
+        'total_errores': 0,
+        'errores': [],
+    }
+
+    # Códigos ya importados: un código repetido en otro bloque ya se contó
+    # (creado o actualizado) la primera vez
+    vistos = set()
+
+    def aplicar(bloque):
+        codigos = {colaborador['codigo'] for colaborador in bloque}
+        with transaction.atomic():
+            creados, actualizados = upsert_colaboradores(bloque, tamano_lote=tamano_lote)
+        resultado['creados'] += creados
+        resultado['actualizados'] += actualizados - len(codigos & vistos)
+        vistos.update(codigos)
+        resultado['filas_procesadas'] += len(bloque)
+        if al_avanzar:
+            al_avanzar(resultado)
+
+    bloque = []
+    for numero_fila, valores in filas:
+        try:
+            colaborador = validar_fila(valores)
+        except ValueError as e:
+            resultado['total_errores'] += 1
+            if len(resultado['errores']) < MAX_ERRORES_REPORTADOS:
+                resultado['errores'].append({'fila': numero_fila, 'error': str(e)})
+            continue
+
+        if colaborador is None:
+            continue
+
+        bloque.append(colaborador)
+        if len(bloque) >= tamano_lote:
+            aplicar(bloque)
+            bloque = []
+
+    if bloque:
+        aplicar(bloque)
+
+    if desactivar and resultado['filas_procesadas'] and not resultado['total_errores']:
+        with transaction.atomic():
+            resultado['desactivados'] = desactivar_ausentes(vistos, tamano_lote=tamano_lote)
+
+    return resultado
+
+
+# ============================================================================
+# WORKER DE IMPORTACIONES (cola en base de datos, sin broker externo)
+# ============================================================================
+def tomar_siguiente_importacion():
+    """
+    Reserva la importación pendiente más antigua para este worker.
+
+    Usa SELECT ... FOR UPDATE SKIP LOCKED, así varios workers pueden consultar
+    la misma tabla sin tomar dos veces la misma importación. También retoma las
+    que quedaron 'procesando' sin avance (worker caído); reimportar es seguro
+    porque el upsert es idempotente.
+
+    Returns:
+        ImportacionColaboradores o None si no hay trabajo
+    """
+    abandonada = timezone.now() - timedelta(minutes=MINUTOS_IMPORTACION_ABANDONADA)
+    
+    with transaction.atomic():
+        importacion = ImportacionColaboradores.objects.select_for_update(
+            skip_locked=True
+        ).filter(
+            Q(estado='pendiente') |
+            Q(estado='procesando', fecha_actualizacion__lt=abandonada)
+        ).order_by('fecha_creacion').first()
+        
+        if importacion is None:
+            return None
+        
+        importacion.estado = 'procesando'
+        importacion.fecha_inicio = timezone.now()
+        importacion.save(update_fields=['estado', 'fecha_inicio', 'fecha_actualizacion'])
+    
+    return importacion
+
+
+def procesar_importacion(importacion):
+    """
+    Importa el Excel de una importación reservada, registrando el avance
+    después de cada bloque para que el cliente pueda consultarlo.
+    """
+    campos_avance = [
+        'creados', 'actualizados', 'desactivados',
+        'filas_procesadas', 'total_errores', 'errores',
+    ]
+    
+    def guardar_avance(resultado):
+        for campo in campos_avance:
+            setattr(importacion, campo, resultado[campo])
+        importacion.save(update_fields=campos_avance + ['fecha_actualizacion'])
+    
+    try:
+        # Un solo parseo: el total sale de las dimensiones de la misma hoja
+        with importacion.archivo.open('rb') as archivo:
+            workbook = openpyxl.load_workbook(archivo, read_only=True, data_only=True)
+            try:
+                sheet = workbook.active
+                importacion.total_filas = total_filas_hoja(sheet)
+                importacion.save(update_fields=['total_filas', 'fecha_actualizacion'])
+                
+                resultado = importar_filas(
+                    filas_de_hoja(sheet),
+                    desactivar=importacion.desactivar_ausentes,
+                    al_avanzar=guardar_avance
+                )
+            finally:
+                workbook.close()
+        
+        for campo in campos_avance:
+            setattr(importacion, campo, resultado[campo])
+        importacion.estado = 'completada'
+        importacion.fecha_finalizacion = timezone.now()
+        importacion.save()
+    
+    except Exception as e:
+        importacion.estado = 'fallida'
+        importacion.mensaje_error = f'Error al procesar el archivo: {str(e)}'
+        importacion.fecha_finalizacion = timezone.now()
+        importacion.save(update_fields=[
+            'estado', 'mensaje_error', 'fecha_finalizacion', 'fecha_actualizacion'
+        ])
+    
+    return importacion
+
+
+def procesar_importaciones_pendientes():
+    """
+    Procesa importaciones hasta vaciar la cola.
+
+    Returns:
+        int: cantidad de importaciones procesadas
+    """
+    procesadas = 0
+    while True:
+        importacion = tomar_siguiente_importacion()
+        if importacion is None:
+            return procesadas
+        procesar_importacion(importacion)
+        procesadas += 1
+
+
+def lanzar_worker_en_segundo_plano():
+    """
+    Vacía la cola en un hilo del mismo proceso, para instalaciones sin el
+    comando `procesar_importaciones` corriendo. Se controla con el setting
+    IMPORTACIONES_EN_SEGUNDO_PLANO.
+    """
+    if not getattr(settings, 'IMPORTACIONES_EN_SEGUNDO_PLANO', True):
+        return
+    
+    def trabajar():
+        try:
+            procesar_importaciones_pendientes()
+        finally:
+            connection.close()
+    
+    threading.Thread(target=trabajar, name='importacion-colaboradores', daemon=True).start()
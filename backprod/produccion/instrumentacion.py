@@ -0,0 +1,99 @@
+import contextvars
+import logging
+import time
+from collections import Counter
+
+
+logger = logging.getLogger(__name__)
+
+# Medición de la petición en curso (la crea InstrumentacionMiddleware)
+medicion_actual = contextvars.ContextVar('medicion_actual', default=None)
+
+# Consultas repetidas que se listan en el log de una petición lenta
+MAX_SQL_REPETIDAS = 5
+
+# Largo máximo de cada SQL en ese log
+LARGO_MAXIMO_SQL = 300
+
+
+# ============================================================================
+# MEDICIÓN
+# ============================================================================
+class Medicion:
+    """
+    Tiempos y consultas de una petición. Se instala como
+    `connection.execute_wrapper`: por consulta sólo suma tiempo y cuenta
+    el SQL (con placeholders, así las repeticiones de un N+1 coinciden).
+    """
+
+    __slots__ = (
+        'inicio', 'vista', 'consultas', 'tiempo_sql', 'sql', 'tiempo_serializacion',
+        'tiempo_render', '_inicio_vista', '_sql_inicio_vista', '_inicio_render',
+    )
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.vista = '-'
+        self.consultas = 0
+        self.tiempo_sql = 0.0
+        self.sql = Counter()
+        self.tiempo_serializacion = 0.0
+        self.tiempo_render = 0.0
+        self._inicio_vista = None
+        self._sql_inicio_vista = 0.0
+        self._inicio_render = None
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.tiempo_sql += time.perf_counter() - inicio
+            self.consultas += 1
+            self.sql[sql] += 1
+
+    def iniciar_vista(self, vista):
+        self.vista = vista
+        self._inicio_vista = time.perf_counter()
+        self._sql_inicio_vista = self.tiempo_sql
+
+    def terminar_vista(self):
+        """
+        Cierra la vista cuando ya creó la respuesta. Lo que tardó sin contar
+        sus consultas es la serialización: en una vista DRF es armar
+        serializer.data (y validar la entrada en las escrituras).
+        """
+        if self._inicio_vista is None:
+            return
+        duracion = time.perf_counter() - self._inicio_vista
+        sql = self.tiempo_sql - self._sql_inicio_vista
+        self.tiempo_serializacion = max(duracion - sql, 0.0)
+        self._inicio_vista = None
+
+    def iniciar_render(self):
+        self._inicio_render = time.perf_counter()
+
+    def terminar_render(self, response):
+        if self._inicio_render is not None:
+            self.tiempo_render += time.perf_counter() - self._inicio_render
+            self._inicio_render = None
+
+    def sql_repetidas(self):
+        return [
+            {'sql': sql[:LARGO_MAXIMO_SQL], 'veces': veces}
+            for sql, veces in self.sql.most_common(MAX_SQL_REPETIDAS)
+            if veces > 1
+        ]
+
+
+def nombre_vista(request, view_func):
+    """
+    'Clase.accion' para viewsets ('TrazabilidadViewSet.firmar'),
+    'Clase.metodo' para APIView y el nombre de la función en otro caso.
+    """
+    clase = getattr(view_func, 'cls', None)
+    if clase is None:
+        return getattr(view_func, '__name__', '-')
+    metodo = request.method.lower()
+    acciones = getattr(view_func, 'actions', None) or {}
+    return f'{clase.__name__}.{acciones.get(metodo, metodo)}'
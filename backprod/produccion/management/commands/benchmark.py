@@ -0,0 +1,134 @@
+import json
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+
+from produccion.benchmark import (
+    ESCENARIOS, ClienteDjango, ClienteHttp, comparar, ejecutar, resumir, usuarios_benchmark,
+)
+from produccion.models import Usuario
+from produccion.sinteticos import CLAVE_POR_DEFECTO, USUARIO_SUPERVISOR, USUARIO_CALIDAD
+
+
+# Concurrencia si no se pasa --concurrencia (el escenario conexiones usa --clientes)
+CONCURRENCIA_POR_DEFECTO = 10
+
+COLUMNAS = [
+    ('endpoint', 'Endpoint', 52),
+    ('peticiones', 'N', 5),
+    ('errores', 'Err', 4),
+    ('por_segundo', 'Req/s', 7),
+    ('p50_ms', 'p50 ms', 8),
+    ('p95_ms', 'p95 ms', 8),
+    ('max_ms', 'Máx ms', 8),
+    ('consultas_promedio', 'SQL prom', 9),
+    ('consultas_max', 'SQL máx', 8),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Corre escenarios de carga (dashboard, fin de turno, ráfagas de firmas y de conexiones) '
+        'y reporta rendimiento, latencia p50/p95 y consultas por endpoint. Requiere generar_datos_sinteticos'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--escenario',
+            choices=[*ESCENARIOS, 'todos'],
+            default='todos',
+            help='Escenario a correr'
+        )
+        parser.add_argument(
+            '--url',
+            help='URL de un servidor levantado (ej: http://localhost:8000). Sin URL usa el Client de Django'
+        )
+        parser.add_argument('--clave', default=CLAVE_POR_DEFECTO, help='Contraseña de los usuarios de benchmark (con --url)')
+        parser.add_argument(
+            '--concurrencia',
+            type=int,
+            help=f'Peticiones simultáneas (por defecto {CONCURRENCIA_POR_DEFECTO}; en conexiones, --clientes)'
+        )
+        parser.add_argument('--repeticiones', type=int, default=20, help='Vueltas de los escenarios dashboard y conexiones')
+        parser.add_argument('--clientes', type=int, default=50, help='Clientes simultáneos del escenario conexiones')
+        parser.add_argument('--lineas', type=int, default=20, help='Líneas que cierran turno a la vez')
+        parser.add_argument('--firmas', type=int, default=50, help='Trazabilidades en la ráfaga de firmas')
+        parser.add_argument('--semilla', type=int, default=42, help='Semilla para elegir ids y payloads')
+        parser.add_argument('--json', dest='salida_json', help='Guarda el reporte en este archivo')
+        parser.add_argument(
+            '--base',
+            help='Reporte JSON anterior; si hay regresiones el comando termina con error'
+        )
+        parser.add_argument(
+            '--tolerancia',
+            type=float,
+            default=0.2,
+            help='Aumento de p95 aceptado frente a --base (0.2 = 20%%)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            usuarios_benchmark()
+        except Usuario.DoesNotExist:
+            raise CommandError('Faltan los usuarios de benchmark; ejecutar generar_datos_sinteticos')
+
+        if options['url']:
+            cliente = ClienteHttp(options['url'], {
+                'supervisor': (USUARIO_SUPERVISOR, options['clave']),
+                'control_calidad': (USUARIO_CALIDAD, options['clave']),
+            })
+        else:
+            cliente = ClienteDjango(usuarios_benchmark())
+
+        rng = random.Random(options['semilla'])
+        argumentos = {
+            'dashboard': {'repeticiones': options['repeticiones']},
+            'fin_turno': {'lineas': options['lineas']},
+            'firmas': {'cantidad': options['firmas']},
+            'conexiones': {'clientes': options['clientes'], 'repeticiones': options['repeticiones']},
+        }
+        nombres = list(ESCENARIOS) if options['escenario'] == 'todos' else [options['escenario']]
+        if 'conexiones' in nombres and not options['url']:
+            self.stdout.write(self.style.WARNING(
+                'conexiones sin --url no mide el manejo de conexiones del servidor'
+            ))
+
+        reporte = {}
+        for nombre in nombres:
+            try:
+                fases = ESCENARIOS[nombre](rng, **argumentos[nombre])
+            except ValueError as e:
+                raise CommandError(f'{nombre}: {e}')
+            concurrencia = options['concurrencia'] or (
+                options['clientes'] if nombre == 'conexiones' else CONCURRENCIA_POR_DEFECTO
+            )
+            medidas, segundos = ejecutar(cliente, fases, concurrencia)
+            reporte[nombre] = resumir(medidas, segundos)
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\n{nombre} ({len(medidas)} peticiones en {segundos:.2f} s)'))
+            self.imprimir(reporte[nombre])
+
+        if options['salida_json']:
+            with open(options['salida_json'], 'w', encoding='utf-8') as archivo:
+                json.dump(reporte, archivo, ensure_ascii=False, indent=2)
+
+        if options['base']:
+            with open(options['base'], encoding='utf-8') as archivo:
+                base = json.load(archivo)
+            regresiones = [
+                f'{nombre}: {regresion}'
+                for nombre, filas in reporte.items()
+                for regresion in comparar(filas, base.get(nombre, []), options['tolerancia'])
+            ]
+            if regresiones:
+                raise CommandError('Regresiones frente a la base:\n' + '\n'.join(regresiones))
+            self.stdout.write(self.style.SUCCESS('Sin regresiones frente a la base'))
+
+    def imprimir(self, filas):
+        self.stdout.write(' '.join(titulo.rjust(ancho) if i else titulo.ljust(ancho)
+                                   for i, (_, titulo, ancho) in enumerate(COLUMNAS)))
+        for fila in filas:
+            self.stdout.write(' '.join(
+                str('-' if fila[clave] is None else fila[clave]).rjust(ancho) if i
+                else str(fila[clave]).ljust(ancho)
+                for i, (clave, _, ancho) in enumerate(COLUMNAS)
+            ))
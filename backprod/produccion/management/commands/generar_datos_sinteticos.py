@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from produccion.sinteticos import CLAVE_POR_DEFECTO, PREFIJO_PRODUCTO, generar_datos, limpiar_datos
+from produccion.models import Tarea
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera datos sintéticos reproducibles (líneas, colaboradores y un año de '
+        'tareas, eventos y trazabilidades) para benchmarks. No usar en producción'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=365, help='Días de historia hasta ayer')
+        parser.add_argument('--lineas', type=int, default=20, help='Líneas que producen cada día')
+        parser.add_argument('--colaboradores', type=int, default=3000, help='Colaboradores sintéticos')
+        parser.add_argument('--productos', type=int, default=40, help='Productos sintéticos (con receta)')
+        parser.add_argument('--semilla', type=int, default=42, help='Semilla del generador aleatorio')
+        parser.add_argument(
+            '--clave',
+            default=CLAVE_POR_DEFECTO,
+            help='Contraseña de los usuarios bench_supervisor y bench_calidad (sólo al crearlos)'
+        )
+        parser.add_argument(
+            '--limpiar',
+            action='store_true',
+            help='Borra los datos sintéticos existentes antes de generar'
+        )
+        parser.add_argument(
+            '--solo-limpiar',
+            action='store_true',
+            help='Borra los datos sintéticos y termina'
+        )
+
+    def handle(self, *args, **options):
+        if options['limpiar'] or options['solo_limpiar']:
+            borradas = limpiar_datos()
+            self.stdout.write(f'{borradas} tarea(s) sintética(s) borrada(s)')
+            if options['solo_limpiar']:
+                return
+        elif Tarea.objects.filter(producto__codigo__startswith=PREFIJO_PRODUCTO).exists():
+            raise CommandError('Ya hay datos sintéticos; usar --limpiar para regenerarlos')
+
+        if options['dias'] < 1 or options['lineas'] < 1 or options['colaboradores'] < 1:
+            raise CommandError('"--dias", "--lineas" y "--colaboradores" deben ser mayores que 0')
+
+        def progreso(desde, hasta, total):
+            self.stdout.write(f'{desde} a {hasta}: {total} trazabilidad(es)')
+
+        total = generar_datos(
+            dias=options['dias'],
+            lineas=options['lineas'],
+            colaboradores=options['colaboradores'],
+            productos=options['productos'],
+            semilla=options['semilla'],
+            clave=options['clave'],
+            progreso=progreso,
+        )
+        self.stdout.write(self.style.SUCCESS(f'{total} trazabilidad(es) sintética(s) generada(s)'))
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from produccion.importacion import procesar_importaciones_pendientes
+
+
+class Command(BaseCommand):
+    help = 'Worker que procesa las importaciones de colaboradores encoladas en la base de datos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--una-vez',
+            action='store_true',
+            help='Vacía la cola una vez y termina (útil para cron)'
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=5,
+            help='Segundos de espera entre consultas cuando la cola está vacía'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            procesadas = procesar_importaciones_pendientes()
+            if procesadas:
+                self.stdout.write(self.style.SUCCESS(f'{procesadas} importación(es) procesada(s)'))
+
+            if options['una_vez']:
+                return
+
+            time.sleep(options['intervalo'])
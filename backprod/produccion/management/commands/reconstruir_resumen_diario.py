@@ -0,0 +1,52 @@
+from datetime import date, datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from produccion.resumenes import reconstruir_resumenes
+
+
+def _fecha(valor):
+    try:
+        return datetime.strptime(valor, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f'Fecha inválida "{valor}", se espera YYYY-MM-DD')
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el resumen de producción diario a partir de las trazabilidades'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--desde',
+            type=_fecha,
+            help='Primera fecha a reconstruir (YYYY-MM-DD). Por defecto, 30 días atrás'
+        )
+        parser.add_argument(
+            '--hasta',
+            type=_fecha,
+            help='Última fecha a reconstruir (YYYY-MM-DD). Por defecto, hoy'
+        )
+        parser.add_argument(
+            '--dias-por-lote',
+            type=int,
+            default=31,
+            help='Días que se reconstruyen en cada transacción'
+        )
+
+    def handle(self, *args, **options):
+        hasta = options['hasta'] or date.today()
+        desde = options['desde'] or hasta - timedelta(days=30)
+        if desde > hasta:
+            raise CommandError('"--desde" no puede ser posterior a "--hasta"')
+
+        paso = timedelta(days=max(1, options['dias_por_lote']))
+        total = 0
+        inicio = desde
+        while inicio <= hasta:
+            fin = min(inicio + paso - timedelta(days=1), hasta)
+            creados = reconstruir_resumenes(inicio, fin)
+            total += creados
+            self.stdout.write(f'{inicio} a {fin}: {creados} resumen(es)')
+            inicio = fin + timedelta(days=1)
+
+        self.stdout.write(self.style.SUCCESS(f'{total} resumen(es) reconstruido(s) entre {desde} y {hasta}'))
@@ -0,0 +1,235 @@
+import bisect
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, FilteredRelation, Q
+
+from .models import Linea, EventoProceso, Trazabilidad, FirmaTrazabilidad
+
+
+# Límites (le) de los histogramas, en segundos y en consultas por petición
+LIMITES_DURACION = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+LIMITES_CONSULTAS = (1, 2, 5, 10, 20, 50, 100, 250, 500, 1000)
+
+# Vigencia de los indicadores de planta: con scrapes cada 15 s, como mucho
+# un cálculo cada este plazo por proceso
+SEGUNDOS_CACHE_INDICADORES = 30
+
+
+# ============================================================================
+# REGISTRO DE PETICIONES (lo alimenta InstrumentacionMiddleware)
+# ============================================================================
+class Histograma:
+    """Histograma acumulado por etiqueta, en el formato de Prometheus"""
+
+    def __init__(self, limites):
+        self.limites = limites
+        self.series = defaultdict(lambda: [[0] * (len(limites) + 1), 0.0])
+
+    def observar(self, etiqueta, valor):
+        cubetas, _ = serie = self.series[etiqueta]
+        cubetas[bisect.bisect_left(self.limites, valor)] += 1
+        serie[1] += valor
+
+    def lineas(self, nombre, nombre_etiqueta):
+        for etiqueta, (cubetas, suma) in sorted(self.series.items()):
+            acumulado = 0
+            for limite, cantidad in zip(self.limites + ('+Inf',), cubetas):
+                acumulado += cantidad
+                yield _linea(f'{nombre}_bucket', {nombre_etiqueta: etiqueta, 'le': limite}, acumulado)
+            yield _linea(f'{nombre}_sum', {nombre_etiqueta: etiqueta}, suma)
+            yield _linea(f'{nombre}_count', {nombre_etiqueta: etiqueta}, acumulado)
+
+
+_bloqueo = threading.Lock()
+_duraciones = Histograma(LIMITES_DURACION)
+_consultas = Histograma(LIMITES_CONSULTAS)
+_tiempo_sql = defaultdict(float)
+_peticiones = defaultdict(int)
+
+
+def registrar_peticion(vista, estado, duracion, consultas, tiempo_sql):
+    with _bloqueo:
+        _duraciones.observar(vista, duracion)
+        _consultas.observar(vista, consultas)
+        _tiempo_sql[vista] += tiempo_sql
+        _peticiones[(vista, str(estado))] += 1
+
+
+# ============================================================================
+# INDICADORES DE PLANTA Y CONEXIONES
+# ============================================================================
+_bloqueo_indicadores = threading.Lock()
+_cache = {'indicadores': None, 'generado': 0.0}
+
+
+def calcular_indicadores():
+    """
+    Tareas en curso y eventos abiertos por línea, trazabilidades en revisión
+    sin cada firma y conexiones a la base. Cinco consultas agregadas, todas
+    sobre conjuntos acotados por índices: tareas.estado y los parciales de
+    eventos abiertos y trazabilidades en revisión. Las firmas pendientes
+    salen de restar conteos en vez de un anti-join.
+    """
+    # La condición va en el JOIN (FilteredRelation) para usar el índice de estado
+    en_curso = dict(
+        Linea.objects
+        .annotate(tareas_en_curso=FilteredRelation('tareas', condition=Q(tareas__estado='en_curso')))
+        .values_list('nombre')
+        .annotate(total=Count('tareas_en_curso'))
+        .order_by()
+    )
+    eventos = dict(
+        EventoProceso.objects
+        .filter(hora_fin__isnull=True)
+        .values_list('hoja_procesos__tarea__linea__nombre')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+
+    # Las liberadas y retenidas ya no esperan firma: no se cuentan
+    total = Trazabilidad.objects.filter(estado='en_revision').count()
+    firmadas = dict(
+        FirmaTrazabilidad.objects
+        .filter(trazabilidad__estado='en_revision')
+        .values_list('tipo_firma')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+
+    return {
+        'tareas_en_curso': en_curso,
+        'eventos_abiertos': {nombre: eventos.get(nombre, 0) for nombre in en_curso},
+        'pendientes_firma': {
+            tipo: total - firmadas.get(tipo, 0) for tipo, _ in FirmaTrazabilidad.TIPOS_FIRMA
+        },
+        'conexiones': conexiones_base(),
+    }
+
+
+def conexiones_base():
+    """
+    Conexiones a la base de datos de la app por estado (pg_stat_activity) y
+    el máximo del servidor. Django 4.2 no tiene pool propio; esto muestra
+    cuánto del límite de Postgres ocupan los workers.
+    """
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT COALESCE(state, 'desconocido'), COUNT(*), current_setting('max_connections')::int "
+            "FROM pg_stat_activity WHERE datname = current_database() GROUP BY 1"
+        )
+        filas = cursor.fetchall()
+    return {
+        'por_estado': {estado: total for estado, total, _ in filas},
+        'maximas': filas[0][2] if filas else None,
+    }
+
+
+def obtener_indicadores():
+    vigencia = getattr(settings, 'METRICAS_SEGUNDOS_CACHE', SEGUNDOS_CACHE_INDICADORES)
+
+    # Un cálculo a la vez: los scrapes concurrentes esperan y usan el mismo
+    # resultado. Bloqueo propio, para no frenar a registrar_peticion
+    with _bloqueo_indicadores:
+        if _cache['indicadores'] is None or time.monotonic() - _cache['generado'] >= vigencia:
+            _cache['indicadores'] = calcular_indicadores()
+            _cache['generado'] = time.monotonic()
+        return _cache['indicadores']
+
+
+# ============================================================================
+# FORMATO DE EXPOSICIÓN
+# ============================================================================
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _linea(nombre, etiquetas, valor):
+    if etiquetas:
+        pares = ','.join(f'{clave}="{_escapar(v)}"' for clave, v in etiquetas.items())
+        return f'{nombre}{{{pares}}} {valor}'
+    return f'{nombre} {valor}'
+
+
+def _encabezado(nombre, tipo, ayuda):
+    yield f'# HELP {nombre} {ayuda}'
+    yield f'# TYPE {nombre} {tipo}'
+
+
+def generar_metricas():
+    """
+    Texto en el formato de exposición de Prometheus (versión 0.0.4).
+
+    Las métricas de peticiones son del proceso que responde: con varios
+    workers cada uno lleva las suyas, así que hay que scrapear cada worker
+    (o sumar por instancia en las consultas).
+    """
+    indicadores = obtener_indicadores()
+    salida = []
+
+    with _bloqueo:
+        salida += _encabezado(
+            'produccion_peticion_duracion_segundos', 'histogram',
+            'Duración de las peticiones por vista (Clase.accion)'
+        )
+        salida += _duraciones.lineas('produccion_peticion_duracion_segundos', 'vista')
+        salida += _encabezado(
+            'produccion_peticion_consultas', 'histogram', 'Consultas SQL por petición'
+        )
+        salida += _consultas.lineas('produccion_peticion_consultas', 'vista')
+        salida += _encabezado(
+            'produccion_peticion_sql_segundos_total', 'counter', 'Tiempo acumulado en SQL por vista'
+        )
+        salida += [
+            _linea('produccion_peticion_sql_segundos_total', {'vista': vista}, segundos)
+            for vista, segundos in sorted(_tiempo_sql.items())
+        ]
+        salida += _encabezado(
+            'produccion_peticiones_total', 'counter', 'Peticiones por vista y código de estado'
+        )
+        salida += [
+            _linea('produccion_peticiones_total', {'vista': vista, 'estado': estado}, total)
+            for (vista, estado), total in sorted(_peticiones.items())
+        ]
+
+    salida += _encabezado('produccion_tareas_en_curso', 'gauge', 'Tareas en curso por línea')
+    salida += [
+        _linea('produccion_tareas_en_curso', {'linea': linea}, total)
+        for linea, total in sorted(indicadores['tareas_en_curso'].items())
+    ]
+    salida += _encabezado(
+        'produccion_eventos_proceso_abiertos', 'gauge', 'Eventos de proceso sin hora de fin por línea'
+    )
+    salida += [
+        _linea('produccion_eventos_proceso_abiertos', {'linea': linea}, total)
+        for linea, total in sorted(indicadores['eventos_abiertos'].items())
+    ]
+    salida += _encabezado(
+        'produccion_trazabilidades_pendientes_firma', 'gauge',
+        'Trazabilidades en revisión sin cada tipo de firma'
+    )
+    salida += [
+        _linea('produccion_trazabilidades_pendientes_firma', {'tipo_firma': tipo}, total)
+        for tipo, total in indicadores['pendientes_firma'].items()
+    ]
+
+    conexiones = indicadores['conexiones']
+    if conexiones is not None:
+        salida += _encabezado(
+            'produccion_db_conexiones', 'gauge', 'Conexiones a la base de la app por estado'
+        )
+        salida += [
+            _linea('produccion_db_conexiones', {'estado': estado}, total)
+            for estado, total in sorted(conexiones['por_estado'].items())
+        ]
+        salida += _encabezado(
+            'produccion_db_conexiones_maximas', 'gauge', 'max_connections del servidor'
+        )
+        salida.append(_linea('produccion_db_conexiones_maximas', {}, conexiones['maximas']))
+
+    return '\n'.join(salida) + '\n'
@@ -0,0 +1,176 @@
+import logging
+import re
+import time
+import uuid
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.urls import Resolver404, resolve
+from django.utils.decorators import sync_and_async_middleware
+
+from .instrumentacion import Medicion, logger as logger_instrumentacion, medicion_actual, nombre_vista
+from .metricas import registrar_peticion
+from .registro import id_correlacion
+
+
+# Cabecera con la que llega (o se genera) el id y con la que se responde
+CABECERA_ID_CORRELACION = 'X-Request-ID'
+
+# Ids aceptados desde el cliente o un proxy; cualquier otro se reemplaza
+_ID_VALIDO = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+
+def _id_de_peticion(request):
+    recibido = request.headers.get(CABECERA_ID_CORRELACION, '')
+    return recibido if _ID_VALIDO.match(recibido) else uuid.uuid4().hex
+
+
+# ============================================================================
+# MIDDLEWARE: Id de correlación por petición
+# ============================================================================
+@sync_and_async_middleware
+def IdCorrelacionMiddleware(get_response):
+    """
+    Asigna a cada petición un id (el de X-Request-ID si viene uno válido)
+    que aparece en todos los logs de la petición y vuelve en la respuesta.
+    """
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            token = id_correlacion.set(_id_de_peticion(request))
+            try:
+                response = await get_response(request)
+                response[CABECERA_ID_CORRELACION] = id_correlacion.get()
+                return response
+            finally:
+                id_correlacion.reset(token)
+    else:
+        def middleware(request):
+            token = id_correlacion.set(_id_de_peticion(request))
+            try:
+                response = get_response(request)
+                response[CABECERA_ID_CORRELACION] = id_correlacion.get()
+                return response
+            finally:
+                id_correlacion.reset(token)
+
+    return middleware
+
+
+# ============================================================================
+# MIDDLEWARE: Consultas y tiempos por petición
+# ============================================================================
+def _ms(segundos):
+    return round(segundos * 1000, 1)
+
+
+def _vista_asincrona(request):
+    try:
+        vista = resolve(request.path_info, getattr(request, 'urlconf', None)).func
+    except Resolver404:
+        return False
+    return iscoroutinefunction(vista)
+
+
+class InstrumentacionMiddleware:
+    """
+    Mide cada petición: consultas y tiempo SQL (vía execute_wrapper),
+    tiempo de la vista sin SQL (serialización), de render y tamaño de la
+    respuesta. Responde con Server-Timing, acumula los histogramas de
+    /metrics y deja en el log (WARNING) las peticiones que pasan de
+    INSTRUMENTACION_UMBRAL_LENTO_MS con sus SQL más repetidas.
+
+    Bajo ASGI las vistas síncronas se miden en el hilo donde correrán (el de
+    sync_to_async con thread_sensitive), porque execute_wrapper envuelve la
+    conexión de ese hilo. Las vistas async (el stream de tiempo real) pasan
+    sin medir y sin salir del event loop. En respuestas streaming no cuenta
+    lo que pasa mientras se envía el cuerpo.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'INSTRUMENTACION_ACTIVA', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.medir(request, self.get_response)
+
+    async def __acall__(self, request):
+        if _vista_asincrona(request):
+            return await self.get_response(request)
+        return await sync_to_async(self.medir, thread_sensitive=True)(
+            request, async_to_sync(self.get_response)
+        )
+
+    def medir(self, request, get_response):
+        medicion = Medicion()
+        token = medicion_actual.set(medicion)
+        try:
+            with connection.execute_wrapper(medicion):
+                response = get_response(request)
+        finally:
+            medicion_actual.reset(token)
+        medicion.terminar_vista()
+
+        duracion = time.perf_counter() - medicion.inicio
+        if getattr(settings, 'INSTRUMENTACION_SERVER_TIMING', True):
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={_ms(medicion.tiempo_sql)};desc="{medicion.consultas} consultas"',
+                f'serializacion;dur={_ms(medicion.tiempo_serializacion)}',
+                f'render;dur={_ms(medicion.tiempo_render)}',
+                f'total;dur={_ms(duracion)}',
+            ])
+        registrar_peticion(
+            medicion.vista, response.status_code, duracion, medicion.consultas, medicion.tiempo_sql
+        )
+        self.registrar(request, response, medicion, duracion)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        medicion = medicion_actual.get()
+        if medicion is not None:
+            medicion.iniciar_vista(nombre_vista(request, view_func))
+
+    def process_template_response(self, request, response):
+        # Es el último process_template_response antes de render()
+        medicion = medicion_actual.get()
+        if medicion is not None:
+            medicion.terminar_vista()
+            medicion.iniciar_render()
+            response.add_post_render_callback(medicion.terminar_render)
+        return response
+
+    def registrar(self, request, response, medicion, duracion):
+        lenta = duracion * 1000 >= getattr(settings, 'INSTRUMENTACION_UMBRAL_LENTO_MS', 1000)
+        if not lenta and not logger_instrumentacion.isEnabledFor(logging.DEBUG):
+            return
+
+        if response.streaming:
+            tamanio = int(response['Content-Length']) if response.has_header('Content-Length') else None
+        else:
+            tamanio = len(response.content)
+        datos = {
+            'vista': medicion.vista,
+            'metodo': request.method,
+            'ruta': request.path,
+            'estado': response.status_code,
+            'duracion_ms': _ms(duracion),
+            'consultas': medicion.consultas,
+            'sql_ms': _ms(medicion.tiempo_sql),
+            'serializacion_ms': _ms(medicion.tiempo_serializacion),
+            'render_ms': _ms(medicion.tiempo_render),
+            'bytes': tamanio,
+        }
+        if lenta:
+            datos['sql_repetidas'] = medicion.sql_repetidas()
+            logger_instrumentacion.warning('Petición lenta', extra=datos)
+        else:
+            logger_instrumentacion.debug('Petición', extra=datos)
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:02
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('produccion', '0006_cargar_materia_prima'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportacionColaboradores',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('archivo', models.FileField(help_text='Excel subido con la planilla de colaboradores', upload_to='importaciones/colaboradores/%Y/%m/%d/')),
+                ('desactivar_ausentes', models.BooleanField(default=False, help_text='Desactiva los colaboradores que no vienen en la planilla')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'Procesando'), ('completada', 'Completada'), ('fallida', 'Fallida')], default='pendiente', help_text='Estado del procesamiento', max_length=20)),
+                ('total_filas', models.PositiveIntegerField(blank=True, help_text='Filas de datos informadas por la hoja (estimado)', null=True)),
+                ('filas_procesadas', models.PositiveIntegerField(default=0, help_text='Filas válidas importadas hasta el momento')),
+                ('creados', models.PositiveIntegerField(default=0)),
+                ('actualizados', models.PositiveIntegerField(default=0)),
+                ('desactivados', models.PositiveIntegerField(default=0)),
+                ('total_errores', models.PositiveIntegerField(default=0, help_text='Cantidad de filas con error')),
+                ('errores', models.JSONField(blank=True, default=list, help_text="Errores por fila: [{'fila': 12, 'error': '...'}]")),
+                ('mensaje_error', models.TextField(blank=True, help_text='Error que detuvo el procesamiento, si lo hubo', null=True)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, help_text='Fecha y hora en que se subió la planilla')),
+                ('fecha_inicio', models.DateTimeField(blank=True, help_text='Fecha y hora en que el worker tomó la importación', null=True)),
+                ('fecha_finalizacion', models.DateTimeField(blank=True, help_text='Fecha y hora en que terminó el procesamiento', null=True)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, help_text='Último avance registrado (sirve para detectar workers caídos)')),
+                ('usuario', models.ForeignKey(blank=True, help_text='Usuario que subió la planilla', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='importaciones_colaboradores', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Importación de Colaboradores',
+                'verbose_name_plural': 'Importaciones de Colaboradores',
+                'db_table': 'importaciones_colaboradores',
+                'ordering': ['-fecha_creacion'],
+                'indexes': [models.Index(fields=['estado', 'fecha_creacion'], name='importacion_estado_f0444f_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('produccion', '0007_importacion_colaboradores'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='hojaprocesos',
+            index=models.Index(fields=['-fecha_inicio', '-id'], name='hojas_proce_fecha_i_6ada1d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trazabilidad',
+            index=models.Index(fields=['-fecha_creacion', '-id'], name='trazabilida_fecha_c_cfe36e_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('produccion', '0008_indices_paginacion_cursor'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='trazabilidad',
+            index=models.Index(fields=['juliano', 'fecha_creacion'], name='trazabilida_juliano_a074fb_idx'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:08
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def completar_fecha_produccion(apps, schema_editor):
+    """
+    Calcula fecha_produccion de las trazabilidades existentes: día local del
+    inicio de la tarea, o la fecha planificada si no tiene inicio.
+    """
+    Trazabilidad = apps.get_model('produccion', 'Trazabilidad')
+
+    pendientes = Trazabilidad.objects.filter(
+        fecha_produccion__isnull=True
+    ).select_related('hoja_procesos__tarea').only(
+        'id', 'hoja_procesos__tarea__fecha', 'hoja_procesos__tarea__fecha_inicio'
+    )
+
+    lote = []
+    for trazabilidad in pendientes.iterator(chunk_size=2000):
+        tarea = trazabilidad.hoja_procesos.tarea
+        if tarea.fecha_inicio:
+            trazabilidad.fecha_produccion = timezone.localdate(tarea.fecha_inicio)
+        else:
+            trazabilidad.fecha_produccion = tarea.fecha
+        lote.append(trazabilidad)
+
+        if len(lote) >= 2000:
+            Trazabilidad.objects.bulk_update(lote, ['fecha_produccion'])
+            lote = []
+
+    if lote:
+        Trazabilidad.objects.bulk_update(lote, ['fecha_produccion'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('produccion', '0009_indice_juliano_trazabilidad'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trazabilidad',
+            name='fecha_produccion',
+            field=models.DateField(db_index=True, editable=False, help_text='Fecha local de elaboración (inicio de la tarea). Se usa para filtrar por fecha', null=True, verbose_name='Fecha de Producción'),
+        ),
+        migrations.RunPython(completar_fecha_produccion, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:09
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def verificar_tareas_en_curso(apps, schema_editor):
+    """
+    Aborta con un mensaje claro si alguna línea tiene más de una tarea en
+    curso; hay que finalizarlas a mano antes de crear el índice único.
+    """
+    Tarea = apps.get_model('produccion', 'Tarea')
+
+    duplicadas = list(
+        Tarea.objects.filter(estado='en_curso')
+        .values('linea_id')
+        .annotate(total=Count('id'))
+        .filter(total__gt=1)
+    )
+    if duplicadas:
+        detalle = ', '.join(
+            f"línea {fila['linea_id']}: {fila['total']} tareas" for fila in duplicadas
+        )
+        raise RuntimeError(
+            f'Hay líneas con más de una tarea en curso ({detalle}). '
+            'Finalice las sobrantes antes de aplicar esta migración.'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('produccion', '0010_fecha_produccion_trazabilidad'),
+    ]
+
+    operations = [
+        migrations.RunPython(verificar_tareas_en_curso, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='tarea',
+            constraint=models.UniqueConstraint(condition=models.Q(('estado', 'en_curso')), fields=('linea',), name='una_tarea_en_curso_por_linea'),
+        ),
+    ]
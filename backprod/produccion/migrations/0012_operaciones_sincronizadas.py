@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('produccion', '0011_una_tarea_en_curso_por_linea'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OperacionSincronizada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(help_text='Clave de idempotencia generada por la tablet', max_length=64, unique=True)),
+                ('tipo', models.CharField(help_text='Modelo afectado (hoja_procesos, evento_proceso, trazabilidad)', max_length=30)),
+                ('accion', models.CharField(help_text='Acción aplicada (crear, actualizar, finalizar)', max_length=20)),
+                ('objeto_id', models.PositiveIntegerField(blank=True, help_text='Id en el servidor del objeto creado o modificado', null=True)),
+                ('resultado', models.JSONField(default=dict, help_text='Respuesta entregada a la tablet')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Operación Sincronizada',
+                'verbose_name_plural': 'Operaciones Sincronizadas',
+                'db_table': 'operaciones_sincronizadas',
+                'ordering': ['-fecha_creacion'],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('produccion', '0012_operaciones_sincronizadas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenProduccionDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(help_text='Fecha de producción (fecha_produccion de la trazabilidad)')),
+                ('trazabilidades', models.PositiveIntegerField(default=0, help_text='Trazabilidades registradas')),
+                ('cantidad_producida', models.PositiveIntegerField(default=0)),
+                ('meta_produccion', models.PositiveIntegerField(default=0, help_text='Suma de las metas de las tareas con trazabilidad')),
+                ('materia_prima_kg', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('materia_prima_unidades', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('merma_kg', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('merma_unidades', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('reproceso_kg', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('reproceso_unidades', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+                ('linea', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_diarios', to='produccion.linea')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_diarios', to='produccion.producto')),
+                ('turno', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_diarios', to='produccion.turno')),
+            ],
+            options={
+                'verbose_name': 'Resumen de Producción Diario',
+                'verbose_name_plural': 'Resúmenes de Producción Diarios',
+                'db_table': 'resumenes_produccion_diarios',
+                'ordering': ['-fecha', 'linea_id', 'turno_id', 'producto_id'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='resumenproducciondiario',
+            constraint=models.UniqueConstraint(fields=('fecha', 'linea', 'turno', 'producto'), name='resumen_diario_unico'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('produccion', '0013_resumen_produccion_diario'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='trazabilidad',
+            index=models.Index(fields=['lote'], name='trazabilidad_lote_patron_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='trazabilidadmateriaprima',
+            index=models.Index(fields=['lote'], name='tmp_lote_patron_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
@@ -0,0 +1,70 @@
+from django.db import migrations
+
+
+# (tabla, columna) con índice GIN de trigramas sobre f_unaccent(lower(columna)),
+# la misma expresión que arma busqueda.Normalizado
+COLUMNAS_BUSQUEDA = [
+    ('productos', 'codigo'),
+    ('productos', 'nombre'),
+    ('materias_primas', 'codigo'),
+    ('materias_primas', 'nombre'),
+    ('colaboradores', 'nombre'),
+    ('colaboradores', 'apellido'),
+    ('tareas', 'observaciones'),
+    ('trazabilidades', 'lote'),
+    ('trazabilidad_materias_primas', 'lote'),
+]
+
+
+def _nombre_indice(tabla, columna):
+    return f'{tabla}_{columna}_trgm_idx'
+
+
+def crear_busqueda(apps, schema_editor):
+    """
+    Sólo en Postgres: extensiones pg_trgm y unaccent, f_unaccent (unaccent
+    no es IMMUTABLE y no se puede indexar directamente) e índices GIN.
+    En SQLite f_unaccent se registra al conectar (busqueda.py).
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS unaccent')
+    # Con el esquema explícito: los índices se evalúan también con un
+    # search_path vacío (pg_restore, autovacuum)
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT extnamespace::regnamespace::text FROM pg_extension WHERE extname = 'unaccent'"
+        )
+        esquema = cursor.fetchone()[0]
+    schema_editor.execute(
+        "CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text "
+        "LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT AS "
+        f"$$ SELECT {esquema}.unaccent('{esquema}.unaccent'::regdictionary, $1) $$"
+    )
+    for tabla, columna in COLUMNAS_BUSQUEDA:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {_nombre_indice(tabla, columna)} '
+            f'ON {tabla} USING gin (f_unaccent(lower({columna})) gin_trgm_ops)'
+        )
+
+
+def eliminar_busqueda(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    for tabla, columna in COLUMNAS_BUSQUEDA:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {_nombre_indice(tabla, columna)}')
+    schema_editor.execute('DROP FUNCTION IF EXISTS f_unaccent(text)')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('produccion', '0014_indices_lotes_recall'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_busqueda, eliminar_busqueda),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('produccion', '0015_busqueda_trigramas'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='eventoproceso',
+            index=models.Index(condition=models.Q(('hora_fin__isnull', True)), fields=['hoja_procesos'], name='evento_proceso_abierto_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('produccion', '0016_indice_eventos_abiertos'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='trazabilidad',
+            name='trazabilida_juliano_a074fb_idx',
+        ),
+        migrations.AddIndex(
+            model_name='trazabilidad',
+            index=models.Index(fields=['juliano', 'fecha_produccion'], name='trazabilida_juliano_1b55c5_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('produccion', '0017_indice_juliano_fecha_produccion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='unidades_por_hora',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Unidades por hora de producción a ritmo ideal. Sin ella no se calcula el rendimiento (OEE)', max_digits=10, null=True, verbose_name='Tasa ideal'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('produccion', '0018_tasa_ideal_producto'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='trazabilidad',
+            index=models.Index(condition=models.Q(('estado', 'en_revision')), fields=['id'], name='trazabilidad_en_revision_idx'),
+        ),
+    ]
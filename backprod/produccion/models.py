@@ -2,14 +2,20 @@
 
 # Create your models here.
 
-from django.db import models
+from django.db import models, transaction, IntegrityError
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MinValueValidator
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 from datetime import date, datetime
+import logging
+
 from .validators import validate_image_file
 
 
+logger = logging.getLogger(__name__)
+
+
 # ============================================================================
 # MODELO: Usuario
 # ============================================================================
@@ -201,6 +207,15 @@ class Producto(models.Model):
         default='UN',
         help_text='Unidad de medida del producto (generalmente UN para unidades)'
     )
+
+    unidades_por_hora = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        blank=True,
+        null=True,
+        verbose_name='Tasa ideal',
+        help_text='Unidades por hora de producción a ritmo ideal. Sin ella no se calcula el rendimiento (OEE)'
+    )
     
     descripcion = models.TextField(
         blank=True,
@@ -312,6 +327,14 @@ class Receta(models.Model):
         return f"{self.producto.codigo} - {self.materia_prima.nombre}"
 
 
+class TareaEnCursoError(ValidationError):
+    """La línea ya tiene otra tarea en curso (`tarea_en_curso`, puede ser None)"""
+    
+    def __init__(self, linea, tarea_en_curso=None):
+        self.tarea_en_curso = tarea_en_curso
+        super().__init__(f'Ya hay una tarea en curso en {linea.nombre}')
+
+
 # ============================================================================
 # MODELO: Tarea
 # ============================================================================
@@ -403,10 +426,28 @@ class Tarea(models.Model):
             models.Index(fields=['estado']),
             models.Index(fields=['fecha']),
         ]
+        constraints = [
+            # Una sola tarea en curso por línea, garantizado por la base
+            models.UniqueConstraint(
+                fields=['linea'],
+                condition=models.Q(estado='en_curso'),
+                name='una_tarea_en_curso_por_linea',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.fecha} - {self.linea.nombre} - {self.turno.nombre} - {self.producto.codigo}"
     
+    @property
+    def fecha_produccion(self):
+        """
+        Fecha real de elaboración: día local (TIME_ZONE) en que se inició la
+        tarea, o la fecha planificada si aún no se inicia.
+        """
+        if self.fecha_inicio:
+            return timezone.localdate(self.fecha_inicio)
+        return self.fecha
+    
     def clean(self):
         """Validaciones personalizadas del modelo"""
         super().clean()
@@ -428,18 +469,47 @@ class Tarea(models.Model):
                 })
     
     def iniciar(self):
-        """Marca la tarea como en curso"""
-        from django.utils import timezone
+        """
+        Marca la tarea como en curso con un UPDATE condicional (estado =
+        'pendiente'), que toma el lock de la fila. Si otra tarea de la línea ya
+        está en curso, el índice único parcial rechaza el cambio aunque dos
+        tablets inicien al mismo tiempo.
         
-        if self.estado != 'pendiente':
-            raise ValidationError('Solo se pueden iniciar tareas pendientes')
+        Raises:
+            TareaEnCursoError: la línea ya tiene una tarea en curso
+            ValidationError: la tarea no está pendiente
+        """
+        ahora = timezone.now()
         
-        if Tarea.objects.filter(linea=self.linea, estado='en_curso').exists():
-            raise ValidationError(f'Ya hay una tarea en curso en {self.linea.nombre}')
+        try:
+            with transaction.atomic():
+                actualizadas = Tarea.objects.filter(
+                    pk=self.pk,
+                    estado='pendiente'
+                ).update(estado='en_curso', fecha_inicio=ahora)
+        except IntegrityError:
+            raise TareaEnCursoError(self.linea, self.tarea_en_curso_de_linea())
+        
+        if not actualizadas:
+            self.refresh_from_db(fields=['estado', 'fecha_inicio'])
+            raise ValidationError('Solo se pueden iniciar tareas pendientes')
         
         self.estado = 'en_curso'
-        self.fecha_inicio = timezone.now()
-        self.save()
+        self.fecha_inicio = ahora
+        
+        # update() no emite post_save; avisar igual a los receptores (tiempo real)
+        models.signals.post_save.send(
+            sender=Tarea, instance=self, created=False,
+            update_fields=frozenset(['estado', 'fecha_inicio']),
+            raw=False, using=self._state.db
+        )
+    
+    def tarea_en_curso_de_linea(self):
+        """Otra tarea en curso en la misma línea, o None"""
+        return Tarea.objects.select_related('producto').filter(
+            linea_id=self.linea_id,
+            estado='en_curso'
+        ).exclude(pk=self.pk).first()
     
     def finalizar(self):
         """Marca la tarea como finalizada"""
@@ -608,6 +678,10 @@ class HojaProcesos(models.Model):
         verbose_name = 'Hoja de Procesos'
         verbose_name_plural = 'Hojas de Procesos'
         ordering = ['-fecha_inicio']
+        indexes = [
+            # Clave del cursor de paginación
+            models.Index(fields=['-fecha_inicio', '-id']),
+        ]
     
     def __str__(self):
         return f"Hoja Procesos - {self.tarea}"
@@ -665,6 +739,14 @@ class EventoProceso(models.Model):
         verbose_name = 'Evento de Proceso'
         verbose_name_plural = 'Eventos de Procesos'
         ordering = ['hora_inicio']
+        indexes = [
+            # Eventos abiertos (sin hora de fin): sólo indexa los que están en curso
+            models.Index(
+                fields=['hoja_procesos'],
+                condition=models.Q(hora_fin__isnull=True),
+                name='evento_proceso_abierto_idx'
+            ),
+        ]
     
     def __str__(self):
         return f"{self.tipo_evento.nombre} - {self.hora_inicio.strftime('%H:%M')}"
@@ -740,6 +822,13 @@ class Trazabilidad(models.Model):
         help_text='Día juliano del año (1-366). Se calcula automáticamente desde fecha_creacion',
         editable=False,
     )
+    fecha_produccion = models.DateField(
+        null=True,
+        editable=False,
+        db_index=True,
+        verbose_name='Fecha de Producción',
+        help_text='Fecha local de elaboración (inicio de la tarea). Se usa para filtrar por fecha'
+    )
     lote = models.CharField(
         max_length=50,
         verbose_name='Lote',
@@ -777,6 +866,24 @@ class Trazabilidad(models.Model):
         verbose_name = 'Trazabilidad'
         verbose_name_plural = 'Trazabilidades'
         ordering = ['-fecha_creacion']
+        indexes = [
+            # Clave del cursor de paginación
+            models.Index(fields=['-fecha_creacion', '-id']),
+            # Búsquedas de QA por día juliano (y año de elaboración)
+            models.Index(fields=['juliano', 'fecha_produccion']),
+            # Genealogía de un lote terminado (igualdad y prefijo)
+            models.Index(
+                fields=['lote'],
+                name='trazabilidad_lote_patron_idx',
+                opclasses=['varchar_pattern_ops']
+            ),
+            # Trazabilidades en revisión (firmas pendientes en /metrics)
+            models.Index(
+                fields=['id'],
+                condition=models.Q(estado='en_revision'),
+                name='trazabilidad_en_revision_idx'
+            ),
+        ]
     
     def __str__(self):
         return f"Trazabilidad {self.lote} - {self.hoja_procesos.tarea}"
@@ -852,11 +959,18 @@ class Trazabilidad(models.Model):
     def save(self, *args, **kwargs):
         """
         Sobrescribir save para asegurar que juliano nunca cambia después de creación
+        y que fecha_produccion queda fijada aunque no se cree por la API
         """
+        if self.fecha_produccion is None:
+            self.fecha_produccion = self.hoja_procesos.tarea.fecha_produccion
+
         if self.pk:
             original = Trazabilidad.objects.get(pk=self.pk)
             if original.juliano and self.juliano != original.juliano:
-                print(f'⚠️  Intentando cambiar juliano de {original.juliano} a {self.juliano} - REVERTIDO')
+                logger.warning(
+                    'Intento de cambiar el juliano de una trazabilidad; se mantiene el original',
+                    extra={'trazabilidad': self.pk, 'juliano': original.juliano, 'juliano_nuevo': self.juliano}
+                )
                 self.juliano = original.juliano
         
         super().save(*args, **kwargs)
@@ -910,6 +1024,15 @@ class TrazabilidadMateriaPrima(models.Model):
         verbose_name_plural = 'Materias Primas Usadas'
         unique_together = ['trazabilidad', 'materia_prima']
         ordering = ['materia_prima__codigo']
+        indexes = [
+            # Recall de lotes de proveedor: igualdad y prefijo (LIKE 'x%')
+            # sobre el lote; varchar_pattern_ops sirve para ambos en Postgres
+            models.Index(
+                fields=['lote'],
+                name='tmp_lote_patron_idx',
+                opclasses=['varchar_pattern_ops']
+            ),
+        ]
     
     def __str__(self):
         return f"{self.materia_prima.nombre} - {self.cantidad_usada} {self.get_unidad_medida_display()}"
@@ -1145,4 +1268,260 @@ class TrazabilidadColaborador(models.Model):
         ordering = ['fecha_asignacion']
     
     def __str__(self):
-        return f"{self.colaborador.nombre} - Trazabilidad #{self.trazabilidad.id}"
\ No newline at end of file
+        return f"{self.colaborador.nombre} - Trazabilidad #{self.trazabilidad.id}"
+
+# ============================================================================
+# MODELO: ImportacionColaboradores
+# ============================================================================
+class ImportacionColaboradores(models.Model):
+    ESTADOS = [
+        ('pendiente', 'Pendiente'),
+        ('procesando', 'Procesando'),
+        ('completada', 'Completada'),
+        ('fallida', 'Fallida'),
+    ]
+    
+    archivo = models.FileField(
+        upload_to='importaciones/colaboradores/%Y/%m/%d/',
+        help_text="Excel subido con la planilla de colaboradores"
+    )
+    
+    usuario = models.ForeignKey(
+        Usuario,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='importaciones_colaboradores',
+        help_text="Usuario que subió la planilla"
+    )
+    
+    desactivar_ausentes = models.BooleanField(
+        default=False,
+        help_text="Desactiva los colaboradores que no vienen en la planilla"
+    )
+    
+    estado = models.CharField(
+        max_length=20,
+        choices=ESTADOS,
+        default='pendiente',
+        help_text="Estado del procesamiento"
+    )
+    
+    total_filas = models.PositiveIntegerField(
+        blank=True,
+        null=True,
+        help_text="Filas de datos informadas por la hoja (estimado)"
+    )
+    
+    filas_procesadas = models.PositiveIntegerField(
+        default=0,
+        help_text="Filas válidas importadas hasta el momento"
+    )
+    
+    creados = models.PositiveIntegerField(default=0)
+    actualizados = models.PositiveIntegerField(default=0)
+    desactivados = models.PositiveIntegerField(default=0)
+    
+    total_errores = models.PositiveIntegerField(
+        default=0,
+        help_text="Cantidad de filas con error"
+    )
+    
+    errores = models.JSONField(
+        default=list,
+        blank=True,
+        help_text="Errores por fila: [{'fila': 12, 'error': '...'}]"
+    )
+    
+    mensaje_error = models.TextField(
+        blank=True,
+        null=True,
+        help_text="Error que detuvo el procesamiento, si lo hubo"
+    )
+    
+    fecha_creacion = models.DateTimeField(
+        auto_now_add=True,
+        help_text="Fecha y hora en que se subió la planilla"
+    )
+    
+    fecha_inicio = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text="Fecha y hora en que el worker tomó la importación"
+    )
+    
+    fecha_finalizacion = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text="Fecha y hora en que terminó el procesamiento"
+    )
+    
+    fecha_actualizacion = models.DateTimeField(
+        auto_now=True,
+        help_text="Último avance registrado (sirve para detectar workers caídos)"
+    )
+    
+    class Meta:
+        db_table = 'importaciones_colaboradores'
+        verbose_name = 'Importación de Colaboradores'
+        verbose_name_plural = 'Importaciones de Colaboradores'
+        ordering = ['-fecha_creacion']
+        indexes = [
+            models.Index(fields=['estado', 'fecha_creacion']),
+        ]
+    
+    def __str__(self):
+        return f"Importación #{self.pk} - {self.get_estado_display()}"
+    
+    @property
+    def porcentaje(self):
+        """Avance estimado de 0 a 100"""
+        if self.estado == 'completada':
+            return 100
+        if not self.total_filas:
+            return 0
+        leidas = self.filas_procesadas + self.total_errores
+        return min(99, int(leidas * 100 / self.total_filas))
+
+
+# ============================================================================
+# MODELO: OperacionSincronizada
+# ============================================================================
+class OperacionSincronizada(models.Model):
+    """
+    Registro de cada operación aplicada desde /api/sync/. La clave única hace
+    idempotente el reenvío de un lote: una operación ya registrada no se
+    vuelve a aplicar y se responde con el resultado guardado.
+    """
+    clave = models.CharField(
+        max_length=64,
+        unique=True,
+        help_text="Clave de idempotencia generada por la tablet"
+    )
+    
+    tipo = models.CharField(
+        max_length=30,
+        help_text="Modelo afectado (hoja_procesos, evento_proceso, trazabilidad)"
+    )
+    
+    accion = models.CharField(
+        max_length=20,
+        help_text="Acción aplicada (crear, actualizar, finalizar)"
+    )
+    
+    objeto_id = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Id en el servidor del objeto creado o modificado"
+    )
+    
+    resultado = models.JSONField(
+        default=dict,
+        help_text="Respuesta entregada a la tablet"
+    )
+    
+    fecha_creacion = models.DateTimeField(
+        auto_now_add=True
+    )
+    
+    class Meta:
+        db_table = 'operaciones_sincronizadas'
+        verbose_name = 'Operación Sincronizada'
+        verbose_name_plural = 'Operaciones Sincronizadas'
+        ordering = ['-fecha_creacion']
+    
+    def __str__(self):
+        return f"{self.tipo}.{self.accion} ({self.clave})"
+
+
+# ============================================================================
+# MODELO: ResumenProduccionDiario
+# ============================================================================
+class ResumenProduccionDiario(models.Model):
+    """
+    Totales de producción por día, línea, turno y producto, para que los
+    dashboards no recorran las trazabilidades fila a fila. Se recalcula por
+    clave al confirmar cada cambio de trazabilidad (ver resumenes.py) y se
+    puede reconstruir con `manage.py reconstruir_resumen_diario`.
+    
+    Las cantidades de materia prima, merma y reproceso se separan por unidad
+    de medida porque no se pueden sumar kilos con unidades.
+    """
+    fecha = models.DateField(
+        help_text="Fecha de producción (fecha_produccion de la trazabilidad)"
+    )
+    
+    linea = models.ForeignKey(
+        Linea,
+        on_delete=models.CASCADE,
+        related_name='resumenes_diarios'
+    )
+    
+    turno = models.ForeignKey(
+        Turno,
+        on_delete=models.CASCADE,
+        related_name='resumenes_diarios'
+    )
+    
+    producto = models.ForeignKey(
+        Producto,
+        on_delete=models.CASCADE,
+        related_name='resumenes_diarios'
+    )
+    
+    trazabilidades = models.PositiveIntegerField(
+        default=0,
+        help_text="Trazabilidades registradas"
+    )
+    
+    cantidad_producida = models.PositiveIntegerField(
+        default=0
+    )
+    
+    meta_produccion = models.PositiveIntegerField(
+        default=0,
+        help_text="Suma de las metas de las tareas con trazabilidad"
+    )
+    
+    materia_prima_kg = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0
+    )
+    
+    materia_prima_unidades = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0
+    )
+    
+    merma_kg = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0
+    )
+    
+    merma_unidades = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0
+    )
+    
+    reproceso_kg = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0
+    )
+    
+    reproceso_unidades = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0
+    )
+    
+    fecha_actualizacion = models.DateTimeField(
+        auto_now=True
+    )
+    
+    class Meta:
+        db_table = 'resumenes_produccion_diarios'
+        verbose_name = 'Resumen de Producción Diario'
+        verbose_name_plural = 'Resúmenes de Producción Diarios'
+        ordering = ['-fecha', 'linea_id', 'turno_id', 'producto_id']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['fecha', 'linea', 'turno', 'producto'],
+                name='resumen_diario_unico'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.fecha} - Línea {self.linea_id} / Turno {self.turno_id} / Producto {self.producto_id}"
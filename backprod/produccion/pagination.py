@@ -0,0 +1,61 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class PaginacionCursor(CursorPagination):
+    """
+    Paginación por cursor (keyset): cada página filtra por la clave de orden
+    en vez de usar OFFSET, así el costo no crece con la profundidad.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def get_ordering(self, request, queryset, view):
+        # DRF tomaría el orden de OrderingFilter (?ordering=); el cursor sólo
+        # es estable con el orden fijo que le asigna PaginacionProduccion
+        return tuple(self.ordering)
+
+
+class PaginacionProduccion(PageNumberPagination):
+    """
+    Paginación por número de página (comportamiento histórico) con modo cursor
+    opcional.
+
+    El modo cursor se activa con `?paginacion=cursor` (primera página) o al
+    seguir un link `next`/`previous`, que ya trae `?cursor=...`. El orden del
+    cursor sale de `ordering_cursor` en la vista (o de `ordering` si no la
+    define) e ignora `?ordering=`. DRF posiciona el cursor sólo por el primer
+    campo, así que ese campo debe ser casi único (id, fecha_creacion): con
+    una fecha compartida por muchas filas el cursor cae en OFFSET dentro del
+    día y repite o salta filas si hay altas entre páginas.
+    """
+    parametro_modo = 'paginacion'
+
+    def __init__(self):
+        self.paginador_cursor = None
+
+    def usa_cursor(self, request, view):
+        if getattr(view, 'ordering', None) is None:
+            return False
+        return (
+            request.query_params.get(self.parametro_modo) == 'cursor'
+            or PaginacionCursor.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.usa_cursor(request, view):
+            return super().paginate_queryset(queryset, request, view)
+
+        self.paginador_cursor = PaginacionCursor()
+        self.paginador_cursor.ordering = getattr(view, 'ordering_cursor', view.ordering)
+        return self.paginador_cursor.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.paginador_cursor is not None:
+            return self.paginador_cursor.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def to_html(self):
+        if self.paginador_cursor is not None:
+            return self.paginador_cursor.to_html()
+        return super().to_html()
@@ -0,0 +1,85 @@
+import contextvars
+import json
+import logging
+import random
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+# Id de correlación de la petición en curso (lo fija IdCorrelacionMiddleware)
+id_correlacion = contextvars.ContextVar('id_correlacion', default=None)
+
+# Fracción de peticiones cuyo payload se vuelca en DEBUG (LOG_MUESTREO_PAYLOADS)
+MUESTREO_PAYLOADS = 0.1
+
+# Largo máximo de un texto dentro de un volcado de payload
+LARGO_MAXIMO_TEXTO = 100
+
+# Atributos estándar de LogRecord; todo lo demás vino por extra={...}
+_ATRIBUTOS_ESTANDAR = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {
+    'message', 'asctime', 'id_correlacion',
+}
+
+
+# ============================================================================
+# FILTRO Y FORMATO
+# ============================================================================
+class IdCorrelacionFilter(logging.Filter):
+    """Agrega el id de correlación de la petición a cada registro"""
+
+    def filter(self, record):
+        record.id_correlacion = id_correlacion.get() or '-'
+        return True
+
+
+class FormatoJSON(logging.Formatter):
+    """
+    Un objeto JSON por línea: fecha, nivel, logger, mensaje, id de
+    correlación, los campos pasados en extra={...} y el traceback si hay.
+    """
+
+    def format(self, record):
+        registro = {
+            'fecha': self.formatTime(record, '%Y-%m-%dT%H:%M:%S%z'),
+            'nivel': record.levelname,
+            'logger': record.name,
+            'mensaje': record.getMessage(),
+            'id_correlacion': getattr(record, 'id_correlacion', None) or id_correlacion.get(),
+        }
+        for campo, valor in vars(record).items():
+            if campo not in _ATRIBUTOS_ESTANDAR and not campo.startswith('_'):
+                registro[campo] = valor
+        if record.exc_info:
+            registro['excepcion'] = self.formatException(record.exc_info)
+        return json.dumps(registro, cls=DjangoJSONEncoder, ensure_ascii=False, default=str)
+
+
+# ============================================================================
+# VOLCADO DE PAYLOADS
+# ============================================================================
+def resumir(valor):
+    """Versión corta de un valor para el log: archivos, listas y textos largos"""
+    if isinstance(valor, UploadedFile):
+        return f'<archivo {valor.name} {valor.size} bytes {valor.content_type}>'
+    if isinstance(valor, (list, tuple)):
+        return f'<lista de {len(valor)} elementos>'
+    if isinstance(valor, str) and len(valor) > LARGO_MAXIMO_TEXTO:
+        return f'{valor[:LARGO_MAXIMO_TEXTO]}...'
+    return valor
+
+
+def registrar_payload(logger, mensaje, datos):
+    """
+    Vuelca un payload resumido en DEBUG, sólo para una muestra de las
+    peticiones. Con DEBUG desactivado no recorre ni copia los datos.
+    """
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    if random.random() >= getattr(settings, 'LOG_MUESTREO_PAYLOADS', MUESTREO_PAYLOADS):
+        return
+
+    logger.debug(mensaje, extra={
+        'payload': {campo: resumir(valor) for campo, valor in datos.items()}
+    })
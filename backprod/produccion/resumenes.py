@@ -0,0 +1,205 @@
+import threading
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+
+from .models import (
+    Trazabilidad, TrazabilidadMateriaPrima, Merma, Reproceso,
+    ResumenProduccionDiario,
+)
+
+
+# Clave de un resumen vista desde Trazabilidad: (fecha, linea, turno, producto)
+CAMPOS_CLAVE = (
+    'fecha_produccion',
+    'hoja_procesos__tarea__linea_id',
+    'hoja_procesos__tarea__turno_id',
+    'hoja_procesos__tarea__producto_id',
+)
+
+# Los mismos campos en ResumenProduccionDiario
+CAMPOS_RESUMEN = ('fecha', 'linea_id', 'turno_id', 'producto_id')
+
+
+# ============================================================================
+# CÁLCULO
+# ============================================================================
+def _valores_vacios():
+    return {
+        'trazabilidades': 0,
+        'cantidad_producida': 0,
+        'meta_produccion': 0,
+        'materia_prima_kg': Decimal('0'),
+        'materia_prima_unidades': Decimal('0'),
+        'merma_kg': Decimal('0'),
+        'merma_unidades': Decimal('0'),
+        'reproceso_kg': Decimal('0'),
+        'reproceso_unidades': Decimal('0'),
+    }
+
+
+def _sumar_por_unidad(resumenes, modelo, ruta, campo_cantidad, nombre, trazabilidades):
+    """
+    Suma `campo_cantidad` de `modelo` por clave y unidad de medida. `ruta`
+    lleva de `modelo` a TrazabilidadMateriaPrima ('' si es el mismo modelo).
+    """
+    ruta_unidad = f'{ruta}unidad_medida'
+    filas = (
+        modelo.objects
+        .filter(**{f'{ruta}trazabilidad__in': trazabilidades})
+        .values(*[f'{ruta}trazabilidad__{campo}' for campo in CAMPOS_CLAVE], ruta_unidad)
+        .annotate(total=Sum(campo_cantidad))
+        .order_by()
+    )
+    for fila in filas:
+        clave = tuple(fila[f'{ruta}trazabilidad__{campo}'] for campo in CAMPOS_CLAVE)
+        if clave not in resumenes:
+            continue
+        sufijo = 'unidades' if fila[ruta_unidad] == 'unidades' else 'kg'
+        resumenes[clave][f'{nombre}_{sufijo}'] += fila['total'] or 0
+
+
+def calcular_resumenes(trazabilidades):
+    """
+    Calcula los totales de un conjunto de trazabilidades agrupados por
+    (fecha, linea, turno, producto). Cuatro consultas agregadas, sin
+    importar cuántas filas de detalle haya.
+
+    Args:
+        trazabilidades: queryset de Trazabilidad
+
+    Returns:
+        dict: clave -> valores de ResumenProduccionDiario
+    """
+    trazabilidades = trazabilidades.filter(fecha_produccion__isnull=False)
+    resumenes = {}
+
+    filas = (
+        trazabilidades
+        .values(*CAMPOS_CLAVE)
+        .annotate(
+            total=Count('id'),
+            cantidad=Sum('cantidad_producida'),
+            meta=Sum('hoja_procesos__tarea__meta_produccion'),
+        )
+        .order_by()
+    )
+    for fila in filas:
+        valores = resumenes[tuple(fila[campo] for campo in CAMPOS_CLAVE)] = _valores_vacios()
+        valores['trazabilidades'] = fila['total']
+        valores['cantidad_producida'] = fila['cantidad'] or 0
+        valores['meta_produccion'] = fila['meta'] or 0
+
+    ids = trazabilidades.values('id')
+    _sumar_por_unidad(resumenes, TrazabilidadMateriaPrima, '', 'cantidad_usada', 'materia_prima', ids)
+    _sumar_por_unidad(resumenes, Merma, 'trazabilidad_materia_prima__', 'cantidad', 'merma', ids)
+    _sumar_por_unidad(resumenes, Reproceso, 'trazabilidad_materia_prima__', 'cantidad', 'reproceso', ids)
+
+    return resumenes
+
+
+def filtro_claves(claves):
+    """Q sobre Trazabilidad que selecciona las filas de las claves dadas"""
+    filtro = Q()
+    for clave in claves:
+        filtro |= Q(**dict(zip(CAMPOS_CLAVE, clave)))
+    return filtro
+
+
+def recalcular_resumenes(claves):
+    """
+    Recalcula sólo los resúmenes de las claves dadas a partir del detalle.
+    Una clave sin trazabilidades elimina su resumen.
+    """
+    claves = {clave for clave in claves if clave[0] is not None}
+    if not claves:
+        return
+
+    with transaction.atomic():
+        calculados = calcular_resumenes(Trazabilidad.objects.filter(filtro_claves(claves)))
+        for clave in claves:
+            filtro = dict(zip(CAMPOS_RESUMEN, clave))
+            if clave in calculados:
+                ResumenProduccionDiario.objects.update_or_create(**filtro, defaults=calculados[clave])
+            else:
+                ResumenProduccionDiario.objects.filter(**filtro).delete()
+
+
+def reconstruir_resumenes(desde, hasta):
+    """
+    Reemplaza todos los resúmenes entre `desde` y `hasta` (inclusive).
+
+    Returns:
+        int: resúmenes creados
+    """
+    with transaction.atomic():
+        calculados = calcular_resumenes(
+            Trazabilidad.objects.filter(fecha_produccion__range=(desde, hasta))
+        )
+        ResumenProduccionDiario.objects.filter(fecha__range=(desde, hasta)).delete()
+        ResumenProduccionDiario.objects.bulk_create(
+            [
+                ResumenProduccionDiario(**dict(zip(CAMPOS_RESUMEN, clave)), **valores)
+                for clave, valores in calculados.items()
+            ],
+            batch_size=1000
+        )
+    return len(calculados)
+
+
+# ============================================================================
+# ACTUALIZACIÓN INCREMENTAL (desde signals.py)
+# ============================================================================
+# Trazabilidades y claves por recalcular en la transacción en curso. Si se
+# revierte, quedan para el próximo commit: recalcular de más no cambia nada
+_pendientes = threading.local()
+
+
+def _pendientes_del_hilo():
+    if not hasattr(_pendientes, 'claves'):
+        _pendientes.claves = set()
+        _pendientes.trazabilidades = set()
+        _pendientes.materias_primas = set()
+    return _pendientes
+
+
+def programar_recalculo(trazabilidad_id=None, clave=None, materia_prima_id=None):
+    """
+    Marca una trazabilidad (o una clave ya conocida, o la materia prima
+    usada de una merma o reproceso) para recalcular su resumen al confirmar
+    la transacción. Varios cambios en la misma transacción (la trazabilidad
+    y sus materias primas, mermas y reprocesos) se recalculan una sola vez.
+    """
+    pendientes = _pendientes_del_hilo()
+    if trazabilidad_id is not None:
+        pendientes.trazabilidades.add(trazabilidad_id)
+    if clave is not None:
+        pendientes.claves.add(clave)
+    if materia_prima_id is not None:
+        pendientes.materias_primas.add(materia_prima_id)
+    transaction.on_commit(recalcular_pendientes, robust=True)
+
+
+def recalcular_pendientes():
+    pendientes = _pendientes_del_hilo()
+    claves, pendientes.claves = pendientes.claves, set()
+    ids, pendientes.trazabilidades = pendientes.trazabilidades, set()
+    materias_primas, pendientes.materias_primas = pendientes.materias_primas, set()
+
+    # Las materias primas borradas en la misma transacción ya no aparecen:
+    # su propio borrado programó la trazabilidad
+    if materias_primas:
+        ids |= set(
+            TrazabilidadMateriaPrima.objects
+            .filter(id__in=materias_primas)
+            .values_list('trazabilidad_id', flat=True)
+        )
+    if ids:
+        claves |= set(Trazabilidad.objects.filter(id__in=ids).values_list(*CAMPOS_CLAVE))
+    recalcular_resumenes(claves)
+
+
+def clave_de_trazabilidad(trazabilidad):
+    tarea = trazabilidad.hoja_procesos.tarea
+    return (trazabilidad.fecha_produccion, tarea.linea_id, tarea.turno_id, tarea.producto_id)
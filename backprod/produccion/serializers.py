@@ -5,10 +5,19 @@ from .models import (
     Tarea, TareaColaborador, Maquina, TipoEvento,
     HojaProcesos, EventoProceso, EventoMaquina,
     Trazabilidad, TrazabilidadMateriaPrima,
-    Reproceso, Merma, FotoEtiqueta, FirmaTrazabilidad, TrazabilidadColaborador
+    Reproceso, Merma, FotoEtiqueta, FirmaTrazabilidad, TrazabilidadColaborador,
+    ImportacionColaboradores, ResumenProduccionDiario
 )
 from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
 import json
+import logging
+
+from .importacion import importar_colaboradores, normalizar_codigo
+from .registro import registrar_payload
+
+
+logger = logging.getLogger(__name__)
 
 # ============================================================================
 # SERIALIZER: Usuario
@@ -85,6 +94,10 @@ class ColaboradorCreateSerializer(serializers.Serializer):
         ),
         allow_empty=False
     )
+    desactivar_ausentes = serializers.BooleanField(
+        default=False,
+        help_text='Desactiva los colaboradores que no vienen en la planilla'
+    )
     
     def validate_colaboradores(self, value):
         for colaborador in value:
@@ -94,33 +107,51 @@ class ColaboradorCreateSerializer(serializers.Serializer):
                 raise serializers.ValidationError("Cada colaborador debe tener un 'nombre'")
             if 'apellido' not in colaborador:
                 raise serializers.ValidationError("Cada colaborador debe tener un 'apellido'")
+            
+            try:
+                colaborador['codigo'] = normalizar_codigo(colaborador['codigo'])
+            except ValueError:
+                raise serializers.ValidationError(
+                    f"Código de colaborador inválido: {colaborador['codigo']}"
+                )
         
         return value
     
     def create(self, validated_data):
-        colaboradores_data = validated_data['colaboradores']
-        colaboradores_creados = []
-        colaboradores_actualizados = []
-        
-        for data in colaboradores_data:
-            colaborador, created = Colaborador.objects.update_or_create(
-                codigo=data['codigo'],
-                defaults={
-                    'nombre': data['nombre'],
-                    'apellido': data['apellido'],
-                    'activo': True
-                }
-            )
-            
-            if created:
-                colaboradores_creados.append(colaborador)
-            else:
-                colaboradores_actualizados.append(colaborador)
-        
-        return {
-            'creados': colaboradores_creados,
-            'actualizados': colaboradores_actualizados
-        }
+        return importar_colaboradores(
+            validated_data['colaboradores'],
+            desactivar=validated_data.get('desactivar_ausentes', False)
+        )
+
+
+# ============================================================================
+# SERIALIZER: Importación de Colaboradores
+# ============================================================================
+class ImportacionColaboradoresSerializer(serializers.ModelSerializer):
+    estado_display = serializers.CharField(source='get_estado_display', read_only=True)
+    porcentaje = serializers.IntegerField(read_only=True)
+    
+    class Meta:
+        model = ImportacionColaboradores
+        fields = [
+            'id',
+            'estado',
+            'estado_display',
+            'porcentaje',
+            'desactivar_ausentes',
+            'total_filas',
+            'filas_procesadas',
+            'creados',
+            'actualizados',
+            'desactivados',
+            'total_errores',
+            'errores',
+            'mensaje_error',
+            'fecha_creacion',
+            'fecha_inicio',
+            'fecha_finalizacion'
+        ]
+        read_only_fields = fields
 
 
 # ============================================================================
@@ -134,7 +165,10 @@ class ProductoSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Producto
-        fields = ['codigo', 'nombre', 'unidad_medida', 'unidad_medida_display', 'descripcion', 'activo']
+        fields = [
+            'codigo', 'nombre', 'unidad_medida', 'unidad_medida_display',
+            'unidades_por_hora', 'descripcion', 'activo'
+        ]
         read_only_fields = ['codigo']
 
 
@@ -183,7 +217,9 @@ class ProductoConRecetaSerializer(serializers.ModelSerializer):
         fields = ['codigo', 'nombre', 'unidad_medida', 'unidad_medida_display', 'descripcion', 'materias_primas']
     
     def get_materias_primas(self, obj):
-        recetas = obj.recetas.filter(activo=True).select_related('materia_prima').order_by('orden')
+        # Se lee desde recetas.all() para aprovechar el Prefetch de la vista
+        # (ver prefetch_recetas_activas); filtrar aquí haría una consulta por producto
+        recetas = [receta for receta in obj.recetas.all() if receta.activo]
         return [
             {
                 'codigo': receta.materia_prima.codigo,
@@ -310,7 +346,7 @@ class TareaDetailSerializer(serializers.ModelSerializer):
     
     def get_colaboradores(self, obj):
         return ColaboradorSerializer(
-            [tc.colaborador for tc in obj.tarea_colaboradores.select_related('colaborador')],
+            [tc.colaborador for tc in obj.tarea_colaboradores.all()],
             many=True
         ).data
 
@@ -453,7 +489,7 @@ class EventoProcesoListSerializer(serializers.ModelSerializer):
     
     def get_maquinas(self, obj):
         return MaquinaSerializer(
-            [em.maquina for em in obj.evento_maquinas.select_related('maquina')],
+            [em.maquina for em in obj.evento_maquinas.all()],
             many=True
         ).data
 
@@ -692,6 +728,7 @@ class TrazabilidadListSerializer(serializers.ModelSerializer):
             'hoja_procesos',
             'cantidad_producida',
             'juliano',
+            'fecha_produccion',
             'lote',
             'estado',
             'estado_display',
@@ -760,6 +797,7 @@ class TrazabilidadDetailSerializer(serializers.ModelSerializer):
             'hoja_procesos_detalle',
             'cantidad_producida',
             'juliano',
+            'fecha_produccion',
             'lote',
             'foto_etiquetas',
             'foto_etiquetas_url',
@@ -830,10 +868,8 @@ class TrazabilidadDetailSerializer(serializers.ModelSerializer):
                     }
                 })
 
-        except Exception as e:
-            print(f'   Error al serializar colaboradores: {e}')
-            import traceback
-            print(traceback.format_exc())
+        except Exception:
+            logger.exception('Error al serializar colaboradores', extra={'trazabilidad': instance.pk})
         
         data['colaboradores_reales'] = colaboradores_lista
         return data
@@ -847,7 +883,6 @@ class JSONStringField(serializers.Field):
                 try:
                     data = data.copy()
                     data['materias_primas'] = json.loads(data['materias_primas'])
-                    print(f'  ✅ materias_primas parseado: {len(data["materias_primas"])} elementos')
                 except json.JSONDecodeError as e:
                     raise serializers.ValidationError({
                         'materias_primas': f'JSON inválido: {str(e)}'
@@ -859,9 +894,6 @@ class JSONStringField(serializers.Field):
                     raise serializers.ValidationError({
                         'colaboradores_codigos': f'JSON inválido: {str(e)}'
                     })
-        else:
-            print(' Request JSON - datos ya en formato correcto')
-        
         
         return super().to_internal_value(data)
     
@@ -892,6 +924,95 @@ class TrazabilidadColaboradorSerializer(serializers.ModelSerializer):
     def get_colaborador_nombre_completo(self, obj):
         return f"{obj.colaborador.nombre} {obj.colaborador.apellido}"
 
+
+# ============================================================================
+# ESCRITURA MASIVA: Detalle de Trazabilidad
+# ============================================================================
+def _a_numero(valor, campo, posicion):
+    try:
+        return float(valor)
+    except (ValueError, TypeError):
+        raise serializers.ValidationError({
+            'materias_primas': f'{campo} inválido en la materia prima {posicion}: {valor}'
+        })
+
+
+def crear_materias_primas_usadas(trazabilidad, materias_primas_data):
+    """
+    Inserta las materias primas usadas de una trazabilidad con sus reprocesos
+    y mermas. Resuelve todos los códigos en una sola consulta y usa un
+    bulk_create por tabla, así el número de consultas no depende del tamaño
+    del payload. Debe llamarse dentro de una transacción.
+    """
+    if not materias_primas_data:
+        return
+
+    codigos = []
+    for i, mp_data in enumerate(materias_primas_data, start=1):
+        if not isinstance(mp_data, dict) or not mp_data.get('materia_prima_id'):
+            raise serializers.ValidationError({
+                'materias_primas': f'La materia prima {i} no tiene "materia_prima_id"'
+            })
+        codigos.append(str(mp_data['materia_prima_id']))
+
+    repetidos = {codigo for codigo in codigos if codigos.count(codigo) > 1}
+    if repetidos:
+        raise serializers.ValidationError({
+            'materias_primas': f'Materias primas repetidas: {sorted(repetidos)}'
+        })
+
+    materias_primas = MateriaPrima.objects.in_bulk(codigos, field_name='codigo')
+    faltantes = [codigo for codigo in codigos if codigo not in materias_primas]
+    if faltantes:
+        raise serializers.ValidationError({
+            'materias_primas': f'Materias primas no encontradas: {faltantes}'
+        })
+
+    mp_usadas = []
+    for i, (codigo, mp_data) in enumerate(zip(codigos, materias_primas_data), start=1):
+        materia_prima = materias_primas[codigo]
+        mp_usadas.append(TrazabilidadMateriaPrima(
+            trazabilidad=trazabilidad,
+            materia_prima=materia_prima,
+            lote=mp_data.get('lote'),
+            cantidad_usada=_a_numero(mp_data.get('cantidad_usada'), 'cantidad_usada', i),
+            # bulk_create no pasa por save(), se replica su valor por defecto
+            unidad_medida=mp_data.get('unidad_medida') or materia_prima.unidad_medida
+        ))
+    TrazabilidadMateriaPrima.objects.bulk_create(mp_usadas)
+
+    reprocesos = []
+    mermas = []
+    for i, (mp_usada, mp_data) in enumerate(zip(mp_usadas, materias_primas_data), start=1):
+        for reproceso_data in mp_data.get('reprocesos') or []:
+            reprocesos.append(Reproceso(
+                trazabilidad_materia_prima=mp_usada,
+                cantidad=_a_numero(reproceso_data.get('cantidad'), 'cantidad de reproceso', i),
+                causas=reproceso_data.get('causas')
+            ))
+        for merma_data in mp_data.get('mermas') or []:
+            mermas.append(Merma(
+                trazabilidad_materia_prima=mp_usada,
+                cantidad=_a_numero(merma_data.get('cantidad'), 'cantidad de merma', i),
+                causas=merma_data.get('causas')
+            ))
+
+    if reprocesos:
+        Reproceso.objects.bulk_create(reprocesos)
+    if mermas:
+        Merma.objects.bulk_create(mermas)
+
+
+def crear_colaboradores_reales(trazabilidad, colaboradores):
+    """
+    Asocia los colaboradores ya resueltos por validate_colaboradores_codigos
+    a la trazabilidad con un único bulk_create.
+    """
+    TrazabilidadColaborador.objects.bulk_create([
+        TrazabilidadColaborador(trazabilidad=trazabilidad, colaborador=colaborador)
+        for colaborador in colaboradores
+    ])
+
 # ============================================================================
 # SERIALIZER: Trazabilidad (Crear/Actualizar)
 # ============================================================================
@@ -900,10 +1021,7 @@ class TrazabilidadCreateUpdateSerializer(serializers.ModelSerializer):
     reprocesos_data = serializers.CharField(required=False, allow_blank=True, allow_null=True)
     mermas_data = serializers.CharField(required=False, allow_blank=True, allow_null=True)
     foto_etiquetas = serializers.ImageField(required=False, allow_null=True)
-    colaboradores_reales = TrazabilidadColaboradorSerializer(
-        many=True,
-        read_only=True
-    )
+    colaboradores_reales = serializers.SerializerMethodField()
     colaboradores_codigos = serializers.JSONField(
         write_only=True,
         required=True,
@@ -951,15 +1069,13 @@ class TrazabilidadCreateUpdateSerializer(serializers.ModelSerializer):
         return value.strip()
     
     def validate(self, attrs):
-        for key, value in attrs.items():
-            if key == 'foto_etiquetas':
-                print(f'  {key}: <IMAGE>')
-            elif key in ['materias_primas', 'reprocesos_data', 'mermas_data']:
-                print(f'  {key}: lista con {len(value)} elementos')
-            else:
-                print(f'  {key}: {value}')
-        
+        registrar_payload(logger, 'Trazabilidad validada', attrs)
         return attrs
+
+    def get_colaboradores_reales(self, obj):
+        # Una consulta para la respuesta, sin importar cuántos colaboradores haya
+        relaciones = obj.colaboradores_reales.select_related('colaborador')
+        return TrazabilidadColaboradorSerializer(relaciones, many=True).data
     
     def validate_colaboradores_codigos(self, value):
         if isinstance(value, str):
@@ -990,139 +1106,72 @@ class TrazabilidadCreateUpdateSerializer(serializers.ModelSerializer):
                     f"Código de colaborador inválido: {codigo}"
                 )
 
-        colaboradores_existentes = Colaborador.objects.filter(
-            codigo__in=codigos_int
-        ).count()
-        
-        if colaboradores_existentes != len(codigos_int):
-            codigos_faltantes = set(codigos_int) - set(
-                Colaborador.objects.filter(codigo__in=codigos_int).values_list('codigo', flat=True)
+        repetidos = sorted({codigo for codigo in codigos_int if codigos_int.count(codigo) > 1})
+        if repetidos:
+            raise serializers.ValidationError(
+                f"Colaboradores repetidos: {repetidos}"
             )
+
+        # Una sola búsqueda: create/update reciben los colaboradores resueltos
+        colaboradores = Colaborador.objects.only('id', 'codigo').in_bulk(codigos_int, field_name='codigo')
+        codigos_faltantes = [codigo for codigo in codigos_int if codigo not in colaboradores]
+        if codigos_faltantes:
             raise serializers.ValidationError(
                 f"Colaboradores no encontrados: {codigos_faltantes}"
             )
         
-        return codigos_int
+        return [colaboradores[codigo] for codigo in codigos_int]
     
     def create(self, validated_data):
         materias_primas_data = validated_data.pop('materias_primas', []) or []
         reprocesos_data = validated_data.pop('reprocesos_data', []) or []
         mermas_data = validated_data.pop('mermas_data', []) or []
-        colaboradores_codigos = validated_data.pop('colaboradores_codigos')
+        colaboradores = validated_data.pop('colaboradores_codigos')
         codigo_colaborador_lote = validated_data.pop('codigo_colaborador_lote')
         
-        print(f'Hoja Procesos: {validated_data.get("hoja_procesos")}')
-        print(f'Cantidad: {validated_data.get("cantidad_producida")}')
-        print(f'Foto: {"Sí" if validated_data.get("foto_etiquetas") else "No"}')
-        print(f'Materias primas: {len(materias_primas_data)}')
-        print(f'Reprocesos: {len(reprocesos_data)}')
-        print(f'Mermas: {len(mermas_data)}')
-        print(f'Código colaborador lote: {codigo_colaborador_lote}')
-        
         hoja_procesos = validated_data.get('hoja_procesos')
         tarea = hoja_procesos.tarea
-        if tarea.fecha_inicio:
-            fecha_elaboracion = tarea.fecha_inicio.date()
-            print(f'Usando fecha de INICIO de tarea: {fecha_elaboracion}')
-        else:
-            fecha_elaboracion = tarea.fecha
-            print(f'Tarea no iniciada, usando fecha planificada: {fecha_elaboracion}')
+        # Fecha de inicio de la tarea, o la planificada si no se inició
+        fecha_elaboracion = tarea.fecha_produccion
         juliano_calculado = Trazabilidad.calcular_juliano(fecha_elaboracion)
-        print(f'Juliano calculado: {juliano_calculado}')
-
-        trazabilidad = Trazabilidad(**validated_data)
-
-        trazabilidad.juliano = juliano_calculado
-        
-        producto_codigo = trazabilidad.hoja_procesos.tarea.producto.codigo
-        trazabilidad.lote = f"{producto_codigo}-{juliano_calculado}-{codigo_colaborador_lote}"
-
-        
-        # Guardar trazabilidad
-        trazabilidad.save()
-        
-        # Crear materias primas usadas
-        for i, mp_data in enumerate(materias_primas_data):
-            try:
-                materia_prima = MateriaPrima.objects.get(codigo=mp_data['materia_prima_id'])
-                
-                mp_usada = TrazabilidadMateriaPrima.objects.create(
-                    trazabilidad=trazabilidad,
-                    materia_prima=materia_prima,
-                    lote=mp_data.get('lote'),
-                    cantidad_usada=float(mp_data['cantidad_usada']),
-                    unidad_medida=mp_data['unidad_medida']
-                )
-        
-                # Crear reprocesos
-                if 'reprocesos' in mp_data and mp_data['reprocesos']:
-                    print(f'    🔍 Procesando reprocesos para {materia_prima.nombre}...')
-                    
-                    for j, reproceso_data in enumerate(mp_data['reprocesos']):
-                        try:
-                            Reproceso.objects.create(
-                                trazabilidad_materia_prima=mp_usada,
-                                cantidad=float(reproceso_data['cantidad']),
-                                causas=reproceso_data['causas']
-                            )
-                            print(f'      ✅ Reproceso {j+1}: {reproceso_data["cantidad"]} - {reproceso_data["causas"]}')
-                        except Exception as e:
-                            print(f'Error al crear reproceso {j+1}: {e}')
-                else:
-                    print(f'Sin reprocesos para {materia_prima.nombre}')
-                
-                # Crear mermas
-                if 'mermas' in mp_data and mp_data['mermas']:
-                    for j, merma_data in enumerate(mp_data['mermas']):
-                        try:
-                            Merma.objects.create(
-                                trazabilidad_materia_prima=mp_usada,
-                                cantidad=float(merma_data['cantidad']),
-                                causas=merma_data['causas']
-                            )
-                            print(f'Merma {j+1}: {merma_data["cantidad"]} - {merma_data["causas"]}')
-                        except Exception as e:
-                            print(f'Error al crear merma {j+1}: {e}')
-                else:
-                    print(f'Sin mermas para {materia_prima.nombre}')
-
-            except MateriaPrima.DoesNotExist:
-                print(f' MP {i+1}: No encontrada {mp_data.get("materia_prima_id")}')
-            except Exception as e:
-                print(f'MP {i+1}: Error general: {e}')
-                import traceback
-                traceback.print_exc()
-
-        # Crear colaboradores
-        for colaborador_codigo in colaboradores_codigos:
-            colaborador = Colaborador.objects.get(codigo=colaborador_codigo)
-            TrazabilidadColaborador.objects.create(
-                trazabilidad=trazabilidad,
-                colaborador=colaborador
-            )
-
-        # ========================================================================
-        # FINALIZAR LA TAREA AUTOMÁTICAMENTE
-        # ========================================================================
-        try:
-            tarea = trazabilidad.hoja_procesos.tarea
+        logger.debug('Creando trazabilidad', extra={
+            'hoja_procesos': hoja_procesos.id,
+            'cantidad_producida': validated_data.get('cantidad_producida'),
+            'materias_primas': len(materias_primas_data),
+            'reprocesos': len(reprocesos_data),
+            'mermas': len(mermas_data),
+            'fecha_elaboracion': fecha_elaboracion,
+            'tarea_iniciada': bool(tarea.fecha_inicio),
+            'juliano': juliano_calculado,
+        })
+
+        # Todo o nada: si falla una materia prima, un reproceso o un
+        # colaborador no queda nada guardado
+        with transaction.atomic():
+            trazabilidad = Trazabilidad(**validated_data)
+            trazabilidad.juliano = juliano_calculado
+            
+            producto_codigo = tarea.producto.codigo
+            trazabilidad.lote = f"{producto_codigo}-{juliano_calculado}-{codigo_colaborador_lote}"
+            trazabilidad.save()
             
+            crear_materias_primas_usadas(trazabilidad, materias_primas_data)
+            crear_colaboradores_reales(trazabilidad, colaboradores)
+
+            # ====================================================================
+            # FINALIZAR LA TAREA AUTOMÁTICAMENTE
+            # ====================================================================
             if tarea.estado != 'finalizada':
                 tarea.estado = 'finalizada'
                 tarea.fecha_finalizacion = trazabilidad.fecha_creacion
-                tarea.save()
-            else:
-                print(f'\n Tarea ya estaba finalizada')
-                
-        except Exception as e:
-            print(f'\n Error al finalizar tarea: {e}')
+                tarea.save(update_fields=['estado', 'fecha_finalizacion'])
         
         return trazabilidad
     
     def update(self, instance, validated_data):
         # Extraer datos relacionados
         materias_primas_data = validated_data.pop('materias_primas', None)
-        colaboradores_codigos = validated_data.pop('colaboradores_codigos', None)
+        colaboradores = validated_data.pop('colaboradores_codigos', None)
         codigo_colaborador_lote = validated_data.pop('codigo_colaborador_lote', None)
 
         if 'juliano' in validated_data:
@@ -1139,76 +1188,87 @@ class TrazabilidadCreateUpdateSerializer(serializers.ModelSerializer):
                 nuevo_lote = f"{partes_lote[0]}-{partes_lote[1]}-{codigo_colaborador_lote}"
                 instance.lote = nuevo_lote
         
-        instance.save()
-        
-        # Actualizar materias primas si se proporcionaron
-        if materias_primas_data is not None:
-            instance.materias_primas_usadas.all().delete()
+        with transaction.atomic():
+            instance.save()
             
-            # CREAR nuevas materias primas con sus reprocesos/mermas
-            for i, mp_data in enumerate(materias_primas_data):
-                try:
-                    materia_prima = MateriaPrima.objects.get(codigo=mp_data['materia_prima_id'])
-                    
-                    mp_usada = TrazabilidadMateriaPrima.objects.create(
-                        trazabilidad=instance,
-                        materia_prima=materia_prima,
-                        lote=mp_data.get('lote'),
-                        cantidad_usada=float(mp_data['cantidad_usada']),
-                        unidad_medida=mp_data['unidad_medida']
-                    )
-                    print(f'  ✅ MP {i+1}: {materia_prima.nombre} - {mp_data["cantidad_usada"]} {mp_data["unidad_medida"]}')
-                    
-                    # ========== CREAR REPROCESOS ==========
-                    if 'reprocesos' in mp_data and mp_data['reprocesos']:
-                        for j, reproceso_data in enumerate(mp_data['reprocesos']):
-                            try:
-                                Reproceso.objects.create(
-                                    trazabilidad_materia_prima=mp_usada,
-                                    cantidad=float(reproceso_data['cantidad']),
-                                    causas=reproceso_data['causas']
-                                )
-                                print(f'Reproceso {j+1}: {reproceso_data["cantidad"]} - {reproceso_data["causas"]}')
-                            except Exception as e:
-                                print(f'Error al crear reproceso {j+1}: {e}')
-                                import traceback
-                                traceback.print_exc()
-                    else:
-                        print(f'Sin reprocesos para {materia_prima.nombre}')
-                    
-                    # ========== CREAR MERMAS ==========
-                    if 'mermas' in mp_data and mp_data['mermas']:
-                        for j, merma_data in enumerate(mp_data['mermas']):
-                            try:
-                                Merma.objects.create(
-                                    trazabilidad_materia_prima=mp_usada,
-                                    cantidad=float(merma_data['cantidad']),
-                                    causas=merma_data['causas']
-                                )
-                                print(f'Merma {j+1}: {merma_data["cantidad"]} - {merma_data["causas"]}')
-                            except Exception as e:
-                                print(f'Error al crear merma {j+1}: {e}')
-                                import traceback
-                                traceback.print_exc()
-                    else:
-                        print(f'Sin mermas para {materia_prima.nombre}')
-                        
-                except MateriaPrima.DoesNotExist:
-                    print(f'MP {i+1}: No encontrada {mp_data.get("materia_prima_id")}')
-                except Exception as e:
-                    print(f'MP {i+1}: Error general: {e}')
-                    import traceback
-                    traceback.print_exc()
-        
-        # Actualizar colaboradores si se proporcionaron
-        if colaboradores_codigos is not None:
-            instance.colaboradores_reales.all().delete()
+            # Reemplazar materias primas (con sus reprocesos/mermas) si se proporcionaron
+            if materias_primas_data is not None:
+                instance.materias_primas_usadas.all().delete()
+                crear_materias_primas_usadas(instance, materias_primas_data)
             
-            # Crear nuevos colaboradores
-            for codigo in colaboradores_codigos:
-                colaborador = Colaborador.objects.get(codigo=codigo)
-                TrazabilidadColaborador.objects.create(
-                    trazabilidad=instance,
-                    colaborador=colaborador
-                )
-        return instance
\ No newline at end of file
+            # Reemplazar colaboradores si se proporcionaron
+            if colaboradores is not None:
+                instance.colaboradores_reales.all().delete()
+                crear_colaboradores_reales(instance, colaboradores)
+
+        return instance
+
+
+# ============================================================================
+# SERIALIZER: Lote de sincronización (/api/sync/)
+# ============================================================================
+class OperacionSincronizacionSerializer(serializers.Serializer):
+    clave = serializers.CharField(
+        max_length=64,
+        help_text='Clave de idempotencia generada por la tablet (ej: UUID)'
+    )
+    tipo = serializers.CharField(max_length=30)
+    accion = serializers.CharField(max_length=20)
+    datos = serializers.DictField(default=dict)
+    
+    def validate(self, attrs):
+        from .sincronizacion import OPERACIONES
+        
+        if (attrs['tipo'], attrs['accion']) not in OPERACIONES:
+            soportadas = ', '.join(f'{tipo}.{accion}' for tipo, accion in OPERACIONES)
+            raise serializers.ValidationError(
+                f'Operación no soportada: {attrs["tipo"]}.{attrs["accion"]}. Soportadas: {soportadas}'
+            )
+        return attrs
+
+
+class LoteSincronizacionSerializer(serializers.Serializer):
+    operaciones = OperacionSincronizacionSerializer(many=True, allow_empty=False)
+    
+    def validate_operaciones(self, value):
+        from .sincronizacion import MAX_OPERACIONES_POR_LOTE
+        
+        if len(value) > MAX_OPERACIONES_POR_LOTE:
+            raise serializers.ValidationError(
+                f'Máximo {MAX_OPERACIONES_POR_LOTE} operaciones por lote'
+            )
+        return value
+
+
+# ============================================================================
+# SERIALIZER: Resumen de producción diario
+# ============================================================================
+class ResumenProduccionDiarioSerializer(serializers.ModelSerializer):
+    linea_nombre = serializers.CharField(source='linea.nombre', read_only=True)
+    turno_nombre = serializers.CharField(source='turno.nombre', read_only=True)
+    producto_codigo = serializers.CharField(source='producto.codigo', read_only=True)
+    producto_nombre = serializers.CharField(source='producto.nombre', read_only=True)
+    
+    class Meta:
+        model = ResumenProduccionDiario
+        fields = [
+            'id',
+            'fecha',
+            'linea',
+            'linea_nombre',
+            'turno',
+            'turno_nombre',
+            'producto',
+            'producto_codigo',
+            'producto_nombre',
+            'trazabilidades',
+            'cantidad_producida',
+            'meta_produccion',
+            'materia_prima_kg',
+            'materia_prima_unidades',
+            'merma_kg',
+            'merma_unidades',
+            'reproceso_kg',
+            'reproceso_unidades',
+            'fecha_actualizacion',
+        ]
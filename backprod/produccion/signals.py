@@ -0,0 +1,172 @@
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .busqueda import registrar_funciones_sqlite
+from .catalogo import MODELOS_CATALOGO, invalidar_catalogo
+from .models import (
+    Tarea, HojaProcesos, EventoProceso, Trazabilidad, FirmaTrazabilidad,
+    TrazabilidadMateriaPrima, Merma, Reproceso,
+)
+from .resumenes import CAMPOS_CLAVE, programar_recalculo, clave_de_trazabilidad
+from .tiempo_real import publicar
+
+
+# ============================================================================
+# CATÁLOGO: invalidar la caché cuando cambia un modelo del catálogo
+# ============================================================================
+def catalogo_modificado(sender, **kwargs):
+    # Después del commit, para que la reconstrucción no lea datos sin confirmar
+    transaction.on_commit(invalidar_catalogo)
+
+
+for modelo in MODELOS_CATALOGO:
+    post_save.connect(catalogo_modificado, sender=modelo, dispatch_uid=f'catalogo_save_{modelo.__name__}')
+    post_delete.connect(catalogo_modificado, sender=modelo, dispatch_uid=f'catalogo_delete_{modelo.__name__}')
+
+
+# ============================================================================
+# TIEMPO REAL: publicar cambios de tareas, eventos y trazabilidades
+# ============================================================================
+def publicar_al_confirmar(tipo, datos):
+    transaction.on_commit(lambda: publicar(tipo, datos))
+
+
+def linea_de_la_hoja(instance):
+    """
+    Línea de la hoja de un evento o trazabilidad. Usa la hoja y la tarea si
+    ya vienen cargadas (altas desde la API); si no, una sola consulta.
+    """
+    if instance._meta.get_field('hoja_procesos').is_cached(instance):
+        hoja = instance.hoja_procesos
+        if HojaProcesos._meta.get_field('tarea').is_cached(hoja):
+            return hoja.tarea.linea_id
+    return HojaProcesos.objects.filter(
+        id=instance.hoja_procesos_id
+    ).values_list('tarea__linea_id', flat=True).first()
+
+
+@receiver(post_save, sender=Tarea, dispatch_uid='tiempo_real_tarea')
+def tarea_guardada(sender, instance, **kwargs):
+    publicar_al_confirmar('tarea', {
+        'id': instance.id,
+        'linea': instance.linea_id,
+        'turno': instance.turno_id,
+        'producto': instance.producto_id,
+        'estado': instance.estado,
+        'fecha_inicio': instance.fecha_inicio,
+        'fecha_finalizacion': instance.fecha_finalizacion,
+    })
+
+
+@receiver(post_save, sender=EventoProceso, dispatch_uid='tiempo_real_evento')
+def evento_guardado(sender, instance, created, **kwargs):
+    publicar_al_confirmar('evento_proceso', {
+        'id': instance.id,
+        'creado': created,
+        'hoja_procesos': instance.hoja_procesos_id,
+        'linea': linea_de_la_hoja(instance),
+        'tipo_evento': instance.tipo_evento_id,
+        'hora_inicio': instance.hora_inicio,
+        'hora_fin': instance.hora_fin,
+    })
+
+
+@receiver(post_save, sender=Trazabilidad, dispatch_uid='tiempo_real_trazabilidad')
+def trazabilidad_guardada(sender, instance, created, **kwargs):
+    publicar_al_confirmar('trazabilidad', {
+        'id': instance.id,
+        'creada': created,
+        'hoja_procesos': instance.hoja_procesos_id,
+        'linea': linea_de_la_hoja(instance),
+        'lote': instance.lote,
+        'estado': instance.estado,
+    })
+
+
+@receiver(post_save, sender=FirmaTrazabilidad, dispatch_uid='tiempo_real_firma')
+def firma_guardada(sender, instance, **kwargs):
+    publicar_al_confirmar('firma_trazabilidad', {
+        'id': instance.id,
+        'trazabilidad': instance.trazabilidad_id,
+        'tipo_firma': instance.tipo_firma,
+        'usuario': instance.usuario_id,
+    })
+
+
+# ============================================================================
+# RESUMEN DIARIO: recalcular la clave de cada trazabilidad modificada
+# ============================================================================
+@receiver(post_save, sender=Trazabilidad, dispatch_uid='resumen_trazabilidad')
+def resumen_trazabilidad_guardada(sender, instance, **kwargs):
+    programar_recalculo(trazabilidad_id=instance.id)
+
+
+@receiver(pre_delete, sender=Trazabilidad, dispatch_uid='resumen_trazabilidad_borrada')
+def resumen_trazabilidad_borrada(sender, instance, **kwargs):
+    # Antes de borrar: después ya no se puede llegar a la tarea
+    programar_recalculo(clave=clave_de_trazabilidad(instance))
+
+
+# Campos de la tarea que cambian la clave o la meta de sus resúmenes
+CAMPOS_TAREA_RESUMEN = frozenset({'linea', 'turno', 'producto', 'meta_produccion'})
+
+
+@receiver(pre_save, sender=Tarea, dispatch_uid='resumen_tarea_previa')
+def resumen_tarea_por_guardar(sender, instance, update_fields=None, **kwargs):
+    """
+    Guarda las claves actuales de las trazabilidades de la tarea: si cambia
+    la línea, el turno o el producto, el resumen de la clave anterior también
+    queda desfasado. Los guardados parciales que no tocan esos campos (cambios
+    de estado) no consultan nada.
+    """
+    instance._claves_resumen = ()
+    if instance.pk is None:
+        return
+    if update_fields is not None and not CAMPOS_TAREA_RESUMEN & set(update_fields):
+        return
+    instance._claves_resumen = list(
+        Trazabilidad.objects
+        .filter(hoja_procesos__tarea_id=instance.pk)
+        .values_list(*CAMPOS_CLAVE)
+    )
+
+
+@receiver(post_save, sender=Tarea, dispatch_uid='resumen_tarea')
+def resumen_tarea_guardada(sender, instance, **kwargs):
+    # Clave anterior y clave nueva; si no cambió, la meta igual se recalcula.
+    # El borrado de una tarea llega en cascada a resumen_trazabilidad_borrada
+    for clave in instance.__dict__.pop('_claves_resumen', ()):
+        programar_recalculo(clave=clave)
+        programar_recalculo(clave=(clave[0], instance.linea_id, instance.turno_id, instance.producto_id))
+
+
+# Las materias primas, mermas y reprocesos de la API se crean con bulk_create
+# junto a un save() de la trazabilidad; estos receivers cubren las altas,
+# ediciones y borrados sueltos (admin e inlines)
+@receiver(post_save, sender=TrazabilidadMateriaPrima, dispatch_uid='resumen_materia_prima')
+@receiver(post_delete, sender=TrazabilidadMateriaPrima, dispatch_uid='resumen_materia_prima_borrada')
+def resumen_materia_prima_modificada(sender, instance, **kwargs):
+    programar_recalculo(trazabilidad_id=instance.trazabilidad_id)
+
+
+@receiver(post_save, sender=Merma, dispatch_uid='resumen_merma')
+@receiver(post_save, sender=Reproceso, dispatch_uid='resumen_reproceso')
+@receiver(post_delete, sender=Merma, dispatch_uid='resumen_merma_borrada')
+@receiver(post_delete, sender=Reproceso, dispatch_uid='resumen_reproceso_borrado')
+def resumen_merma_reproceso_modificado(sender, instance, **kwargs):
+    # Si la materia prima no viene cargada, sólo el id de la FK: la
+    # trazabilidad se resuelve al confirmar, en una consulta para todas. En
+    # un borrado en cascada la materia prima ya no está y su propio receiver
+    # programó la trazabilidad
+    if instance._meta.get_field('trazabilidad_materia_prima').is_cached(instance):
+        programar_recalculo(trazabilidad_id=instance.trazabilidad_materia_prima.trazabilidad_id)
+    else:
+        programar_recalculo(materia_prima_id=instance.trazabilidad_materia_prima_id)
+
+
+# ============================================================================
+# BÚSQUEDA: f_unaccent en conexiones SQLite
+# ============================================================================
+connection_created.connect(registrar_funciones_sqlite, dispatch_uid='busqueda_sqlite')
@@ -0,0 +1,185 @@
+from django.core.exceptions import ObjectDoesNotExist, ValidationError as DjangoValidationError
+from django.db import IntegrityError, transaction
+from rest_framework import serializers
+
+from .models import HojaProcesos, EventoProceso, OperacionSincronizada
+from .serializers import (
+    HojaProcesosDetailSerializer,
+    EventoProcesoCreateUpdateSerializer,
+    TrazabilidadCreateUpdateSerializer,
+)
+
+
+# Máximo de operaciones aceptadas en un lote de /api/sync/
+MAX_OPERACIONES_POR_LOTE = 500
+
+
+# ============================================================================
+# OPERACIONES SINCRONIZABLES
+# ============================================================================
+def _crear_con(clase_serializer):
+    def crear(datos, contexto):
+        serializer = clase_serializer(data=datos, context=contexto)
+        serializer.is_valid(raise_exception=True)
+        return serializer.save().id
+    return crear
+
+
+def _actualizar_evento(datos, contexto):
+    evento = EventoProceso.objects.get(pk=datos.get('id'))
+    serializer = EventoProcesoCreateUpdateSerializer(
+        evento, data=datos, partial=True, context=contexto
+    )
+    serializer.is_valid(raise_exception=True)
+    return serializer.save().id
+
+
+def _finalizar_hoja(datos, contexto):
+    hoja = HojaProcesos.objects.get(pk=datos.get('id'))
+    hoja.finalizar()
+    return hoja.id
+
+
+# (tipo, accion) -> función que aplica la operación y retorna el id del
+# objeto. El orden del dict es el orden de dependencias en que se aplican
+OPERACIONES = {
+    ('hoja_procesos', 'crear'): _crear_con(HojaProcesosDetailSerializer),
+    ('evento_proceso', 'crear'): _crear_con(EventoProcesoCreateUpdateSerializer),
+    ('evento_proceso', 'actualizar'): _actualizar_evento,
+    ('hoja_procesos', 'finalizar'): _finalizar_hoja,
+    ('trazabilidad', 'crear'): _crear_con(TrazabilidadCreateUpdateSerializer),
+}
+
+
+# ============================================================================
+# APLICACIÓN DE UN LOTE
+# ============================================================================
+class OperacionRepetida(Exception):
+    """Otra petición registró la misma clave mientras se aplicaba"""
+
+
+class DependenciaFallida(Exception):
+    """Una referencia apunta a una operación que no se aplicó"""
+
+
+def _es_referencia(valor):
+    return isinstance(valor, dict) and set(valor) == {'ref'}
+
+
+def referencias(valor):
+    """Claves referenciadas con {"ref": clave} dentro de los datos"""
+    if _es_referencia(valor):
+        return {valor['ref']}
+    if isinstance(valor, dict):
+        return set().union(*(referencias(v) for v in valor.values()))
+    if isinstance(valor, list):
+        return set().union(*(referencias(v) for v in valor))
+    return set()
+
+
+def resolver_referencias(valor, ids):
+    """Reemplaza cada {"ref": clave} por el id en el servidor de esa operación"""
+    if _es_referencia(valor):
+        if ids.get(valor['ref']) is None:
+            raise DependenciaFallida(valor['ref'])
+        return ids[valor['ref']]
+    if isinstance(valor, dict):
+        return {campo: resolver_referencias(v, ids) for campo, v in valor.items()}
+    if isinstance(valor, list):
+        return [resolver_referencias(v, ids) for v in valor]
+    return valor
+
+
+def _errores(e):
+    if isinstance(e, serializers.ValidationError):
+        return e.detail
+    if isinstance(e, DjangoValidationError):
+        if hasattr(e, 'error_dict'):
+            return e.message_dict
+        return {'non_field_errors': e.messages}
+    return {'non_field_errors': [str(e)]}
+
+
+def aplicar_operacion(operacion, registradas, ids, contexto):
+    """
+    Aplica una operación dentro de su propio savepoint: si falla, se
+    deshace sólo ella y el resto del lote sigue.
+    """
+    clave = operacion['clave']
+    base = {'clave': clave, 'tipo': operacion['tipo'], 'accion': operacion['accion']}
+
+    if clave in registradas:
+        return {**registradas[clave].resultado, 'estado': 'repetida'}
+
+    try:
+        datos = resolver_referencias(operacion['datos'], ids)
+        with transaction.atomic():
+            objeto_id = OPERACIONES[(operacion['tipo'], operacion['accion'])](datos, contexto)
+            resultado = {**base, 'estado': 'aplicada', 'id': objeto_id}
+            try:
+                with transaction.atomic():
+                    registro = OperacionSincronizada.objects.create(
+                        clave=clave,
+                        tipo=operacion['tipo'],
+                        accion=operacion['accion'],
+                        objeto_id=objeto_id,
+                        resultado=resultado
+                    )
+            except IntegrityError:
+                raise OperacionRepetida()
+    except OperacionRepetida:
+        registro = OperacionSincronizada.objects.get(clave=clave)
+        registradas[clave] = registro
+        ids[clave] = registro.objeto_id
+        return {**registro.resultado, 'estado': 'repetida'}
+    except DependenciaFallida as e:
+        return {**base, 'estado': 'conflicto', 'errores': {
+            'ref': [f'La operación "{e}" no existe o no se pudo aplicar']
+        }}
+    except (
+        serializers.ValidationError, DjangoValidationError,
+        ObjectDoesNotExist, IntegrityError
+    ) as e:
+        return {**base, 'estado': 'conflicto', 'errores': _errores(e)}
+
+    registradas[clave] = registro
+    ids[clave] = objeto_id
+    return resultado
+
+
+def sincronizar(operaciones, contexto=None):
+    """
+    Aplica un lote de operaciones generadas sin conexión.
+
+    Todo el lote corre en una transacción; cada operación en un savepoint. Se
+    aplican en orden de dependencias (hojas, eventos, cierre de hojas,
+    trazabilidades) respetando el orden del cliente dentro de cada tipo. Los
+    datos pueden referirse a objetos creados en el mismo lote o en lotes
+    anteriores con {"ref": clave}.
+
+    Args:
+        operaciones: lista de dicts con clave, tipo, accion y datos
+
+    Returns:
+        list: un resultado por operación, en el orden recibido, con estado
+        'aplicada', 'repetida' o 'conflicto'
+    """
+    claves = {operacion['clave'] for operacion in operaciones}
+    for operacion in operaciones:
+        claves |= referencias(operacion['datos'])
+
+    registradas = OperacionSincronizada.objects.in_bulk(list(claves), field_name='clave')
+    ids = {clave: registro.objeto_id for clave, registro in registradas.items()}
+
+    orden = {clave_operacion: i for i, clave_operacion in enumerate(OPERACIONES)}
+    pendientes = sorted(
+        enumerate(operaciones),
+        key=lambda par: (orden[(par[1]['tipo'], par[1]['accion'])], par[0])
+    )
+
+    resultados = [None] * len(operaciones)
+    with transaction.atomic():
+        for posicion, operacion in pendientes:
+            resultados[posicion] = aplicar_operacion(operacion, registradas, ids, contexto)
+
+    return resultados
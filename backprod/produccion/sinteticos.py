@@ -0,0 +1,343 @@
+import random
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import (
+    Usuario, Linea, Turno, Colaborador, Producto, MateriaPrima, Receta,
+    Tarea, TareaColaborador, HojaProcesos, Maquina, TipoEvento,
+    EventoProceso, EventoMaquina, Trazabilidad, TrazabilidadMateriaPrima,
+    Merma, Reproceso, FirmaTrazabilidad, TrazabilidadColaborador,
+)
+from .catalogo import invalidar_catalogo
+from .resumenes import reconstruir_resumenes
+
+
+# Marcas de los datos sintéticos, para no mezclarlos con los reales y poder
+# borrarlos con --limpiar
+PREFIJO_PRODUCTO = 'SINT-'
+PREFIJO_LINEA = 'SINT Línea'
+PREFIJO_MAQUINA = 'SINT-M'
+CODIGO_COLABORADOR_INICIAL = 900000
+
+# Usuarios con los que firman los escenarios de benchmark
+USUARIO_SUPERVISOR = 'bench_supervisor'
+USUARIO_CALIDAD = 'bench_calidad'
+CLAVE_POR_DEFECTO = 'benchmark'
+
+# Días que se insertan por transacción
+DIAS_POR_LOTE = 7
+
+NOMBRES = ['Ana', 'Luis', 'María', 'José', 'Camila', 'Pedro', 'Valentina', 'Jorge', 'Daniela', 'Héctor']
+APELLIDOS = ['Muñoz', 'González', 'Rojas', 'Díaz', 'Pérez', 'Soto', 'Contreras', 'Silva', 'Núñez', 'Araya']
+
+# Paradas posibles dentro de un turno (código de TipoEvento, minutos mín/máx)
+PARADAS = [
+    ('FALLA_MAQUINA', 5, 40),
+    ('FALTA_MATERIA_PRIMA', 5, 30),
+    ('CAMBIO_LIMPIEZA', 10, 25),
+    ('TEMPLADO', 5, 20),
+    ('COLACION', 30, 30),
+]
+
+
+@contextmanager
+def _fechas_historicas(*modelos_campos):
+    """
+    Desactiva auto_now_add en los campos dados mientras se insertan filas con
+    fechas pasadas (un año de historia no puede quedar fechado hoy).
+    """
+    campos = [modelo._meta.get_field(nombre) for modelo, nombre in modelos_campos]
+    for campo in campos:
+        campo.auto_now_add = False
+    try:
+        yield
+    finally:
+        for campo in campos:
+            campo.auto_now_add = True
+
+
+def _momento(fecha, hora):
+    return timezone.make_aware(datetime.combine(fecha, hora))
+
+
+# ============================================================================
+# CATÁLOGOS
+# ============================================================================
+def preparar_catalogos(rng, lineas, colaboradores, productos, clave=CLAVE_POR_DEFECTO):
+    """
+    Asegura líneas, productos con receta, máquinas, colaboradores y los
+    usuarios de benchmark. Reutiliza las líneas y materias primas existentes.
+
+    Returns:
+        dict: catálogos a usar en la generación
+    """
+    existentes = list(Linea.objects.filter(activa=True).order_by('id')[:lineas])
+    nuevas = [
+        Linea(nombre=f'{PREFIJO_LINEA} {numero:02d}')
+        for numero in range(len(existentes) + 1, lineas + 1)
+    ]
+    Linea.objects.bulk_create(nuevas, ignore_conflicts=True)
+    lista_lineas = existentes + list(Linea.objects.filter(nombre__in=[l.nombre for l in nuevas]))
+
+    materias_primas = list(MateriaPrima.objects.filter(activo=True).order_by('id'))
+    if not materias_primas:
+        materias_primas = MateriaPrima.objects.bulk_create([
+            MateriaPrima(codigo=f'{PREFIJO_PRODUCTO}MP{i:02d}', nombre=f'Materia prima sintética {i}')
+            for i in range(1, 21)
+        ])
+
+    Producto.objects.bulk_create([
+        Producto(
+            codigo=f'{PREFIJO_PRODUCTO}{i:03d}',
+            nombre=f'Producto sintético {i}',
+            unidades_por_hora=rng.choice([60, 75, 90])
+        )
+        for i in range(1, productos + 1)
+    ], ignore_conflicts=True)
+    lista_productos = list(Producto.objects.filter(codigo__startswith=PREFIJO_PRODUCTO).order_by('codigo'))
+    if not Receta.objects.filter(producto__in=lista_productos).exists():
+        Receta.objects.bulk_create([
+            Receta(producto=producto, materia_prima=materia_prima, orden=orden)
+            for producto in lista_productos
+            for orden, materia_prima in enumerate(rng.sample(materias_primas, min(4, len(materias_primas))))
+        ])
+    recetas = {}
+    for receta in Receta.objects.filter(producto__in=lista_productos).select_related('materia_prima').order_by('orden'):
+        recetas.setdefault(receta.producto_id, []).append(receta.materia_prima)
+
+    Maquina.objects.bulk_create([
+        Maquina(codigo=f'{PREFIJO_MAQUINA}{i:02d}', nombre=f'Máquina sintética {i}')
+        for i in range(1, lineas * 2 + 1)
+    ], ignore_conflicts=True)
+    maquinas = list(Maquina.objects.filter(codigo__startswith=PREFIJO_MAQUINA).order_by('codigo'))
+
+    Colaborador.objects.bulk_create([
+        Colaborador(
+            codigo=CODIGO_COLABORADOR_INICIAL + i,
+            nombre=rng.choice(NOMBRES),
+            apellido=rng.choice(APELLIDOS)
+        )
+        for i in range(colaboradores)
+    ], ignore_conflicts=True, batch_size=2000)
+    lista_colaboradores = list(
+        Colaborador.objects.filter(codigo__gte=CODIGO_COLABORADOR_INICIAL).order_by('codigo')[:colaboradores]
+    )
+
+    usuarios = {}
+    for username, rol in [(USUARIO_SUPERVISOR, 'supervisor'), (USUARIO_CALIDAD, 'control_calidad')]:
+        usuario, creado = Usuario.objects.get_or_create(username=username, defaults={'rol': rol})
+        if creado:
+            usuario.set_password(clave)
+            usuario.save(update_fields=['password'])
+        usuarios[rol] = usuario
+
+    return {
+        'lineas': lista_lineas,
+        'turnos': list(Turno.objects.filter(activo=True).exclude(nombre='Jornada').order_by('hora_inicio')),
+        'productos': lista_productos,
+        'recetas': recetas,
+        'maquinas': maquinas,
+        'colaboradores': lista_colaboradores,
+        'tipos_evento': {tipo.codigo: tipo for tipo in TipoEvento.objects.all()},
+        'usuarios': usuarios,
+    }
+
+
+# ============================================================================
+# HISTORIA
+# ============================================================================
+def _eventos_del_turno(rng, tipos, hoja, inicio, fin):
+    """Setup, producción interrumpida por algunas paradas y setup final"""
+    eventos = []
+    momento = inicio
+
+    def agregar(codigo, minutos):
+        nonlocal momento
+        tipo = tipos.get(codigo) or tipos.get('OTRO')
+        termino = min(momento + timedelta(minutes=minutos), fin)
+        eventos.append(EventoProceso(hoja_procesos=hoja, tipo_evento=tipo, hora_inicio=momento, hora_fin=termino))
+        momento = termino
+
+    agregar('SETUP_INICIAL', rng.randint(10, 25))
+    for codigo, minimo, maximo in rng.sample(PARADAS, rng.randint(1, 3)):
+        agregar('PRODUCCION', rng.randint(60, 120))
+        agregar(codigo, rng.randint(minimo, maximo))
+    restante = (fin - momento).total_seconds() / 60 - 15
+    if restante > 0:
+        agregar('PRODUCCION', restante)
+    agregar('SETUP_FINAL', 15)
+    return eventos
+
+
+def _insertar_dias(rng, catalogos, dias):
+    """Inserta tareas, hojas, eventos y trazabilidades de una lista de días"""
+    supervisor = catalogos['usuarios']['supervisor']
+    calidad = catalogos['usuarios']['control_calidad']
+    hoy = timezone.localdate()
+
+    tareas = []
+    for fecha in dias:
+        for linea in catalogos['lineas']:
+            for turno in catalogos['turnos']:
+                inicio = _momento(fecha, turno.hora_inicio)
+                fin = _momento(fecha, turno.hora_fin)
+                if fin <= inicio:
+                    fin += timedelta(days=1)
+                tareas.append(Tarea(
+                    linea=linea,
+                    turno=turno,
+                    producto=rng.choice(catalogos['productos']),
+                    supervisor_asignador=supervisor,
+                    fecha=fecha,
+                    meta_produccion=rng.choice([400, 500, 600, 800, 1000]),
+                    estado='finalizada',
+                    fecha_creacion=inicio - timedelta(hours=12),
+                    fecha_inicio=inicio,
+                    fecha_finalizacion=fin,
+                ))
+    Tarea.objects.bulk_create(tareas, batch_size=2000)
+
+    asignaciones = []
+    equipos = {}
+    for tarea in tareas:
+        equipos[tarea.id] = rng.sample(catalogos['colaboradores'], min(rng.randint(3, 6), len(catalogos['colaboradores'])))
+        asignaciones += [TareaColaborador(tarea=tarea, colaborador=c) for c in equipos[tarea.id]]
+    TareaColaborador.objects.bulk_create(asignaciones, batch_size=5000)
+
+    hojas = [
+        HojaProcesos(tarea=tarea, fecha_inicio=tarea.fecha_inicio,
+                     fecha_finalizacion=tarea.fecha_finalizacion, finalizada=True)
+        for tarea in tareas
+    ]
+    HojaProcesos.objects.bulk_create(hojas, batch_size=2000)
+
+    eventos = []
+    for tarea, hoja in zip(tareas, hojas):
+        eventos += _eventos_del_turno(rng, catalogos['tipos_evento'], hoja, tarea.fecha_inicio, tarea.fecha_finalizacion)
+    EventoProceso.objects.bulk_create(eventos, batch_size=5000)
+    if catalogos['maquinas']:
+        EventoMaquina.objects.bulk_create([
+            EventoMaquina(evento=evento, maquina=rng.choice(catalogos['maquinas'])) for evento in eventos
+        ], batch_size=5000)
+
+    trazabilidades = []
+    for tarea, hoja in zip(tareas, hojas):
+        juliano = Trazabilidad.calcular_juliano(tarea.fecha_produccion)
+        reciente = (hoy - tarea.fecha).days < 3
+        trazabilidades.append(Trazabilidad(
+            hoja_procesos=hoja,
+            cantidad_producida=int(tarea.meta_produccion * rng.uniform(0.7, 1.05)),
+            juliano=juliano,
+            fecha_produccion=tarea.fecha_produccion,
+            lote=f'{tarea.producto.codigo}-{juliano}-{equipos[tarea.id][0].codigo}',
+            estado='en_revision' if reciente else rng.choices(['liberado', 'retenido'], [20, 1])[0],
+            motivo_retencion=None,
+            fecha_creacion=tarea.fecha_finalizacion,
+        ))
+        if trazabilidades[-1].estado == 'retenido':
+            trazabilidades[-1].motivo_retencion = 'Retención sintética'
+    Trazabilidad.objects.bulk_create(trazabilidades, batch_size=2000)
+
+    usadas, colaboradores_reales, firmas = [], [], []
+    for tarea, trazabilidad in zip(tareas, trazabilidades):
+        for materia_prima in catalogos['recetas'].get(tarea.producto_id, []):
+            unidades = materia_prima.unidad_medida == 'UN'
+            usadas.append(TrazabilidadMateriaPrima(
+                trazabilidad=trazabilidad,
+                materia_prima=materia_prima,
+                lote=f'L{rng.randint(1, 9999):04d}-{trazabilidad.juliano}',
+                cantidad_usada=Decimal(rng.randint(5, 400) if unidades else round(rng.uniform(2, 60), 2)).quantize(Decimal('0.01')),
+                unidad_medida='unidades' if unidades else 'kg',
+            ))
+        colaboradores_reales += [
+            TrazabilidadColaborador(trazabilidad=trazabilidad, colaborador=c) for c in equipos[tarea.id]
+        ]
+        if trazabilidad.estado != 'en_revision':
+            firma = trazabilidad.fecha_creacion + timedelta(hours=1)
+            firmas.append(FirmaTrazabilidad(
+                trazabilidad=trazabilidad, tipo_firma='supervisor', usuario=supervisor, fecha_firma=firma
+            ))
+            firmas.append(FirmaTrazabilidad(
+                trazabilidad=trazabilidad, tipo_firma='control_calidad', usuario=calidad,
+                fecha_firma=firma + timedelta(hours=2)
+            ))
+    TrazabilidadMateriaPrima.objects.bulk_create(usadas, batch_size=5000)
+    TrazabilidadColaborador.objects.bulk_create(colaboradores_reales, batch_size=5000)
+    FirmaTrazabilidad.objects.bulk_create(firmas, batch_size=5000)
+
+    mermas, reprocesos = [], []
+    for usada in usadas:
+        if rng.random() < 0.3:
+            mermas.append(Merma(
+                trazabilidad_materia_prima=usada,
+                cantidad=(usada.cantidad_usada * Decimal(rng.uniform(0.01, 0.08))).quantize(Decimal('0.01')),
+                causas=rng.choice(Merma.CAUSAS_CHOICES[:-1])[0],
+            ))
+        if rng.random() < 0.15:
+            reprocesos.append(Reproceso(
+                trazabilidad_materia_prima=usada,
+                cantidad=(usada.cantidad_usada * Decimal(rng.uniform(0.01, 0.05))).quantize(Decimal('0.01')),
+                causas=rng.choice(Reproceso.CAUSAS_CHOICES[:-1])[0],
+            ))
+    Merma.objects.bulk_create(mermas, batch_size=5000)
+    Reproceso.objects.bulk_create(reprocesos, batch_size=5000)
+
+    return len(trazabilidades)
+
+
+def generar_datos(dias=365, lineas=20, colaboradores=3000, productos=40, semilla=42,
+                  clave=CLAVE_POR_DEFECTO, progreso=None):
+    """
+    Genera `dias` de historia hasta ayer: una tarea por línea y turno (AM y
+    PM), con su hoja de procesos, eventos, trazabilidad, materias primas,
+    mermas, reprocesos, colaboradores y firmas. Con la misma semilla y los
+    mismos parámetros genera los mismos datos.
+
+    Usa bulk_create (sin señales), así que al final reconstruye el resumen
+    diario e invalida el catálogo.
+
+    Returns:
+        int: trazabilidades creadas
+    """
+    rng = random.Random(semilla)
+    catalogos = preparar_catalogos(rng, lineas, colaboradores, productos, clave)
+
+    hasta = timezone.localdate() - timedelta(days=1)
+    desde = hasta - timedelta(days=dias - 1)
+    todas = [desde + timedelta(days=i) for i in range(dias)]
+
+    total = 0
+    with _fechas_historicas(
+        (Tarea, 'fecha_creacion'), (HojaProcesos, 'fecha_inicio'),
+        (Trazabilidad, 'fecha_creacion'), (FirmaTrazabilidad, 'fecha_firma'),
+    ):
+        for inicio in range(0, len(todas), DIAS_POR_LOTE):
+            lote = todas[inicio:inicio + DIAS_POR_LOTE]
+            with transaction.atomic():
+                total += _insertar_dias(rng, catalogos, lote)
+            if progreso:
+                progreso(lote[0], lote[-1], total)
+
+    reconstruir_resumenes(desde, hasta)
+    invalidar_catalogo()
+    return total
+
+
+def limpiar_datos():
+    """Borra todo lo generado por generar_datos (los usuarios se mantienen)"""
+    with transaction.atomic():
+        tareas = Tarea.objects.filter(producto__codigo__startswith=PREFIJO_PRODUCTO)
+        borradas = tareas.count()
+        # En cascada: hojas, eventos, trazabilidades y todo su detalle
+        tareas.delete()
+        Producto.objects.filter(codigo__startswith=PREFIJO_PRODUCTO).delete()
+        MateriaPrima.objects.filter(codigo__startswith=PREFIJO_PRODUCTO).delete()
+        Maquina.objects.filter(codigo__startswith=PREFIJO_MAQUINA).delete()
+        Colaborador.objects.filter(codigo__gte=CODIGO_COLABORADOR_INICIAL).delete()
+        Linea.objects.filter(nombre__startswith=PREFIJO_LINEA).delete()
+    invalidar_catalogo()
+    return borradas
@@ -1,3 +1,1464 @@
-from django.test import TestCase
+import asyncio
+import json
+import logging
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from importlib import import_module
 
-# Create your tests here.
+import openpyxl
+from asgiref.sync import sync_to_async
+from django.apps import apps as django_apps
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .models import (
+    Usuario, Linea, Turno, Colaborador,
+    Producto, MateriaPrima, Receta,
+    Tarea, TareaColaborador, HojaProcesos,
+    Maquina, TipoEvento, EventoProceso, EventoMaquina, Trazabilidad,
+    TrazabilidadMateriaPrima, Merma, Reproceso, ResumenProduccionDiario,
+    FirmaTrazabilidad, TrazabilidadColaborador, ImportacionColaboradores,
+)
+from .catalogo import invalidar_catalogo
+from .importacion import (
+    MINUTOS_IMPORTACION_ABANDONADA, importar_colaboradores, importar_filas,
+    iterar_filas_excel, procesar_importaciones_pendientes,
+)
+from .tiempo_real import broker, stream_eventos
+from .benchmark import comparar
+from .registro import FormatoJSON, IdCorrelacionFilter, id_correlacion
+
+
+# ============================================================================
+# DATOS DE PRUEBA
+# ============================================================================
+class DatosProduccionMixin:
+    """Crea tareas con la cantidad de colaboradores y recetas que se pida"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.supervisor = Usuario.objects.create_user(
+            username='supervisor', password='clave', rol='supervisor'
+        )
+        cls.linea = Linea.objects.order_by('id').first()
+        cls.turno = Turno.objects.order_by('id').first()
+        cls.secuencia = 0
+
+    @classmethod
+    def crear_tarea(cls, colaboradores=1, recetas=1, con_hoja=False, linea=None):
+        cls.secuencia += 1
+        producto = Producto.objects.create(
+            codigo=f'P{cls.secuencia}',
+            nombre=f'Producto {cls.secuencia}'
+        )
+        for i in range(recetas):
+            materia_prima = MateriaPrima.objects.create(
+                codigo=f'MP{cls.secuencia}-{i}',
+                nombre=f'Materia prima {i}'
+            )
+            Receta.objects.create(producto=producto, materia_prima=materia_prima, orden=i)
+
+        tarea = Tarea.objects.create(
+            linea=linea or cls.linea,
+            turno=cls.turno,
+            producto=producto,
+            supervisor_asignador=cls.supervisor,
+            fecha=date.today(),
+            meta_produccion=100
+        )
+        for i in range(colaboradores):
+            colaborador = Colaborador.objects.create(
+                codigo=cls.secuencia * 1000 + i,
+                nombre='Nombre',
+                apellido='Apellido'
+            )
+            TareaColaborador.objects.create(tarea=tarea, colaborador=colaborador)
+
+        if con_hoja:
+            HojaProcesos.objects.create(tarea=tarea)
+
+        return tarea
+
+    @classmethod
+    def crear_eventos(cls, hoja, cantidad, maquinas_por_evento=2):
+        tipos = list(TipoEvento.objects.all())
+        maquinas = [
+            Maquina.objects.get_or_create(codigo=f'M{i}', defaults={'nombre': f'Máquina {i}'})[0]
+            for i in range(maquinas_por_evento)
+        ]
+        inicio = timezone.now()
+        for i in range(cantidad):
+            evento = EventoProceso.objects.create(
+                hoja_procesos=hoja,
+                tipo_evento=tipos[i % len(tipos)],
+                hora_inicio=inicio + timedelta(minutes=i),
+                hora_fin=inicio + timedelta(minutes=i + 1)
+            )
+            for maquina in maquinas:
+                EventoMaquina.objects.create(evento=evento, maquina=maquina)
+
+    def crear_trazabilidad(self, cantidad=40, merma='1.50'):
+        """Trazabilidad con una materia prima (12 kg) y una merma, confirmada"""
+        tarea = self.crear_tarea(con_hoja=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                trazabilidad = Trazabilidad.objects.create(
+                    hoja_procesos=tarea.hoja_procesos,
+                    cantidad_producida=cantidad,
+                    juliano=1,
+                    lote=f'{tarea.producto.codigo}-1-1',
+                    fecha_produccion=date.today()
+                )
+                mp_usada = TrazabilidadMateriaPrima.objects.create(
+                    trazabilidad=trazabilidad,
+                    materia_prima=tarea.producto.recetas.first().materia_prima,
+                    cantidad_usada='12.00',
+                    unidad_medida='kg'
+                )
+                Merma.objects.create(trazabilidad_materia_prima=mp_usada, cantidad=merma)
+        return trazabilidad
+
+
+# ============================================================================
+# TESTS: Escritura de trazabilidades (materias primas y colaboradores)
+# ============================================================================
+class EscrituraTrazabilidadTests(DatosProduccionMixin, APITestCase):
+    """Crear y actualizar hace las mismas consultas con 1 o con muchos hijos"""
+
+    def payload(self, tarea):
+        return {
+            'hoja_procesos': tarea.hoja_procesos.id,
+            'cantidad_producida': 90,
+            'codigo_colaborador_lote': '7',
+            'colaboradores_codigos': [
+                asignacion.colaborador.codigo for asignacion in tarea.tarea_colaboradores.all()
+            ],
+            'materias_primas': [
+                {
+                    'materia_prima_id': receta.materia_prima.codigo,
+                    'lote': 'L1',
+                    'cantidad_usada': '5.00',
+                    'reprocesos': [{'cantidad': '0.20'}],
+                    'mermas': [{'cantidad': '0.10', 'causas': 'cayo_al_suelo'}],
+                }
+                for receta in tarea.producto.recetas.all()
+            ],
+        }
+
+    def contar(self, metodo, ruta, datos):
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = getattr(self.client, metodo)(ruta, datos, format='json')
+        self.assertIn(respuesta.status_code, (200, 201), respuesta.data)
+        return len(consultas), respuesta
+
+    def test_crear_y_actualizar_con_consultas_constantes(self):
+        # assertLogs evita que los logs de cada alta ensucien la salida
+        with self.assertLogs('produccion', 'INFO'):
+            self.escribir_chica_y_grande()
+
+    def escribir_chica_y_grande(self):
+        # La primera escritura calienta cachés de proceso
+        self.contar('post', '/api/trazabilidades/', self.payload(self.crear_tarea(con_hoja=True)))
+        chica = self.crear_tarea(colaboradores=1, recetas=1, con_hoja=True)
+        grande = self.crear_tarea(colaboradores=8, recetas=8, con_hoja=True)
+
+        creando_chica, respuesta_chica = self.contar('post', '/api/trazabilidades/', self.payload(chica))
+        creando_grande, respuesta_grande = self.contar('post', '/api/trazabilidades/', self.payload(grande))
+        self.assertEqual(creando_chica, creando_grande)
+        trazabilidad = Trazabilidad.objects.get(id=respuesta_grande.data['id'])
+        self.assertEqual(trazabilidad.materias_primas_usadas.count(), 8)
+        self.assertEqual(trazabilidad.colaboradores_reales.count(), 8)
+
+        cambios = ('materias_primas', 'colaboradores_codigos')
+        actualizando_chica, _ = self.contar(
+            'patch', f"/api/trazabilidades/{respuesta_chica.data['id']}/",
+            {campo: self.payload(chica)[campo] for campo in cambios}
+        )
+        actualizando_grande, _ = self.contar(
+            'patch', f"/api/trazabilidades/{respuesta_grande.data['id']}/",
+            {campo: self.payload(grande)[campo] for campo in cambios}
+        )
+        self.assertEqual(actualizando_chica, actualizando_grande)
+        self.assertEqual(trazabilidad.colaboradores_reales.count(), 8)
+
+    def test_colaboradores_repetidos_o_inexistentes(self):
+        tarea = self.crear_tarea(colaboradores=2, con_hoja=True)
+        payload = self.payload(tarea)
+        codigo = payload['colaboradores_codigos'][0]
+
+        with self.assertLogs('produccion', 'INFO'):
+            payload['colaboradores_codigos'] = [codigo, codigo]
+            respuesta = self.client.post('/api/trazabilidades/', payload, format='json')
+            self.assertEqual(respuesta.status_code, 400)
+            self.assertIn(f'Colaboradores repetidos: [{codigo}]', str(respuesta.data['colaboradores_codigos']))
+
+            payload['colaboradores_codigos'] = [codigo, 999999]
+            respuesta = self.client.post('/api/trazabilidades/', payload, format='json')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('Colaboradores no encontrados: [999999]', str(respuesta.data['colaboradores_codigos']))
+        self.assertFalse(Trazabilidad.objects.exists())
+
+
+# ============================================================================
+# TESTS: Importación de colaboradores
+# ============================================================================
+class ImportacionColaboradoresTests(APITestCase):
+    """Upsert masivo: conteos, desactivación de ausentes y consultas"""
+
+    def crear_colaboradores(self, *codigos):
+        for codigo in codigos:
+            Colaborador.objects.create(codigo=codigo, nombre='Antes', apellido='Apellido')
+
+    def test_creados_actualizados_y_desactivados(self):
+        self.crear_colaboradores(1, 2, 3)
+
+        resultado = importar_colaboradores([
+            {'codigo': 1, 'nombre': 'Después', 'apellido': 'Apellido'},
+            {'codigo': 4, 'nombre': 'Nuevo', 'apellido': 'Apellido'},
+        ], desactivar=True)
+
+        self.assertEqual(resultado, {'creados': 1, 'actualizados': 1, 'desactivados': 2})
+        self.assertEqual(Colaborador.objects.get(codigo=1).nombre, 'Después')
+        self.assertEqual(
+            set(Colaborador.objects.filter(activo=True).values_list('codigo', flat=True)), {1, 4}
+        )
+
+    def test_consultas_no_dependen_de_las_filas(self):
+        def contar(desde, cantidad):
+            filas = [
+                {'codigo': codigo, 'nombre': 'Nombre', 'apellido': 'Apellido'}
+                for codigo in range(desde, desde + cantidad)
+            ]
+            with CaptureQueriesContext(connection) as consultas:
+                importar_colaboradores(filas, desactivar=True)
+            return len(consultas)
+
+        # Cada importación deja fuera a los de la anterior (un UPDATE por lote)
+        self.crear_colaboradores(0)
+        self.assertEqual(contar(1, 5), contar(100, 50))
+
+    def test_codigo_repetido_en_otro_bloque_se_cuenta_una_vez(self):
+        filas = [
+            (2, (1, 'Primera', 'Apellido')),
+            (3, (2, 'Otro', 'Apellido')),
+            (4, (1, 'Última', 'Apellido')),
+        ]
+
+        resultado = importar_filas(filas, desactivar=True, tamano_lote=2)
+
+        self.assertEqual((resultado['creados'], resultado['actualizados']), (2, 0))
+        self.assertEqual(resultado['filas_procesadas'], 3)
+        self.assertEqual(Colaborador.objects.get(codigo=1).nombre, 'Última')
+
+
+def planilla_colaboradores(filas, nombre='colaboradores.xlsx'):
+    """Excel de colaboradores (headers + filas) listo para subir"""
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(['codigo', 'nombre', 'apellido'])
+    for fila in filas:
+        sheet.append(list(fila))
+    contenido = BytesIO()
+    workbook.save(contenido)
+    return SimpleUploadedFile(
+        nombre, contenido.getvalue(),
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    )
+
+
+class LecturaExcelTests(APITestCase):
+    """Lectura por bloques, errores por número de fila y límite de tamaño"""
+
+    def test_planilla_mayor_que_un_bloque(self):
+        archivo = planilla_colaboradores((codigo, 'Nombre', 'Apellido') for codigo in range(1, 8))
+        avances = []
+
+        resultado = importar_filas(
+            iterar_filas_excel(archivo), tamano_lote=3,
+            al_avanzar=lambda parcial: avances.append(parcial['filas_procesadas'])
+        )
+
+        self.assertEqual(avances, [3, 6, 7])
+        self.assertEqual(resultado['creados'], 7)
+        self.assertEqual(Colaborador.objects.count(), 7)
+
+    def test_fila_invalida_informa_su_numero(self):
+        archivo = planilla_colaboradores([
+            (1, 'Nombre', 'Apellido'),
+            ('abc', 'Nombre', 'Apellido'),
+            (None, None, None),
+            (3, '', 'Apellido'),
+        ])
+
+        resultado = importar_filas(iterar_filas_excel(archivo), desactivar=True)
+
+        self.assertEqual(resultado['total_errores'], 2)
+        self.assertEqual([error['fila'] for error in resultado['errores']], [3, 5])
+        self.assertIn('abc', resultado['errores'][0]['error'])
+        self.assertEqual(resultado['filas_procesadas'], 1)
+        # Con filas inválidas no se desactiva a nadie
+        self.assertEqual(resultado['desactivados'], 0)
+
+    @override_settings(MAX_EXCEL_SIZE=1024)
+    def test_archivo_demasiado_grande(self):
+        supervisor = Usuario.objects.create_user(username='supervisor', password='clave', rol='supervisor')
+        self.client.force_authenticate(supervisor)
+        # Un .xlsx mínimo ya pesa varios KB
+        archivo = planilla_colaboradores([(1, 'Nombre', 'Apellido')])
+
+        respuesta = self.client.post(
+            '/api/colaboradores/cargar_excel_archivo/', {'archivo': archivo}, format='multipart'
+        )
+
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('tamaño máximo', respuesta.data['error'])
+        self.assertFalse(ImportacionColaboradores.objects.exists())
+
+
+class ImportacionEnSegundoPlanoTests(APITestCase):
+    """Cola de importaciones: 202 al subir, avance consultable y reintentos"""
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        ajustes = override_settings(MEDIA_ROOT=media)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        supervisor = Usuario.objects.create_user(username='supervisor', password='clave', rol='supervisor')
+        self.client.force_authenticate(supervisor)
+
+    def subir(self, archivo):
+        respuesta = self.client.post(
+            '/api/colaboradores/cargar_excel_archivo/', {'archivo': archivo}, format='multipart'
+        )
+        self.assertEqual(respuesta.status_code, 202)
+        return respuesta
+
+    def test_subir_procesar_y_consultar_avance(self):
+        respuesta = self.subir(planilla_colaboradores([
+            (1, 'Ana', 'Pérez'),
+            (2, 'Luis', 'Soto'),
+            ('x', 'Mal', 'Código'),
+        ]))
+
+        self.assertEqual(respuesta.data['importacion']['estado'], 'pendiente')
+        self.assertEqual(ImportacionColaboradores.objects.get().estado, 'pendiente')
+
+        self.assertEqual(procesar_importaciones_pendientes(), 1)
+
+        avance = self.client.get(respuesta.data['url_progreso']).data
+        self.assertEqual(avance['estado'], 'completada')
+        self.assertEqual(avance['porcentaje'], 100)
+        self.assertEqual(avance['total_filas'], 3)
+        self.assertEqual((avance['creados'], avance['actualizados'], avance['filas_procesadas']), (2, 0, 2))
+        self.assertEqual(avance['errores'], [{'fila': 4, 'error': 'Código inválido: x'}])
+
+    def test_archivo_ilegible_termina_fallida(self):
+        respuesta = self.subir(SimpleUploadedFile('colaboradores.xlsx', b'no es un excel'))
+
+        procesar_importaciones_pendientes()
+
+        avance = self.client.get(respuesta.data['url_progreso']).data
+        self.assertEqual(avance['estado'], 'fallida')
+        self.assertTrue(avance['mensaje_error'].startswith('Error al procesar el archivo'))
+        self.assertIsNotNone(avance['fecha_finalizacion'])
+
+    def test_importacion_abandonada_se_retoma(self):
+        archivo = planilla_colaboradores([(1, 'Ana', 'Pérez')])
+        abandonada = ImportacionColaboradores.objects.create(archivo=archivo, estado='procesando')
+        en_curso = ImportacionColaboradores.objects.create(archivo=archivo, estado='procesando')
+        ImportacionColaboradores.objects.filter(id=abandonada.id).update(
+            fecha_actualizacion=timezone.now() - timedelta(minutes=MINUTOS_IMPORTACION_ABANDONADA + 1)
+        )
+
+        self.assertEqual(procesar_importaciones_pendientes(), 1)
+
+        abandonada.refresh_from_db()
+        en_curso.refresh_from_db()
+        self.assertEqual(abandonada.estado, 'completada')
+        self.assertEqual(abandonada.creados, 1)
+        self.assertEqual(en_curso.estado, 'procesando')
+
+
+# ============================================================================
+# TESTS: Consultas por endpoint de detalle
+# ============================================================================
+class ConsultasDetalleTests(DatosProduccionMixin, APITestCase):
+    """
+    Los serializers de detalle deben leer sólo datos precargados: la cantidad
+    de consultas no puede depender de colaboradores ni recetas.
+    """
+
+    def assertConsultasConstantes(self, consultas, url_chica, url_grande):
+        with self.assertNumQueries(consultas):
+            respuesta = self.client.get(url_chica)
+        self.assertEqual(respuesta.status_code, 200)
+
+        with self.assertNumQueries(consultas):
+            respuesta = self.client.get(url_grande)
+        self.assertEqual(respuesta.status_code, 200)
+
+    def test_detalle_tarea(self):
+        chica = self.crear_tarea(colaboradores=1, recetas=1)
+        grande = self.crear_tarea(colaboradores=15, recetas=12)
+
+        # tarea + colaboradores + recetas
+        self.assertConsultasConstantes(
+            3,
+            f'/api/tareas/{chica.id}/',
+            f'/api/tareas/{grande.id}/'
+        )
+
+    def test_detalle_hoja_procesos(self):
+        chica = self.crear_tarea(colaboradores=1, recetas=1, con_hoja=True)
+        grande = self.crear_tarea(colaboradores=15, recetas=12, con_hoja=True)
+
+        # hoja + colaboradores + recetas + eventos
+        self.assertConsultasConstantes(
+            4,
+            f'/api/hojas-procesos/{chica.hoja_procesos.id}/',
+            f'/api/hojas-procesos/{grande.hoja_procesos.id}/'
+        )
+
+    def test_detalle_hoja_procesos_con_muchos_eventos(self):
+        chica = self.crear_tarea(con_hoja=True)
+        grande = self.crear_tarea(con_hoja=True)
+        self.crear_eventos(chica.hoja_procesos, 2)
+        self.crear_eventos(grande.hoja_procesos, 80)
+
+        # hoja + colaboradores + recetas + eventos + máquinas
+        self.assertConsultasConstantes(
+            5,
+            f'/api/hojas-procesos/{chica.hoja_procesos.id}/',
+            f'/api/hojas-procesos/{grande.hoja_procesos.id}/'
+        )
+
+    def test_listado_eventos_de_una_hoja(self):
+        chica = self.crear_tarea(con_hoja=True)
+        grande = self.crear_tarea(con_hoja=True)
+        self.crear_eventos(chica.hoja_procesos, 2)
+        self.crear_eventos(grande.hoja_procesos, 80)
+
+        # conteo de la paginación + eventos + máquinas
+        self.assertConsultasConstantes(
+            3,
+            f'/api/eventos-proceso/?hoja_procesos={chica.hoja_procesos.id}',
+            f'/api/eventos-proceso/?hoja_procesos={grande.hoja_procesos.id}'
+        )
+
+    def test_hoja_procesos_por_tarea(self):
+        chica = self.crear_tarea(colaboradores=1, recetas=1, con_hoja=True)
+        grande = self.crear_tarea(colaboradores=15, recetas=12, con_hoja=True)
+
+        self.assertConsultasConstantes(
+            4,
+            f'/api/hojas-procesos/por_tarea/?tarea_id={chica.id}',
+            f'/api/hojas-procesos/por_tarea/?tarea_id={grande.id}'
+        )
+
+    def test_detalle_producto(self):
+        chica = self.crear_tarea(recetas=1)
+        grande = self.crear_tarea(recetas=12)
+
+        # producto + recetas
+        self.assertConsultasConstantes(
+            2,
+            f'/api/productos/{chica.producto.codigo}/',
+            f'/api/productos/{grande.producto.codigo}/'
+        )
+
+
+# ============================================================================
+# TESTS: Paginación por cursor
+# ============================================================================
+class PaginacionCursorTests(DatosProduccionMixin, APITestCase):
+    """El modo cursor recorre el historial completo sin repetir ni saltar"""
+
+    def recorrer(self, url):
+        ids = []
+        while url:
+            respuesta = self.client.get(url)
+            self.assertEqual(respuesta.status_code, 200)
+            self.assertNotIn('count', respuesta.data)
+            ids.extend(item['id'] for item in respuesta.data['results'])
+            url = respuesta.data['next']
+        return ids
+
+    def test_tareas_por_cursor(self):
+        tareas = [self.crear_tarea() for _ in range(7)]
+
+        ids = self.recorrer('/api/tareas/?paginacion=cursor&page_size=3')
+
+        self.assertEqual(sorted(ids), sorted(tarea.id for tarea in tareas))
+        self.assertEqual(len(ids), len(set(ids)))
+
+    def test_tareas_del_mismo_dia_con_altas_entre_paginas(self):
+        otra_linea = Linea.objects.exclude(id=self.linea.id).order_by('id').first()
+        tareas = [self.crear_tarea(linea=otra_linea) for _ in range(7)]
+
+        respuesta = self.client.get('/api/tareas/?paginacion=cursor&page_size=3')
+        ids = [item['id'] for item in respuesta.data['results']]
+        # Altas del mismo día mientras el cliente pagina, en una línea que
+        # ordena antes: un cursor por fecha + offset repetiría filas
+        nuevas = [self.crear_tarea() for _ in range(2)]
+        ids += self.recorrer(respuesta.data['next'])
+
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(set(ids) - {tarea.id for tarea in nuevas}, {tarea.id for tarea in tareas})
+
+    def test_hojas_por_cursor_en_orden(self):
+        tareas = [self.crear_tarea(con_hoja=True) for _ in range(5)]
+
+        ids = self.recorrer('/api/hojas-procesos/?paginacion=cursor&page_size=2')
+
+        esperados = list(
+            HojaProcesos.objects.filter(tarea__in=tareas)
+            .order_by('-fecha_inicio', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(ids, esperados)
+
+    def test_sin_cursor_mantiene_paginacion_por_pagina(self):
+        self.crear_tarea()
+
+        respuesta = self.client.get('/api/tareas/')
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.data['count'], 1)
+
+
+# ============================================================================
+# TESTS: Catálogo con ETag
+# ============================================================================
+class CatalogoTests(APITestCase):
+    """El catálogo se sirve desde caché y cambia de versión al guardar"""
+
+    def setUp(self):
+        invalidar_catalogo()
+
+    def test_catalogo_en_cache_sin_consultas(self):
+        respuesta = self.client.get('/api/catalogo/')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn('lineas', respuesta.json())
+        etag = respuesta['ETag']
+
+        with self.assertNumQueries(0):
+            respuesta = self.client.get('/api/catalogo/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 304)
+
+    def test_if_none_match_compara_etags(self):
+        etag = self.client.get('/api/catalogo/')['ETag']
+        hash_ = etag.strip('"')
+
+        for cabecera in [f'"otro", W/{etag}', f'"otro",{etag} ', '*']:
+            respuesta = self.client.get('/api/catalogo/', HTTP_IF_NONE_MATCH=cabecera)
+            self.assertEqual(respuesta.status_code, 304, cabecera)
+        # Contener el hash no basta: tiene que ser el mismo ETag
+        for cabecera in ['"otro"', f'"a{etag}"', hash_]:
+            respuesta = self.client.get('/api/catalogo/', HTTP_IF_NONE_MATCH=cabecera)
+            self.assertEqual(respuesta.status_code, 200, cabecera)
+
+    def test_guardar_cambia_la_version(self):
+        etag = self.client.get('/api/catalogo/')['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Maquina.objects.create(codigo='NUEVA', nombre='Máquina nueva')
+
+        respuesta = self.client.get('/api/catalogo/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotEqual(respuesta['ETag'], etag)
+        self.assertIn('NUEVA', [m['codigo'] for m in respuesta.json()['maquinas']])
+
+
+# ============================================================================
+# TESTS: Filtros de trazabilidades (juliano y fecha de producción)
+# ============================================================================
+class FiltrosTrazabilidadTests(DatosProduccionMixin, APITestCase):
+    """
+    Los filtros van por columnas indexadas (juliano, fecha_produccion), no
+    por el texto del lote ni por fechas de la tarea.
+    """
+
+    def trazabilidad(self, fecha_produccion, creada=None):
+        trazabilidad = self.crear_trazabilidad()
+        Trazabilidad.objects.filter(id=trazabilidad.id).update(
+            fecha_produccion=fecha_produccion,
+            juliano=Trazabilidad.calcular_juliano(fecha_produccion),
+            fecha_creacion=creada or timezone.make_aware(datetime.combine(fecha_produccion, time(18)))
+        )
+        return trazabilidad.id
+
+    def ids(self, parametros):
+        respuesta = self.client.get(f'/api/trazabilidades/?{parametros}')
+        self.assertEqual(respuesta.status_code, 200)
+        return {item['id'] for item in respuesta.data['results']}
+
+    def test_juliano_y_rango(self):
+        enero = self.trazabilidad(date(2025, 1, 10))
+        marzo = self.trazabilidad(date(2025, 3, 1))
+        marzo_siguiente = self.trazabilidad(date(2026, 3, 1))
+
+        self.assertEqual(self.ids('juliano=60'), {marzo, marzo_siguiente})
+        self.assertEqual(self.ids('juliano=60&anio=2025'), {marzo})
+        self.assertEqual(self.ids('juliano_desde=1&juliano_hasta=59'), {enero})
+        # Un número inválido se ignora
+        self.assertEqual(self.ids('juliano=abc'), {enero, marzo, marzo_siguiente})
+
+    def test_anio_es_el_de_elaboracion(self):
+        # Elaborado el 31/12 y registrado pasada la medianoche
+        fin_de_anio = self.trazabilidad(
+            date(2025, 12, 31), creada=timezone.make_aware(datetime(2026, 1, 1, 0, 30))
+        )
+
+        self.assertEqual(self.ids('juliano=365&anio=2025'), {fin_de_anio})
+        self.assertEqual(self.ids('juliano=365&anio=2026'), set())
+
+    def test_rango_de_fecha_de_produccion(self):
+        primero = self.trazabilidad(date(2025, 3, 1))
+        segundo = self.trazabilidad(date(2025, 3, 2))
+        tercero = self.trazabilidad(date(2025, 3, 3))
+
+        self.assertEqual(self.ids('fecha=2025-03-02'), {segundo})
+        self.assertEqual(self.ids('fecha_desde=2025-03-02'), {segundo, tercero})
+        self.assertEqual(self.ids('fecha_desde=2025-03-01&fecha_hasta=2025-03-02'), {primero, segundo})
+        # Una fecha inválida se ignora; el resto de los filtros se aplica
+        self.assertEqual(self.ids('fecha_desde=2025-13-01&fecha_hasta=2025-03-01'), {primero})
+        self.assertEqual(self.ids('fecha=ayer'), {primero, segundo, tercero})
+
+    def test_migracion_completa_fecha_de_produccion(self):
+        migracion = import_module('produccion.migrations.0010_fecha_produccion_trazabilidad')
+        iniciada = self.crear_trazabilidad()
+        sin_iniciar = self.crear_trazabilidad()
+        # 01:30 UTC del 2 de marzo es todavía 1 de marzo en Santiago
+        Tarea.objects.filter(hoja_procesos__trazabilidad=iniciada).update(
+            fecha=date(2025, 2, 28), fecha_inicio=datetime(2025, 3, 2, 1, 30, tzinfo=dt_timezone.utc)
+        )
+        Tarea.objects.filter(hoja_procesos__trazabilidad=sin_iniciar).update(
+            fecha=date(2025, 2, 28), fecha_inicio=None
+        )
+        Trazabilidad.objects.update(fecha_produccion=None)
+
+        migracion.completar_fecha_produccion(django_apps, None)
+
+        fechas = dict(Trazabilidad.objects.values_list('id', 'fecha_produccion'))
+        self.assertEqual(fechas, {iniciada.id: date(2025, 3, 1), sin_iniciar.id: date(2025, 2, 28)})
+
+    def test_alta_por_el_orm_toma_la_fecha_de_la_tarea(self):
+        # Como desde el admin o la shell: sin pasar fecha_produccion
+        tarea = self.crear_tarea(con_hoja=True)
+        Tarea.objects.filter(id=tarea.id).update(
+            fecha=date(2025, 2, 28), fecha_inicio=datetime(2025, 3, 2, 1, 30, tzinfo=dt_timezone.utc)
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            trazabilidad = Trazabilidad.objects.create(
+                hoja_procesos=HojaProcesos.objects.get(tarea=tarea),
+                cantidad_producida=40,
+                juliano=60,
+                lote=f'{tarea.producto.codigo}-60-1'
+            )
+
+        self.assertEqual(trazabilidad.fecha_produccion, date(2025, 3, 1))
+        self.assertEqual(self.ids('fecha=2025-03-01'), {trazabilidad.id})
+        resumen = ResumenProduccionDiario.objects.get()
+        self.assertEqual((resumen.fecha, resumen.cantidad_producida), (date(2025, 3, 1), 40))
+
+
+# ============================================================================
+# TESTS: Inicio de tareas
+# ============================================================================
+class IniciarTareaTests(DatosProduccionMixin, APITestCase):
+    """Sólo una tarea en curso por línea, sin consulta previa de bloqueo"""
+
+    def test_iniciar_tarea(self):
+        tarea = self.crear_tarea()
+
+        respuesta = self.client.post(f'/api/tareas/{tarea.id}/iniciar/')
+
+        self.assertEqual(respuesta.status_code, 200)
+        tarea.refresh_from_db()
+        self.assertEqual(tarea.estado, 'en_curso')
+        self.assertIsNotNone(tarea.fecha_inicio)
+
+    def test_segunda_tarea_de_la_linea_responde_409(self):
+        en_curso = self.crear_tarea()
+        otra = self.crear_tarea()
+        self.client.post(f'/api/tareas/{en_curso.id}/iniciar/')
+
+        respuesta = self.client.post(f'/api/tareas/{otra.id}/iniciar/')
+
+        self.assertEqual(respuesta.status_code, 409)
+        self.assertEqual(respuesta.data['tarea_en_curso']['id'], en_curso.id)
+        otra.refresh_from_db()
+        self.assertEqual(otra.estado, 'pendiente')
+
+    def test_tarea_ya_iniciada_responde_400(self):
+        tarea = self.crear_tarea()
+        self.client.post(f'/api/tareas/{tarea.id}/iniciar/')
+
+        respuesta = self.client.post(f'/api/tareas/{tarea.id}/iniciar/')
+
+        self.assertEqual(respuesta.status_code, 400)
+
+    def test_la_base_rechaza_dos_tareas_en_curso(self):
+        primera = self.crear_tarea()
+        segunda = self.crear_tarea()
+        Tarea.objects.filter(pk=primera.pk).update(estado='en_curso')
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Tarea.objects.filter(pk=segunda.pk).update(estado='en_curso')
+
+
+# ============================================================================
+# TESTS: Tiempo real
+# ============================================================================
+class TiempoRealTests(DatosProduccionMixin, APITestCase):
+    """Los cambios confirmados llegan a los clientes suscritos"""
+
+    def test_iniciar_tarea_publica_evento(self):
+        tarea = self.crear_tarea()
+        loop = asyncio.new_event_loop()
+        suscripcion = broker.suscribir(loop=loop)
+        try:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(f'/api/tareas/{tarea.id}/iniciar/')
+
+            evento = loop.run_until_complete(asyncio.wait_for(suscripcion.cola.get(), 1))
+        finally:
+            broker.desuscribir(suscripcion)
+            loop.close()
+
+        self.assertEqual(evento['tipo'], 'tarea')
+        self.assertEqual(evento['datos']['id'], tarea.id)
+        self.assertEqual(evento['datos']['estado'], 'en_curso')
+
+    def test_stream_requiere_token(self):
+        sin_token = self.client.get('/api/tiempo-real/')
+        token_invalido = self.client.get('/api/tiempo-real/?token=abc')
+        con_token = self.client.get(f'/api/tiempo-real/?token={AccessToken.for_user(self.supervisor)}')
+
+        self.assertEqual(sin_token.status_code, 401)
+        self.assertEqual(token_invalido.status_code, 401)
+        self.assertEqual(con_token.status_code, 200)
+        self.assertEqual(con_token['Content-Type'], 'text/event-stream')
+
+    def test_guardar_evento_lee_la_linea_en_una_consulta(self):
+        tarea = self.crear_tarea(con_hoja=True)
+        self.crear_eventos(tarea.hoja_procesos, 1)
+        evento = EventoProceso.objects.get(hoja_procesos__tarea=tarea)
+        loop = asyncio.new_event_loop()
+        suscripcion = broker.suscribir(loop=loop)
+        try:
+            # UPDATE del evento + línea de la hoja
+            with self.assertNumQueries(2), self.captureOnCommitCallbacks(execute=True):
+                evento.save()
+
+            publicado = loop.run_until_complete(asyncio.wait_for(suscripcion.cola.get(), 1))
+        finally:
+            broker.desuscribir(suscripcion)
+            loop.close()
+
+        self.assertEqual(publicado['datos']['linea'], tarea.linea_id)
+
+    def test_stream_filtra_por_linea(self):
+        async def leer():
+            stream = stream_eventos({'linea': '1'})
+            self.assertEqual(await stream.__anext__(), 'retry: 3000\n\n')
+            siguiente = asyncio.ensure_future(stream.__anext__())
+            broker.difundir({'tipo': 'tarea', 'datos': {'id': 4, 'linea': 2}})
+            broker.difundir({'tipo': 'tarea', 'datos': {'id': 5, 'linea': 1}})
+            try:
+                return await asyncio.wait_for(siguiente, 1)
+            finally:
+                await stream.aclose()
+
+        chunk = asyncio.run(leer())
+
+        self.assertIn('event: tarea\n', chunk)
+        self.assertIn('"id": 5', chunk)
+        self.assertEqual(broker.total_suscripciones, 0)
+
+
+# ============================================================================
+# TESTS: Sincronización de tablets
+# ============================================================================
+class SincronizacionTests(DatosProduccionMixin, APITestCase):
+    """Lotes offline: orden de dependencias, idempotencia y conflictos"""
+
+    def lote(self, tarea):
+        tipo = TipoEvento.objects.order_by('id').first()
+        inicio = timezone.now()
+        # Enviado en desorden: el servidor aplica primero la hoja
+        return {'operaciones': [
+            {'clave': 'ev-1', 'tipo': 'evento_proceso', 'accion': 'crear', 'datos': {
+                'hoja_procesos': {'ref': 'hoja-1'},
+                'tipo_evento': tipo.id,
+                'hora_inicio': inicio.isoformat(),
+            }},
+            {'clave': 'ev-1-fin', 'tipo': 'evento_proceso', 'accion': 'actualizar', 'datos': {
+                'id': {'ref': 'ev-1'},
+                'hora_fin': (inicio + timedelta(minutes=5)).isoformat(),
+            }},
+            {'clave': 'hoja-1', 'tipo': 'hoja_procesos', 'accion': 'crear', 'datos': {
+                'tarea': tarea.id,
+            }},
+        ]}
+
+    def test_aplica_en_orden_de_dependencias(self):
+        tarea = self.crear_tarea()
+
+        respuesta = self.client.post('/api/sync/', self.lote(tarea), format='json')
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.data['aplicadas'], 3)
+        hoja = HojaProcesos.objects.get(tarea=tarea)
+        evento = hoja.eventos.get()
+        self.assertIsNotNone(evento.hora_fin)
+        self.assertEqual(respuesta.data['resultados'][0]['id'], evento.id)
+        self.assertEqual(respuesta.data['resultados'][2]['id'], hoja.id)
+
+    def test_reenviar_lote_no_duplica(self):
+        tarea = self.crear_tarea()
+        primera = self.client.post('/api/sync/', self.lote(tarea), format='json')
+
+        segunda = self.client.post('/api/sync/', self.lote(tarea), format='json')
+
+        self.assertEqual(segunda.data['repetidas'], 3)
+        self.assertEqual(EventoProceso.objects.filter(hoja_procesos__tarea=tarea).count(), 1)
+        self.assertEqual(
+            [r['id'] for r in segunda.data['resultados']],
+            [r['id'] for r in primera.data['resultados']]
+        )
+
+    def test_conflicto_no_afecta_al_resto(self):
+        tarea = self.crear_tarea()
+        lote = self.lote(tarea)
+        lote['operaciones'].append({
+            'clave': 'ev-malo', 'tipo': 'evento_proceso', 'accion': 'crear',
+            'datos': {'hoja_procesos': {'ref': 'hoja-1'}},
+        })
+
+        respuesta = self.client.post('/api/sync/', lote, format='json')
+
+        self.assertEqual(respuesta.data['aplicadas'], 3)
+        self.assertEqual(respuesta.data['resultados'][3]['estado'], 'conflicto')
+        self.assertIn('tipo_evento', respuesta.data['resultados'][3]['errores'])
+
+    def test_operacion_no_soportada(self):
+        respuesta = self.client.post('/api/sync/', {'operaciones': [
+            {'clave': 'x', 'tipo': 'tarea', 'accion': 'borrar', 'datos': {}},
+        ]}, format='json')
+
+        self.assertEqual(respuesta.status_code, 400)
+
+
+# ============================================================================
+# TESTS: Analítica OEE
+# ============================================================================
+class OeeTests(DatosProduccionMixin, APITestCase):
+    """Tiempos por tipo de evento, eventos abiertos y Pareto de paradas"""
+
+    def test_oee_con_evento_abierto(self):
+        tarea = self.crear_tarea(con_hoja=True)
+        inicio = timezone.now() - timedelta(hours=3)
+        Tarea.objects.filter(pk=tarea.pk).update(estado='finalizada', fecha_inicio=inicio)
+        hoja = tarea.hoja_procesos
+        tipos = {tipo.codigo: tipo for tipo in TipoEvento.objects.all()}
+
+        def evento(codigo, desde, hasta=None):
+            EventoProceso.objects.create(
+                hoja_procesos=hoja,
+                tipo_evento=tipos[codigo],
+                hora_inicio=inicio + timedelta(minutes=desde),
+                hora_fin=inicio + timedelta(minutes=hasta) if hasta is not None else None
+            )
+
+        evento('PRODUCCION', 0, 60)
+        evento('FALLA_MAQUINA', 60, 80)
+        evento('COLACION', 80, 110)
+        # Abierto: termina cuando se cerró la hoja
+        evento('CAMBIO_LIMPIEZA', 110)
+        HojaProcesos.objects.filter(pk=hoja.pk).update(
+            finalizada=True, fecha_finalizacion=inicio + timedelta(minutes=120)
+        )
+        Trazabilidad.objects.create(
+            hoja_procesos=hoja, cantidad_producida=50, juliano=1, lote='P-1-1'
+        )
+
+        hoy = date.today().isoformat()
+        # Una consulta para tiempos y otra para cantidades
+        with self.assertNumQueries(2):
+            respuesta = self.client.get(f'/api/analytics/oee/?desde={hoy}&hasta={hoy}')
+
+        self.assertEqual(respuesta.status_code, 200)
+        total = respuesta.data['total']
+        self.assertEqual(total['minutos_disponibles'], 90.0)
+        self.assertEqual(total['minutos_produccion'], 60.0)
+        self.assertEqual(total['disponibilidad'], 0.6667)
+        self.assertEqual(total['cumplimiento_meta'], 0.5)
+        # Sin tasa ideal del producto no hay rendimiento ni OEE
+        self.assertTrue(total['sin_tasa_ideal'])
+        self.assertIsNone(total['rendimiento'])
+        self.assertIsNone(total['oee'])
+        self.assertEqual(respuesta.data['por_linea'][0]['linea'], self.linea.id)
+        self.assertEqual(
+            [(p['codigo'], p['minutos']) for p in respuesta.data['pareto_paradas']],
+            [('FALLA_MAQUINA', 20.0), ('CAMBIO_LIMPIEZA', 10.0)]
+        )
+
+        # 60 minutos en PRODUCCION a 100 u/h: se esperaban 100, salieron 50
+        Producto.objects.filter(pk=tarea.producto_id).update(unidades_por_hora=100)
+        total = self.client.get(f'/api/analytics/oee/?desde={hoy}&hasta={hoy}').data['total']
+        self.assertFalse(total['sin_tasa_ideal'])
+        self.assertEqual(total['producida_ideal'], 100.0)
+        self.assertEqual(total['rendimiento'], 0.5)
+        self.assertEqual(total['calidad'], 1)
+        self.assertEqual(total['oee'], 0.3333)
+
+    def test_rango_invalido(self):
+        respuesta = self.client.get('/api/analytics/oee/?desde=2025-02-01&hasta=2025-01-01')
+
+        self.assertEqual(respuesta.status_code, 400)
+
+
+# ============================================================================
+# TESTS: Resumen de producción diario
+# ============================================================================
+class ResumenDiarioTests(DatosProduccionMixin, APITestCase):
+    """El resumen sigue a las trazabilidades y se puede reconstruir"""
+
+    def test_se_actualiza_al_guardar_y_borrar(self):
+        trazabilidad = self.crear_trazabilidad()
+
+        resumen = ResumenProduccionDiario.objects.get()
+        self.assertEqual(resumen.fecha, date.today())
+        self.assertEqual(resumen.cantidad_producida, 40)
+        self.assertEqual(resumen.meta_produccion, 100)
+        self.assertEqual(str(resumen.materia_prima_kg), '12.00')
+        self.assertEqual(str(resumen.merma_kg), '1.50')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            trazabilidad.cantidad_producida = 55
+            trazabilidad.save()
+        self.assertEqual(ResumenProduccionDiario.objects.get().cantidad_producida, 55)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            trazabilidad.delete()
+        self.assertFalse(ResumenProduccionDiario.objects.exists())
+
+    def test_borrar_detalle_desde_el_admin(self):
+        trazabilidad = self.crear_trazabilidad(merma='2.00')
+        mp_usada = trazabilidad.materias_primas_usadas.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            Reproceso.objects.create(trazabilidad_materia_prima=mp_usada, cantidad='0.50', causas='deformacion')
+        self.assertEqual(str(ResumenProduccionDiario.objects.get().reproceso_kg), '0.50')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Merma.objects.get().delete()
+        self.assertEqual(str(ResumenProduccionDiario.objects.get().merma_kg), '0.00')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Reproceso.objects.get().delete()
+        self.assertEqual(str(ResumenProduccionDiario.objects.get().reproceso_kg), '0.00')
+
+        # La materia prima se lleva en cascada su merma
+        with self.captureOnCommitCallbacks(execute=True):
+            Merma.objects.create(trazabilidad_materia_prima=mp_usada, cantidad='1.00')
+        with self.captureOnCommitCallbacks(execute=True):
+            mp_usada.delete()
+        resumen = ResumenProduccionDiario.objects.get()
+        self.assertEqual((str(resumen.materia_prima_kg), str(resumen.merma_kg)), ('0.00', '0.00'))
+
+    def test_sigue_los_cambios_de_la_tarea(self):
+        trazabilidad = self.crear_trazabilidad()
+        tarea = trazabilidad.hoja_procesos.tarea
+        otra_linea = Linea.objects.create(nombre='Línea nueva')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            tarea.linea = otra_linea
+            tarea.meta_produccion = 80
+            tarea.save()
+        resumen = ResumenProduccionDiario.objects.get()
+        self.assertEqual((resumen.linea, resumen.meta_produccion), (otra_linea, 80))
+        self.assertEqual(resumen.cantidad_producida, 40)
+
+        # Un cambio de estado no consulta las trazabilidades
+        with self.assertNumQueries(1):
+            tarea.estado = 'finalizada'
+            tarea.save(update_fields=['estado'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            tarea.delete()
+        self.assertFalse(ResumenProduccionDiario.objects.exists())
+
+    def test_reconstruir(self):
+        self.crear_trazabilidad(cantidad=10)
+        self.crear_trazabilidad(cantidad=20)
+        esperado = list(ResumenProduccionDiario.objects.values_list('producto', 'cantidad_producida'))
+        ResumenProduccionDiario.objects.all().delete()
+
+        hoy = date.today().isoformat()
+        call_command('reconstruir_resumen_diario', '--desde', hoy, '--hasta', hoy, stdout=StringIO())
+
+        self.assertCountEqual(
+            ResumenProduccionDiario.objects.values_list('producto', 'cantidad_producida'),
+            esperado
+        )
+        with self.assertNumQueries(1):
+            respuesta = self.client.get(f'/api/resumenes-diarios/totales/?desde={hoy}&hasta={hoy}')
+        self.assertEqual(respuesta.data['cantidad_producida'], 30)
+
+
+# ============================================================================
+# TESTS: Analítica de mermas y reprocesos
+# ============================================================================
+class MermasTests(DatosProduccionMixin, APITestCase):
+    """Totales y tasas por causa y por dimensión, en JSON y CSV"""
+
+    def test_por_causa_y_materia_prima(self):
+        self.crear_trazabilidad(merma='3.00')
+        hoy = date.today().isoformat()
+
+        with self.assertNumQueries(3):
+            respuesta = self.client.get(f'/api/analytics/mermas/?agrupar=causa&desde={hoy}&hasta={hoy}')
+        causa = respuesta.data['resultados'][0]
+        self.assertEqual((causa['tipo'], causa['cantidad'], causa['tasa']), ('merma', 3, 0.25))
+
+        with self.assertNumQueries(3):
+            respuesta = self.client.get(f'/api/analytics/mermas/?agrupar=materia_prima&desde={hoy}&hasta={hoy}')
+        fila = respuesta.data['resultados'][0]
+        self.assertEqual((fila['cantidad_usada'], fila['merma'], fila['tasa_merma']), (12, 3, 0.25))
+
+        respuesta = self.client.get(f'/api/analytics/mermas/?agrupar=semana&desde={hoy}&hasta={hoy}&formato=csv')
+        self.assertEqual(respuesta['Content-Type'], 'text/csv; charset=utf-8')
+        encabezado = respuesta.content.decode('utf-8-sig').splitlines()[0]
+        self.assertTrue(encabezado.startswith('semana,unidad_medida,cantidad_usada,merma'))
+
+    def test_agrupacion_invalida(self):
+        respuesta = self.client.get('/api/analytics/mermas/?agrupar=color')
+
+        self.assertEqual(respuesta.status_code, 400)
+
+
+# ============================================================================
+# TESTS: Exportación de trazabilidades
+# ============================================================================
+class ExportacionTests(DatosProduccionMixin, APITestCase):
+    """Exportación CSV/XLSX con consultas fijas por lote de trazabilidades"""
+
+    def exportar_csv(self):
+        respuesta = self.client.get('/api/trazabilidades/exportar/')
+        self.assertEqual(respuesta.status_code, 200)
+        return b''.join(respuesta.streaming_content).decode('utf-8-sig').splitlines()
+
+    def test_csv_consultas_constantes(self):
+        self.crear_trazabilidad()
+        # trazabilidades + materias primas + mermas + reprocesos + colaboradores + firmas
+        with self.assertNumQueries(6):
+            lineas = self.exportar_csv()
+        self.assertEqual(len(lineas), 2)
+        self.assertIn('1.50', lineas[1])
+
+        for _ in range(4):
+            self.crear_trazabilidad()
+        with self.assertNumQueries(6):
+            self.assertEqual(len(self.exportar_csv()), 6)
+
+    def test_xlsx(self):
+        from openpyxl import load_workbook
+
+        trazabilidad = self.crear_trazabilidad()
+        respuesta = self.client.get('/api/trazabilidades/exportar/?formato=xlsx')
+
+        self.assertEqual(respuesta.status_code, 200)
+        hoja = load_workbook(BytesIO(b''.join(respuesta.streaming_content))).active
+        filas = list(hoja.iter_rows(values_only=True))
+        self.assertEqual(filas[0][1], 'lote')
+        self.assertEqual(filas[1][1], trazabilidad.lote)
+
+
+# ============================================================================
+# TESTS: Recall de lotes
+# ============================================================================
+class RecallTests(DatosProduccionMixin, APITestCase):
+    """De lote de materia prima a lotes terminados y viceversa"""
+
+    def test_recall_y_genealogia(self):
+        usadas = []
+        for lote in ('MJ-2024-01', 'MJ-2024-02', 'OTRO-1'):
+            trazabilidad = self.crear_trazabilidad()
+            mp_usada = trazabilidad.materias_primas_usadas.get()
+            mp_usada.lote = lote
+            mp_usada.materia_prima = usadas[0].materia_prima if usadas else mp_usada.materia_prima
+            mp_usada.save()
+            usadas.append(mp_usada)
+        codigo = usadas[0].materia_prima.codigo
+
+        with self.assertNumQueries(1):
+            respuesta = self.client.get(f'/api/recall/?materia_prima={codigo}&lote=MJ-2024-01')
+        self.assertEqual(respuesta.data['total'], 1)
+        self.assertEqual(respuesta.data['trazabilidades'][0]['lote'], usadas[0].trazabilidad.lote)
+
+        respuesta = self.client.get(f'/api/recall/?materia_prima={codigo}&lote=MJ-&prefijo=true')
+        self.assertEqual(
+            [t['lote_materia_prima'] for t in respuesta.data['trazabilidades']],
+            ['MJ-2024-01', 'MJ-2024-02']
+        )
+
+        with self.assertNumQueries(2):
+            respuesta = self.client.get(f'/api/recall/insumos/?lote={usadas[1].trazabilidad.lote}')
+        insumos = respuesta.data['trazabilidades'][0]['insumos']
+        self.assertEqual([insumo['lote'] for insumo in insumos], ['MJ-2024-02'])
+
+    def test_parametros_requeridos(self):
+        self.assertEqual(self.client.get('/api/recall/?lote=X').status_code, 400)
+        self.assertEqual(self.client.get('/api/recall/insumos/').status_code, 400)
+
+
+# ============================================================================
+# TESTS: Búsqueda
+# ============================================================================
+class BusquedaTests(DatosProduccionMixin, APITestCase):
+    """Sin acentos, sin mayúsculas y por palabras sueltas"""
+
+    def test_materias_primas_sin_acentos_y_abreviadas(self):
+        MateriaPrima.objects.create(codigo='COB-01', nombre='Cobertura de Leche')
+        MateriaPrima.objects.create(codigo='BAN-01', nombre='Bañado Chocolate')
+        MateriaPrima.objects.create(codigo='MAN-01', nombre='Manjar')
+
+        # Las migraciones cargan más materias primas; basta con ver que
+        # aparezca la esperada y no la otra
+        codigos = [mp['codigo'] for mp in self.client.get('/api/materias-primas/?search=COB. LECHE').data]
+        self.assertIn('COB-01', codigos)
+        self.assertNotIn('MAN-01', codigos)
+
+        codigos = [mp['codigo'] for mp in self.client.get('/api/materias-primas/?search=banado').data]
+        self.assertIn('BAN-01', codigos)
+        self.assertNotIn('COB-01', codigos)
+
+    def test_colaboradores_por_codigo_o_nombre(self):
+        Colaborador.objects.create(codigo=4321, nombre='José', apellido='Muñoz')
+
+        respuesta = self.client.get('/api/colaboradores/?search=munoz jose')
+        self.assertEqual([c['codigo'] for c in respuesta.data['results']], [4321])
+
+        respuesta = self.client.get('/api/colaboradores/?search=4321')
+        self.assertEqual([c['codigo'] for c in respuesta.data['results']], [4321])
+
+
+# ============================================================================
+# TESTS: Logging
+# ============================================================================
+class RegistroTests(APITestCase):
+    """Id de correlación por petición y formato JSON"""
+
+    def test_id_de_correlacion_se_respeta_o_se_genera(self):
+        respuesta = self.client.get('/api/lineas/', HTTP_X_REQUEST_ID='abc-123')
+        self.assertEqual(respuesta['X-Request-ID'], 'abc-123')
+
+        # Un id con caracteres no permitidos se reemplaza por uno nuevo
+        respuesta = self.client.get('/api/lineas/', HTTP_X_REQUEST_ID='<script>')
+        self.assertRegex(respuesta['X-Request-ID'], r'^[0-9a-f]{32}$')
+
+    def test_formato_json_incluye_id_y_extra(self):
+        salida = StringIO()
+        manejador = logging.StreamHandler(salida)
+        manejador.addFilter(IdCorrelacionFilter())
+        manejador.setFormatter(FormatoJSON())
+        logger = logging.getLogger('pruebas.registro')
+        logger.addHandler(manejador)
+        self.addCleanup(logger.removeHandler, manejador)
+
+        token = id_correlacion.set('abc-123')
+        try:
+            logger.warning('Trazabilidad rechazada', extra={'trazabilidad': 7})
+        finally:
+            id_correlacion.reset(token)
+
+        registro = json.loads(salida.getvalue())
+        self.assertEqual(registro['mensaje'], 'Trazabilidad rechazada')
+        self.assertEqual(registro['id_correlacion'], 'abc-123')
+        self.assertEqual(registro['trazabilidad'], 7)
+
+
+# ============================================================================
+# TESTS: Instrumentación
+# ============================================================================
+class InstrumentacionTests(DatosProduccionMixin, APITestCase):
+    """Server-Timing y log de peticiones lentas"""
+
+    def test_server_timing_cuenta_las_consultas(self):
+        tarea = self.crear_tarea(colaboradores=2, con_hoja=True)
+
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get(f'/api/tareas/{tarea.id}/')
+        self.assertEqual(respuesta.status_code, 200)
+
+        metricas = dict(
+            parte.strip().split(';', 1) for parte in respuesta['Server-Timing'].split(',')
+        )
+        self.assertEqual(set(metricas), {'db', 'serializacion', 'render', 'total'})
+        self.assertIn(f'desc="{len(consultas)} consultas"', metricas['db'])
+
+    async def test_asgi_mide_vistas_sincronas_y_no_el_stream(self):
+        tarea = await sync_to_async(self.crear_tarea)(colaboradores=2, con_hoja=True)
+        token = await sync_to_async(AccessToken.for_user)(self.supervisor)
+
+        respuesta = await self.async_client.get(
+            f'/api/tareas/{tarea.id}/', HTTP_AUTHORIZATION=f'Bearer {token}'
+        )
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotIn('desc="0 consultas"', respuesta['Server-Timing'])
+
+        stream = await self.async_client.get(f'/api/tiempo-real/?token={token}')
+        self.assertEqual(stream['Content-Type'], 'text/event-stream')
+        self.assertFalse(stream.has_header('Server-Timing'))
+
+    @override_settings(INSTRUMENTACION_UMBRAL_LENTO_MS=0)
+    def test_peticion_lenta_se_registra_con_su_vista(self):
+        self.crear_tarea(colaboradores=2)
+
+        with self.assertLogs('produccion.instrumentacion', 'WARNING') as logs:
+            self.client.get('/api/tareas/')
+
+        registro = logs.records[0]
+        self.assertEqual(registro.vista, 'TareaViewSet.list')
+        self.assertEqual(registro.estado, 200)
+        self.assertGreater(registro.consultas, 0)
+        self.assertGreater(registro.bytes, 0)
+        self.assertIsInstance(registro.sql_repetidas, list)
+
+
+# ============================================================================
+# TESTS: Métricas
+# ============================================================================
+@override_settings(METRICAS_SEGUNDOS_CACHE=0)
+class MetricasTests(DatosProduccionMixin, APITestCase):
+    """/metrics en formato Prometheus"""
+
+    def test_indicadores_de_planta(self):
+        tarea = self.crear_tarea(con_hoja=True)
+        Tarea.objects.filter(id=tarea.id).update(estado='en_curso')
+        EventoProceso.objects.create(
+            hoja_procesos=tarea.hoja_procesos,
+            tipo_evento=TipoEvento.objects.first(),
+            hora_inicio=timezone.now()
+        )
+        trazabilidad = self.crear_trazabilidad()
+        FirmaTrazabilidad.objects.create(
+            trazabilidad=trazabilidad, tipo_firma='supervisor', usuario=self.supervisor
+        )
+        # Liberada sin firmas: ya no está pendiente
+        Trazabilidad.objects.filter(id=self.crear_trazabilidad().id).update(estado='liberado')
+
+        respuesta = self.client.get('/metrics')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(respuesta['Content-Type'].startswith('text/plain; version=0.0.4'))
+
+        texto = respuesta.content.decode()
+        linea = self.linea.nombre
+        self.assertIn(f'produccion_tareas_en_curso{{linea="{linea}"}} 1\n', texto)
+        self.assertIn(f'produccion_eventos_proceso_abiertos{{linea="{linea}"}} 1\n', texto)
+        self.assertIn('produccion_trazabilidades_pendientes_firma{tipo_firma="supervisor"} 0\n', texto)
+        self.assertIn('produccion_trazabilidades_pendientes_firma{tipo_firma="control_calidad"} 1\n', texto)
+
+    def test_histogramas_por_vista(self):
+        self.client.get('/api/lineas/')
+        texto = self.client.get('/metrics').content.decode()
+
+        self.assertIn('# TYPE produccion_peticion_duracion_segundos histogram', texto)
+        self.assertRegex(texto, r'produccion_peticion_duracion_segundos_bucket\{vista="LineaViewSet.list",le="\+Inf"\} [1-9]')
+        self.assertRegex(texto, r'produccion_peticiones_total\{vista="LineaViewSet.list",estado="200"\} [1-9]')
+
+    @override_settings(METRICAS_TOKEN='secreto')
+    def test_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        respuesta = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secreto')
+        self.assertEqual(respuesta.status_code, 200)
+
+
+# ============================================================================
+# TESTS: Datos sintéticos y benchmark
+# ============================================================================
+class BenchmarkTests(APITestCase):
+    """Los escenarios corren sin errores sobre datos sintéticos"""
+
+    def test_escenarios_sobre_datos_sinteticos(self):
+        call_command(
+            'generar_datos_sinteticos', dias=3, lineas=2, colaboradores=12, productos=3,
+            stdout=StringIO()
+        )
+        self.assertEqual(Trazabilidad.objects.count(), 3 * 2 * 2)
+        self.assertTrue(ResumenProduccionDiario.objects.exists())
+
+        # assertLogs además evita que los logs de cada firma ensucien la salida
+        with tempfile.NamedTemporaryFile(suffix='.json') as archivo, self.assertLogs('produccion', 'INFO'):
+            call_command(
+                'benchmark', concurrencia=1, repeticiones=1, lineas=2, firmas=4, clientes=5,
+                salida_json=archivo.name, stdout=StringIO()
+            )
+            reporte = json.load(archivo)
+
+        self.assertEqual(set(reporte), {'dashboard', 'fin_turno', 'firmas', 'conexiones'})
+        self.assertEqual(sum(fila['peticiones'] for fila in reporte['conexiones']), 5)
+        for filas in reporte.values():
+            for fila in filas:
+                self.assertEqual(fila['errores'], 0, fila['endpoint'])
+                self.assertIsNotNone(fila['consultas_max'], fila['endpoint'])
+
+        # Con la misma corrida como base no hay regresiones de consultas
+        self.assertEqual(
+            [r for r in comparar(reporte['firmas'], reporte['firmas']) if 'consultas' in r], []
+        )
+
+
+# ============================================================================
+# TESTS: Consultas constantes en todos los endpoints del router
+# ============================================================================
+class ConsultasConstantesTests(DatosProduccionMixin, APITestCase):
+    """
+    Cada endpoint del router (listados, detalles y acciones) debe hacer las
+    mismas consultas con N que con 2N filas, y los detalles lo mismo con más
+    hijos (colaboradores, materias primas). Un N+1 nuevo rompe este test.
+    """
+
+    N = 3
+
+    def setUp(self):
+        self.client.force_authenticate(self.supervisor)
+        self.calidad = Usuario.objects.create_user(
+            username='calidad', password='clave', rol='control_calidad'
+        )
+
+    def sembrar(self, cantidad, hijos=2):
+        """Por cada vuelta: una línea con una tarea en curso y otra ya trazada"""
+        for _ in range(cantidad):
+            self.secuencia += 1
+            linea = Linea.objects.create(nombre=f'Línea {self.secuencia}')
+            Maquina.objects.create(codigo=f'MQ{self.secuencia}', nombre=f'Máquina {self.secuencia}')
+            TipoEvento.objects.create(codigo=f'TE{self.secuencia}', nombre=f'Evento {self.secuencia}')
+
+            en_curso = self.crear_tarea(colaboradores=hijos, recetas=hijos, con_hoja=True, linea=linea)
+            Tarea.objects.filter(id=en_curso.id).update(estado='en_curso', fecha_inicio=timezone.now())
+            EventoProceso.objects.create(
+                hoja_procesos=en_curso.hoja_procesos,
+                tipo_evento=TipoEvento.objects.first(),
+                hora_inicio=timezone.now()
+            )
+
+            tarea = self.crear_tarea(colaboradores=hijos, recetas=hijos, con_hoja=True, linea=linea)
+            self.crear_eventos(tarea.hoja_procesos, hijos)
+            with self.captureOnCommitCallbacks(execute=True):
+                trazabilidad = Trazabilidad.objects.create(
+                    hoja_procesos=tarea.hoja_procesos,
+                    cantidad_producida=90,
+                    juliano=1,
+                    lote=f'{tarea.producto.codigo}-1-1',
+                    fecha_produccion=date.today()
+                )
+                for receta in tarea.producto.recetas.all():
+                    mp_usada = TrazabilidadMateriaPrima.objects.create(
+                        trazabilidad=trazabilidad,
+                        materia_prima=receta.materia_prima,
+                        lote='L1',
+                        cantidad_usada='5.00'
+                    )
+                    Merma.objects.create(trazabilidad_materia_prima=mp_usada, cantidad='0.10')
+                    Reproceso.objects.create(trazabilidad_materia_prima=mp_usada, cantidad='0.20')
+                for asignacion in tarea.tarea_colaboradores.all():
+                    TrazabilidadColaborador.objects.create(
+                        trazabilidad=trazabilidad, colaborador=asignacion.colaborador
+                    )
+                FirmaTrazabilidad.objects.create(
+                    trazabilidad=trazabilidad, tipo_firma='supervisor', usuario=self.supervisor
+                )
+                FirmaTrazabilidad.objects.create(
+                    trazabilidad=trazabilidad, tipo_firma='control_calidad', usuario=self.calidad
+                )
+
+    def rutas(self):
+        """Rutas a medir por basename del router, con ids de la última siembra"""
+        hoy = date.today()
+        tarea = Tarea.objects.filter(hoja_procesos__trazabilidad__isnull=False).latest('id')
+        hoja = tarea.hoja_procesos
+        trazabilidad = hoja.trazabilidad
+        evento = hoja.eventos.first()
+        return {
+            'usuario': ['/api/usuarios/', f'/api/usuarios/{self.supervisor.id}/', '/api/usuarios/me/'],
+            'linea': ['/api/lineas/', f'/api/lineas/{tarea.linea_id}/'],
+            'turno': ['/api/turnos/', f'/api/turnos/{self.turno.id}/'],
+            'colaborador': ['/api/colaboradores/', f'/api/colaboradores/{tarea.tarea_colaboradores.first().colaborador_id}/'],
+            'producto': ['/api/productos/', f'/api/productos/{tarea.producto_id}/'],
+            'tarea': [
+                '/api/tareas/',
+                f'/api/tareas/{tarea.id}/',
+                '/api/tareas/hoy/',
+                f'/api/tareas/por_linea_turno/?linea={tarea.linea_id}&turno={self.turno.id}&fecha={hoy}',
+                f'/api/tareas/{tarea.id}/verificar_bloqueo/',
+            ],
+            'maquina': ['/api/maquinas/', f'/api/maquinas/{Maquina.objects.first().id}/'],
+            'tipo-evento': ['/api/tipos-eventos/', f'/api/tipos-eventos/{evento.tipo_evento_id}/'],
+            'hoja-procesos': [
+                '/api/hojas-procesos/',
+                f'/api/hojas-procesos/{hoja.id}/',
+                f'/api/hojas-procesos/por_tarea/?tarea_id={tarea.id}',
+            ],
+            'evento-proceso': ['/api/eventos-proceso/', f'/api/eventos-proceso/{evento.id}/'],
+            'trazabilidad': [
+                '/api/trazabilidades/',
+                f'/api/trazabilidades/{trazabilidad.id}/',
+                f'/api/trazabilidades/por_fecha_turno/?fecha={hoy}&turno={self.turno.id}',
+                '/api/trazabilidades/exportar/?formato=csv',
+            ],
+            'materiaprima': ['/api/materias-primas/', f'/api/materias-primas/{trazabilidad.materias_primas_usadas.first().materia_prima.codigo}/'],
+            'firma-trazabilidad': ['/api/firmas-trazabilidad/', f'/api/firmas-trazabilidad/{trazabilidad.firmas.first().id}/'],
+            'resumen-diario': [
+                '/api/resumenes-diarios/',
+                f'/api/resumenes-diarios/{ResumenProduccionDiario.objects.first().id}/',
+                '/api/resumenes-diarios/totales/',
+            ],
+        }
+
+    def contar_consultas(self, rutas):
+        conteos = {}
+        for ruta in rutas:
+            with CaptureQueriesContext(connection) as consultas:
+                respuesta = self.client.get(ruta)
+                if respuesta.streaming:
+                    b''.join(respuesta.streaming_content)
+            self.assertEqual(respuesta.status_code, 200, ruta)
+            conteos[ruta] = len(consultas)
+        return conteos
+
+    def test_todos_los_basenames_del_router_estan_cubiertos(self):
+        from .urls import router
+
+        self.sembrar(1)
+        registrados = {basename for _, _, basename in router.registry}
+        self.assertEqual(registrados - set(self.rutas()), set())
+
+    def test_consultas_no_dependen_de_la_cantidad_de_filas(self):
+        self.sembrar(self.N)
+        rutas_n = [ruta for grupo in self.rutas().values() for ruta in grupo]
+        # La primera vuelta calienta cachés de proceso (catálogo, ContentType...)
+        self.contar_consultas(rutas_n)
+        con_n = self.contar_consultas(rutas_n)
+
+        # La segunda siembra trae más hijos por fila; los detalles apuntan a ella
+        self.sembrar(self.N, hijos=4)
+        rutas_2n = [ruta for grupo in self.rutas().values() for ruta in grupo]
+        con_2n = self.contar_consultas(rutas_2n)
+
+        distintas = {
+            ruta_2n: (con_n[ruta_n], con_2n[ruta_2n])
+            for ruta_n, ruta_2n in zip(rutas_n, rutas_2n)
+            if con_n[ruta_n] != con_2n[ruta_2n]
+        }
+        self.assertEqual(distintas, {}, 'Consultas que crecen con las filas (N, 2N)')
@@ -0,0 +1,186 @@
+import asyncio
+import itertools
+import json
+import select
+import threading
+import time
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, connections
+
+
+# Canal de Postgres usado con TIEMPO_REAL_BACKEND = 'postgres'
+CANAL_POSTGRES = 'produccion_tiempo_real'
+
+# Eventos en espera por cliente; si un cliente no alcanza a leerlos se descartan
+MAX_EVENTOS_PENDIENTES = 100
+
+# Segundos entre comentarios de keep-alive en el stream
+SEGUNDOS_HEARTBEAT = 15
+
+# Duración máxima de una conexión SSE. El cliente (EventSource) reconecta
+# solo; así se liberan las suscripciones de clientes que se fueron sin avisar
+SEGUNDOS_MAXIMOS_CONEXION = 300
+
+
+def usa_postgres():
+    return getattr(settings, 'TIEMPO_REAL_BACKEND', 'local') == 'postgres'
+
+
+# ============================================================================
+# BROKER EN PROCESO
+# ============================================================================
+class Suscripcion:
+    """Cola de eventos de un cliente conectado, atada a su event loop"""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.cola = asyncio.Queue(maxsize=MAX_EVENTOS_PENDIENTES)
+
+    def entregar(self, evento):
+        """Encola un evento desde cualquier hilo"""
+        try:
+            self.loop.call_soon_threadsafe(self._encolar, evento)
+        except RuntimeError:
+            # El loop del cliente ya se cerró
+            pass
+
+    def _encolar(self, evento):
+        try:
+            self.cola.put_nowait(evento)
+        except asyncio.QueueFull:
+            pass
+
+
+class Broker:
+    """Reparte cada evento publicado a todas las suscripciones del proceso"""
+
+    def __init__(self):
+        self._suscripciones = set()
+        self._bloqueo = threading.Lock()
+        self._secuencia = itertools.count(1)
+
+    def suscribir(self, loop=None):
+        suscripcion = Suscripcion(loop or asyncio.get_running_loop())
+        with self._bloqueo:
+            self._suscripciones.add(suscripcion)
+        if usa_postgres():
+            iniciar_escucha_postgres()
+        return suscripcion
+
+    def desuscribir(self, suscripcion):
+        with self._bloqueo:
+            self._suscripciones.discard(suscripcion)
+
+    def difundir(self, evento):
+        evento = {**evento, 'secuencia': next(self._secuencia)}
+        with self._bloqueo:
+            suscripciones = list(self._suscripciones)
+        for suscripcion in suscripciones:
+            suscripcion.entregar(evento)
+
+    @property
+    def total_suscripciones(self):
+        with self._bloqueo:
+            return len(self._suscripciones)
+
+
+broker = Broker()
+
+
+def publicar(tipo, datos):
+    """
+    Publica un cambio para los clientes conectados. Con el backend 'postgres'
+    pasa por NOTIFY, así lo reciben los clientes de todos los workers.
+    """
+    evento = {'tipo': tipo, 'datos': datos}
+
+    if usa_postgres():
+        payload = json.dumps(evento, cls=DjangoJSONEncoder)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [CANAL_POSTGRES, payload])
+    else:
+        broker.difundir(evento)
+
+
+# ============================================================================
+# BACKEND POSTGRES (LISTEN/NOTIFY)
+# ============================================================================
+_escucha_iniciada = threading.Event()
+
+
+def iniciar_escucha_postgres():
+    """Inicia (una vez por proceso) el hilo que escucha el canal de Postgres"""
+    if _escucha_iniciada.is_set():
+        return
+    _escucha_iniciada.set()
+    threading.Thread(target=_escuchar_postgres, name='tiempo-real-listen', daemon=True).start()
+
+
+def _escuchar_postgres():
+    import psycopg2
+    import psycopg2.extensions
+
+    while True:
+        conexion = None
+        try:
+            parametros = connections['default'].get_connection_params()
+            conexion = psycopg2.connect(**parametros)
+            conexion.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            with conexion.cursor() as cursor:
+                cursor.execute(f'LISTEN {CANAL_POSTGRES}')
+
+            while True:
+                if select.select([conexion], [], [], SEGUNDOS_HEARTBEAT) == ([], [], []):
+                    continue
+                conexion.poll()
+                while conexion.notifies:
+                    notificacion = conexion.notifies.pop(0)
+                    broker.difundir(json.loads(notificacion.payload))
+        except Exception:
+            # Base caída o conexión cortada: reintentar
+            if conexion is not None:
+                conexion.close()
+            time.sleep(5)
+
+
+# ============================================================================
+# STREAM SSE
+# ============================================================================
+def formatear_evento(evento):
+    """Un evento en formato text/event-stream"""
+    data = json.dumps(evento['datos'], cls=DjangoJSONEncoder)
+    return f"id: {evento['secuencia']}\nevent: {evento['tipo']}\ndata: {data}\n\n"
+
+
+def coincide(evento, filtros):
+    """Aplica los filtros del cliente (linea, hoja_procesos) a un evento"""
+    datos = evento['datos']
+    return all(
+        str(datos.get(campo)) == valor
+        for campo, valor in filtros.items()
+    )
+
+
+async def stream_eventos(filtros):
+    """
+    Generador del stream SSE de un cliente: eventos filtrados, heartbeats
+    cada SEGUNDOS_HEARTBEAT y cierre tras SEGUNDOS_MAXIMOS_CONEXION.
+    """
+    suscripcion = broker.suscribir()
+    limite = time.monotonic() + SEGUNDOS_MAXIMOS_CONEXION
+
+    try:
+        yield 'retry: 3000\n\n'
+        while time.monotonic() < limite:
+            try:
+                evento = await asyncio.wait_for(suscripcion.cola.get(), SEGUNDOS_HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield ': ping\n\n'
+                continue
+
+            if coincide(evento, filtros):
+                yield formatear_evento(evento)
+    finally:
+        broker.desuscribir(suscripcion)
@@ -16,6 +16,14 @@ from .views import (
     TrazabilidadViewSet,
     FirmaTrazabilidadViewSet,
     MateriaPrimaViewSet,
+    CatalogoView,
+    eventos_tiempo_real,
+    SincronizacionView,
+    OeeView,
+    MermasView,
+    RecallLoteView,
+    InsumosLoteView,
+    ResumenProduccionDiarioViewSet,
 )
 
 # Router para los ViewSets
@@ -33,12 +41,30 @@ router.register(r'eventos-proceso', EventoProcesoViewSet, basename='evento-proce
 router.register(r'trazabilidades', TrazabilidadViewSet, basename='trazabilidad')
 router.register(r'materias-primas', MateriaPrimaViewSet, basename='materiaprima')
 router.register(r'firmas-trazabilidad', FirmaTrazabilidadViewSet, basename='firma-trazabilidad')
+router.register(r'resumenes-diarios', ResumenProduccionDiarioViewSet, basename='resumen-diario')
 
 urlpatterns = [
     # Autenticación JWT
     path('auth/login/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('auth/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     
+    # Catálogos para tablets (con ETag)
+    path('catalogo/', CatalogoView.as_view(), name='catalogo'),
+    
+    # Cambios en tiempo real (SSE, requiere ASGI)
+    path('tiempo-real/', eventos_tiempo_real, name='tiempo-real'),
+    
+    # Lotes de operaciones hechas sin conexión
+    path('sync/', SincronizacionView.as_view(), name='sync'),
+    
+    # Analítica
+    path('analytics/oee/', OeeView.as_view(), name='analytics-oee'),
+    path('analytics/mermas/', MermasView.as_view(), name='analytics-mermas'),
+    
+    # Recall: lote de materia prima -> lotes terminados, y al revés
+    path('recall/', RecallLoteView.as_view(), name='recall'),
+    path('recall/insumos/', InsumosLoteView.as_view(), name='recall-insumos'),
+    
     # Endpoints de la API
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -5,13 +5,26 @@ from django.shortcuts import render
 from rest_framework import viewsets, status, filters, serializers
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Q
+from rest_framework.views import APIView
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from django.db.models import Prefetch, Sum
 from django.core.exceptions import ValidationError
-from datetime import date, datetime
-import openpyxl
+from datetime import date, datetime, timedelta
+from django.conf import settings
 from django.db import transaction
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+from django.utils.cache import patch_cache_control
+from django.utils.crypto import constant_time_compare
+from django.utils.http import parse_etags
+from django.views.decorators.http import require_GET
+from asgiref.sync import sync_to_async
+import csv
 import json
+import logging
 
 from .models import (
     Usuario, Linea, Turno, Colaborador,
@@ -20,11 +33,12 @@ from .models import (
     Maquina, TipoEvento,
     HojaProcesos, EventoProceso, EventoMaquina,
     Trazabilidad, TrazabilidadMateriaPrima,
-    Reproceso, Merma, FirmaTrazabilidad, TrazabilidadColaborador, 
+    Reproceso, Merma, FirmaTrazabilidad, TrazabilidadColaborador,
+    ImportacionColaboradores, TareaEnCursoError, ResumenProduccionDiario,
 )
 from .serializers import (
     UsuarioSerializer, LineaSerializer, TurnoSerializer,
-    ColaboradorSerializer, ColaboradorCreateSerializer,
+    ColaboradorSerializer, ColaboradorCreateSerializer, ImportacionColaboradoresSerializer,
     ProductoSerializer, ProductoConRecetaSerializer,
     MateriaPrimaSerializer, RecetaSerializer,
     TareaListSerializer, TareaDetailSerializer, TareaCreateUpdateSerializer,
@@ -32,10 +46,81 @@ from .serializers import (
     HojaProcesosListSerializer, HojaProcesosDetailSerializer,
     EventoProcesoListSerializer, EventoProcesoCreateUpdateSerializer,
     TrazabilidadListSerializer, TrazabilidadDetailSerializer, TrazabilidadCreateUpdateSerializer,
-    FirmaTrazabilidadSerializer
+    FirmaTrazabilidadSerializer, LoteSincronizacionSerializer,
+    ResumenProduccionDiarioSerializer,
 
 )
 from .permissions import IsSupervisor, IsSupervisorOrReadOnly, AllowAnyAccess
+from .importacion import lanzar_worker_en_segundo_plano
+from .pagination import PaginacionProduccion
+from .catalogo import obtener_catalogo
+from .tiempo_real import stream_eventos
+from .sincronizacion import sincronizar
+from .analitica import resumen_oee, resumen_mermas, AGRUPACIONES_MERMAS
+from .exportacion import exportar_csv, exportar_xlsx
+from .busqueda import BusquedaFilter
+from .registro import registrar_payload
+from .metricas import generar_metricas
+
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================================================
+# PREFETCH: datos que leen los serializers de detalle
+# ============================================================================
+def prefetch_recetas_activas(ruta='recetas'):
+    """
+    Recetas activas, ordenadas y con su materia prima, tal como las lee
+    ProductoConRecetaSerializer.get_materias_primas
+    """
+    return Prefetch(
+        ruta,
+        queryset=Receta.objects.filter(activo=True).select_related('materia_prima').order_by('orden')
+    )
+
+
+def prefetch_maquinas_evento(ruta='evento_maquinas'):
+    """Máquinas de cada evento en una sola consulta (EventoProcesoListSerializer)"""
+    return Prefetch(
+        ruta,
+        queryset=EventoMaquina.objects.select_related('maquina')
+    )
+
+
+def con_detalle_tarea(queryset, prefijo=''):
+    """
+    Agrega al queryset todo lo que TareaDetailSerializer necesita, para que
+    serializar no haga consultas por fila. `prefijo` permite aplicarlo desde
+    otro modelo (ej: 'tarea__' para HojaProcesos).
+    """
+    return queryset.select_related(
+        f'{prefijo}linea',
+        f'{prefijo}turno',
+        f'{prefijo}producto',
+        f'{prefijo}supervisor_asignador'
+    ).prefetch_related(
+        Prefetch(
+            f'{prefijo}tarea_colaboradores',
+            queryset=TareaColaborador.objects.select_related('colaborador').order_by('colaborador__codigo')
+        ),
+        prefetch_recetas_activas(f'{prefijo}producto__recetas')
+    )
+
+
+def hojas_procesos_detalle():
+    """Queryset de HojaProcesos listo para HojaProcesosDetailSerializer"""
+    return con_detalle_tarea(
+        HojaProcesos.objects.select_related('trazabilidad'),
+        prefijo='tarea__'
+    ).prefetch_related(
+        Prefetch(
+            'eventos',
+            queryset=EventoProceso.objects.select_related('tipo_evento').prefetch_related(
+                prefetch_maquinas_evento()
+            )
+        )
+    )
 
 
 # ============================================================================
@@ -66,7 +151,7 @@ class LineaViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = LineaSerializer
     permission_classes = [AllowAnyAccess]
     queryset = Linea.objects.filter(activa=True).order_by('nombre')
-    filter_backends = [filters.SearchFilter]
+    filter_backends = [BusquedaFilter]
     search_fields = ['nombre']
 
 
@@ -86,7 +171,7 @@ class ColaboradorViewSet(viewsets.ModelViewSet):
     serializer_class = ColaboradorSerializer
     permission_classes = [AllowAnyAccess]
     queryset = Colaborador.objects.filter(activo=True).order_by('codigo')
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [filters.OrderingFilter, BusquedaFilter]
     search_fields = ['codigo', 'nombre', 'apellido']
     ordering_fields = ['codigo', 'nombre', 'apellido']
     
@@ -100,9 +185,10 @@ class ColaboradorViewSet(viewsets.ModelViewSet):
             return Response({
                 'success': True,
                 'message': 'Colaboradores cargados exitosamente',
-                'creados': len(resultado['creados']),
-                'actualizados': len(resultado['actualizados']),
-                'total': len(resultado['creados']) + len(resultado['actualizados'])
+                'creados': resultado['creados'],
+                'actualizados': resultado['actualizados'],
+                'desactivados': resultado['desactivados'],
+                'total': resultado['creados'] + resultado['actualizados']
             }, status=status.HTTP_201_CREATED)
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -124,51 +210,53 @@ class ColaboradorViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        try:
-            # Leer el archivo Excel
-            workbook = openpyxl.load_workbook(archivo)
-            sheet = workbook.active
-            
-            colaboradores_data = []
-            
-            # Leer desde la fila 2 (asumiendo que la fila 1 tiene headers)
-            for row in sheet.iter_rows(min_row=2, values_only=True):
-                if row[0]:  # Si hay código
-                    colaboradores_data.append({
-                        'codigo': str(row[0]).strip(),
-                        'nombre': str(row[1]).strip() if row[1] else '',
-                        'apellido': str(row[2]).strip() if row[2] else ''
-                    })
-            
-            if not colaboradores_data:
-                return Response(
-                    {'error': 'El archivo no contiene datos válidos'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            # Usar el serializer para crear/actualizar
-            serializer = ColaboradorCreateSerializer(
-                data={'colaboradores': colaboradores_data}
+        if archivo.size > settings.MAX_EXCEL_SIZE:
+            return Response(
+                {'error': f'El archivo supera el tamaño máximo de {settings.MAX_EXCEL_SIZE // (1024 * 1024)} MB'},
+                status=status.HTTP_400_BAD_REQUEST
             )
-            
-            if serializer.is_valid():
-                resultado = serializer.save()
-                
-                return Response({
-                    'success': True,
-                    'message': 'Colaboradores cargados exitosamente desde Excel',
-                    'creados': len(resultado['creados']),
-                    'actualizados': len(resultado['actualizados']),
-                    'total': len(resultado['creados']) + len(resultado['actualizados'])
-                }, status=status.HTTP_201_CREATED)
-            
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
-        except Exception as e:
+        desactivar = str(request.data.get('desactivar_ausentes', '')).lower() in ['true', '1']
+        
+        # Encolar la importación; el worker la procesa por bloques
+        importacion = ImportacionColaboradores.objects.create(
+            archivo=archivo,
+            usuario=request.user,
+            desactivar_ausentes=desactivar
+        )
+        transaction.on_commit(lanzar_worker_en_segundo_plano)
+        
+        return Response({
+            'success': True,
+            'message': 'Archivo recibido, la importación se está procesando',
+            'importacion': ImportacionColaboradoresSerializer(importacion).data,
+            'url_progreso': reverse(
+                'colaborador-importacion',
+                kwargs={'importacion_id': importacion.id},
+                request=request
+            )
+        }, status=status.HTTP_202_ACCEPTED)
+    
+    @action(
+        detail=False,
+        methods=['get'],
+        url_path=r'importaciones/(?P<importacion_id>[0-9]+)',
+        permission_classes=[IsAuthenticated, IsSupervisor]
+    )
+    def importacion(self, request, importacion_id=None):
+        """
+        Endpoint: GET /api/colaboradores/importaciones/<id>/
+        Avance y errores por fila de una importación de Excel.
+        """
+        try:
+            importacion = ImportacionColaboradores.objects.get(id=importacion_id)
+        except ImportacionColaboradores.DoesNotExist:
             return Response(
-                {'error': f'Error al procesar el archivo: {str(e)}'},
-                status=status.HTTP_400_BAD_REQUEST
+                {'error': 'La importación no existe'},
+                status=status.HTTP_404_NOT_FOUND
             )
+        
+        return Response(ImportacionColaboradoresSerializer(importacion).data)
 
 
 # ============================================================================
@@ -177,10 +265,16 @@ class ColaboradorViewSet(viewsets.ModelViewSet):
 class ProductoViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [AllowAnyAccess]
     queryset = Producto.objects.filter(activo=True).order_by('codigo')
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [filters.OrderingFilter, BusquedaFilter]
     search_fields = ['codigo', 'nombre']
     ordering_fields = ['codigo', 'nombre']
     
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'retrieve':
+            queryset = queryset.prefetch_related(prefetch_recetas_activas())
+        return queryset
+    
     def get_serializer_class(self):
         """Retorna serializer con receta para detalle"""
         if self.action == 'retrieve':
@@ -191,11 +285,27 @@ class ProductoViewSet(viewsets.ReadOnlyModelViewSet):
 # ============================================================================
 # VIEWSET: Tareas
 # ============================================================================
+def resumen_tarea_en_curso(tarea):
+    """Datos de la tarea que bloquea una línea (None si ya no existe)"""
+    if tarea is None:
+        return None
+    return {
+        'id': tarea.id,
+        'producto': tarea.producto.nombre,
+        'fecha_inicio': tarea.fecha_inicio
+    }
+
+
 class TareaViewSet(viewsets.ModelViewSet):
     permission_classes = [AllowAnyAccess]
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [filters.OrderingFilter, BusquedaFilter]
     search_fields = ['producto__codigo', 'producto__nombre', 'observaciones']
     ordering_fields = ['fecha', 'estado']
+    pagination_class = PaginacionProduccion
+    ordering = ('-fecha', 'turno', 'linea', 'id')
+    # El cursor se posiciona por el primer campo: `fecha` la comparten todas
+    # las tareas del día, el id no
+    ordering_cursor = ('-id',)
     
     def get_queryset(self):
         """
@@ -203,7 +313,11 @@ class TareaViewSet(viewsets.ModelViewSet):
         """
         queryset = Tarea.objects.select_related(
             'linea', 'turno', 'producto', 'supervisor_asignador'
-        ).prefetch_related('tarea_colaboradores__colaborador')
+        )
+        
+        # Los listados usan TareaListSerializer, que no lee colaboradores ni receta
+        if self.action not in ['list', 'hoy', 'por_linea_turno']:
+            queryset = con_detalle_tarea(queryset)
         
         # Filtros opcionales
         fecha = self.request.query_params.get('fecha', None)
@@ -278,6 +392,14 @@ class TareaViewSet(viewsets.ModelViewSet):
                 'message': 'Tarea iniciada correctamente',
                 'tarea': serializer.data
             })
+        except TareaEnCursoError as e:
+            return Response(
+                {
+                    'error': e.message,
+                    'tarea_en_curso': resumen_tarea_en_curso(e.tarea_en_curso)
+                },
+                status=status.HTTP_409_CONFLICT
+            )
         except Exception as e:
             return Response(
                 {'error': str(e)},
@@ -307,20 +429,13 @@ class TareaViewSet(viewsets.ModelViewSet):
         tarea = self.get_object()
         
         # Verificar si hay otra tarea en curso en la misma línea
-        tarea_en_curso = Tarea.objects.filter(
-            linea=tarea.linea,
-            estado='en_curso'
-        ).exclude(pk=tarea.pk).first()
+        tarea_en_curso = tarea.tarea_en_curso_de_linea()
         
         if tarea_en_curso:
             return Response({
                 'bloqueada': True,
                 'motivo': 'Ya hay una tarea en curso en esta línea',
-                'tarea_en_curso': {
-                    'id': tarea_en_curso.id,
-                    'producto': tarea_en_curso.producto.nombre,
-                    'fecha_inicio': tarea_en_curso.fecha_inicio
-                }
+                'tarea_en_curso': resumen_tarea_en_curso(tarea_en_curso)
             })
         
         if tarea.estado != 'pendiente':
@@ -354,7 +469,7 @@ class MaquinaViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = MaquinaSerializer
     permission_classes = [AllowAnyAccess]
     queryset = Maquina.objects.filter(activa=True).order_by('nombre')
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [filters.OrderingFilter, BusquedaFilter]
     search_fields = ['codigo', 'nombre']
     ordering_fields = ['codigo', 'nombre']
 
@@ -366,25 +481,482 @@ class TipoEventoViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = TipoEventoSerializer
     permission_classes = [AllowAnyAccess]
     queryset = TipoEvento.objects.filter(activo=True).order_by('orden')
-    filter_backends = [filters.SearchFilter]
+    filter_backends = [BusquedaFilter]
     search_fields = ['nombre', 'codigo']
 
 
+# ============================================================================
+# VISTA: Catálogo completo para tablets
+# ============================================================================
+def etag_coincide(etag, if_none_match):
+    """
+    Comparación débil de If-None-Match, como django.utils.cache: la cabecera
+    puede traer '*' o una lista de ETags, fuertes o débiles (W/).
+    """
+    etags = parse_etags(if_none_match)
+    if etags == ['*']:
+        return True
+    return etag.removeprefix('W/') in {candidato.removeprefix('W/') for candidato in etags}
+
+
+class CatalogoView(APIView):
+    """
+    Líneas, turnos, productos, materias primas, máquinas y tipos de eventos
+    en una sola respuesta, servida desde caché en memoria.
+
+    GET /api/catalogo/
+    Responde 304 si el header If-None-Match coincide con la versión actual.
+    """
+    permission_classes = [AllowAnyAccess]
+    # Catálogo público: sin autenticación se evita la consulta del usuario JWT
+    authentication_classes = []
+    
+    def get(self, request):
+        contenido, etag = obtener_catalogo()
+        
+        if etag_coincide(etag, request.headers.get('If-None-Match', '')):
+            respuesta = HttpResponseNotModified()
+        else:
+            respuesta = HttpResponse(contenido, content_type='application/json')
+        
+        respuesta['ETag'] = etag
+        patch_cache_control(respuesta, no_cache=True)
+        return respuesta
+
+
+# ============================================================================
+# VISTA: Cambios en tiempo real (Server-Sent Events)
+# ============================================================================
+def usuario_jwt(request):
+    """
+    Usuario del access token JWT, como en las vistas REST. Además de la
+    cabecera Authorization acepta ?token=, porque EventSource del navegador
+    no permite enviar cabeceras. Retorna None si falta o no es válido.
+    """
+    autenticacion = JWTAuthentication()
+    cabecera = autenticacion.get_header(request)
+    token = autenticacion.get_raw_token(cabecera) if cabecera else request.GET.get('token')
+    if not token:
+        return None
+    try:
+        return autenticacion.get_user(autenticacion.get_validated_token(token))
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
+
+async def eventos_tiempo_real(request):
+    """
+    Stream text/event-stream con los cambios de tareas, eventos de proceso,
+    trazabilidades y firmas. Requiere servir la app por ASGI (backprod/asgi.py)
+    y un access token JWT (cabecera Authorization o ?token=).
+
+    GET /api/tiempo-real/?linea=<id>&hoja_procesos=<id>  (filtros opcionales)
+    """
+    if await sync_to_async(usuario_jwt)(request) is None:
+        return JsonResponse(
+            {'detail': 'Se requiere un token de acceso válido'},
+            status=status.HTTP_401_UNAUTHORIZED
+        )
+
+    filtros = {
+        campo: request.GET[campo]
+        for campo in ['linea', 'hoja_procesos']
+        if request.GET.get(campo)
+    }
+
+    respuesta = StreamingHttpResponse(stream_eventos(filtros), content_type='text/event-stream')
+    respuesta['Cache-Control'] = 'no-cache'
+    # Sin buffer en nginx, para que cada evento salga apenas se publica
+    respuesta['X-Accel-Buffering'] = 'no'
+    return respuesta
+
+
+# ============================================================================
+# VISTA: Métricas para Prometheus
+# ============================================================================
+@require_GET
+def metricas(request):
+    """
+    GET /metrics en el formato de texto de Prometheus: latencia y consultas
+    por vista, conexiones a la base e indicadores de planta (en caché).
+    Con METRICAS_TOKEN definido exige 'Authorization: Bearer <token>'.
+    """
+    token = getattr(settings, 'METRICAS_TOKEN', '')
+    if token and not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse(status=status.HTTP_401_UNAUTHORIZED)
+
+    return HttpResponse(generar_metricas(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+# ============================================================================
+# VISTA: Sincronización de tablets sin conexión
+# ============================================================================
+class SincronizacionView(APIView):
+    """
+    Aplica en una sola petición las operaciones que una tablet acumuló sin
+    conexión. Reenviar el mismo lote no duplica nada (clave de idempotencia).
+
+    POST /api/sync/
+    {
+        "operaciones": [
+            {"clave": "uuid-1", "tipo": "hoja_procesos", "accion": "crear",
+             "datos": {"tarea": 12}},
+            {"clave": "uuid-2", "tipo": "evento_proceso", "accion": "crear",
+             "datos": {"hoja_procesos": {"ref": "uuid-1"}, "tipo_evento": 3, ...}}
+        ]
+    }
+    """
+    permission_classes = [AllowAnyAccess]
+    
+    def post(self, request):
+        serializer = LoteSincronizacionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        resultados = sincronizar(
+            serializer.validated_data['operaciones'],
+            contexto={'request': request}
+        )
+        
+        return Response({
+            'aplicadas': sum(1 for r in resultados if r['estado'] == 'aplicada'),
+            'repetidas': sum(1 for r in resultados if r['estado'] == 'repetida'),
+            'conflictos': sum(1 for r in resultados if r['estado'] == 'conflicto'),
+            'resultados': resultados
+        })
+
+
+# ============================================================================
+# VISTA: Analítica OEE y paradas
+# ============================================================================
+def rango_fechas(request, dias_por_defecto=30):
+    """
+    Lee desde/hasta (YYYY-MM-DD) de la query. Por defecto, los últimos
+    `dias_por_defecto` días. Lanza ValueError si el rango es inválido.
+    """
+    hasta = request.query_params.get('hasta')
+    desde = request.query_params.get('desde')
+    
+    hasta = datetime.strptime(hasta, '%Y-%m-%d').date() if hasta else date.today()
+    desde = datetime.strptime(desde, '%Y-%m-%d').date() if desde else hasta - timedelta(days=dias_por_defecto)
+    
+    if desde > hasta:
+        raise ValueError('"desde" no puede ser posterior a "hasta"')
+    return desde, hasta
+
+
+def filtros_tarea(request):
+    """Filtros opcionales linea/turno/producto sobre Tarea"""
+    campos = {'linea': 'linea_id', 'turno': 'turno_id', 'producto': 'producto_id'}
+    return {
+        campo: request.query_params[parametro]
+        for parametro, campo in campos.items()
+        if request.query_params.get(parametro)
+    }
+
+
+class OeeView(APIView):
+    """
+    Disponibilidad, rendimiento y OEE por línea, turno y producto, más el
+    Pareto de paradas por tipo de evento, para un rango de fechas.
+    
+    GET /api/analytics/oee/?desde=YYYY-MM-DD&hasta=YYYY-MM-DD&linea=&turno=&producto=
+    """
+    permission_classes = [AllowAnyAccess]
+    
+    def get(self, request):
+        try:
+            desde, hasta = rango_fechas(request)
+        except ValueError as e:
+            return Response(
+                {'error': f'Rango de fechas inválido: {e}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return Response(resumen_oee(desde, hasta, filtros_tarea(request)))
+
+
+def respuesta_csv(filas, nombre_archivo):
+    """Lista de dicts como archivo CSV (columnas según la primera fila)"""
+    respuesta = HttpResponse(content_type='text/csv; charset=utf-8')
+    respuesta['Content-Disposition'] = f'attachment; filename="{nombre_archivo}"'
+    # BOM para que Excel reconozca los acentos
+    respuesta.write('\ufeff')
+    if filas:
+        escritor = csv.DictWriter(respuesta, fieldnames=list(filas[0]))
+        escritor.writeheader()
+        escritor.writerows(filas)
+    return respuesta
+
+
+class MermasView(APIView):
+    """
+    Totales y tasas de merma y reproceso (sobre la cantidad usada) agrupados
+    por causa, materia prima, producto, línea o semana.
+    
+    GET /api/analytics/mermas/?agrupar=causa&desde=YYYY-MM-DD&hasta=YYYY-MM-DD&linea=&turno=&producto=
+    Con &formato=csv se descarga como CSV.
+    """
+    permission_classes = [AllowAnyAccess]
+    
+    def get(self, request):
+        agrupacion = request.query_params.get('agrupar', 'causa')
+        if agrupacion not in AGRUPACIONES_MERMAS:
+            return Response(
+                {'error': f'"agrupar" debe ser uno de: {", ".join(AGRUPACIONES_MERMAS)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            desde, hasta = rango_fechas(request)
+        except ValueError as e:
+            return Response(
+                {'error': f'Rango de fechas inválido: {e}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        resultados = resumen_mermas(agrupacion, desde, hasta, filtros_tarea(request))
+        
+        if request.query_params.get('formato') == 'csv':
+            return respuesta_csv(resultados, f'mermas_por_{agrupacion}_{desde}_{hasta}.csv')
+        
+        return Response({
+            'desde': desde,
+            'hasta': hasta,
+            'agrupar': agrupacion,
+            'resultados': resultados,
+        })
+
+
+# ============================================================================
+# VISTAS: Recall y genealogía de lotes
+# ============================================================================
+class RecallLoteView(APIView):
+    """
+    Trazabilidades (lotes terminados) que usaron un lote de materia prima.
+    
+    GET /api/recall/?materia_prima=<codigo>&lote=<lote>
+    Con &prefijo=true busca los lotes que empiezan con <lote>.
+    """
+    permission_classes = [AllowAnyAccess]
+    
+    def get(self, request):
+        codigo = request.query_params.get('materia_prima')
+        lote = request.query_params.get('lote')
+        if not codigo or not lote:
+            return Response(
+                {'error': 'Se requieren "materia_prima" (código) y "lote"'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        prefijo = request.query_params.get('prefijo') in ('1', 'true', 'True')
+        filtro_lote = {'lote__startswith': lote} if prefijo else {'lote': lote}
+        
+        # Una consulta: lote de materia prima -> trazabilidad -> tarea
+        afectadas = list(
+            TrazabilidadMateriaPrima.objects
+            .filter(materia_prima__codigo=codigo, **filtro_lote)
+            .order_by('trazabilidad__fecha_produccion', 'trazabilidad_id')
+            .values(
+                'lote', 'cantidad_usada', 'unidad_medida',
+                'trazabilidad_id', 'trazabilidad__lote', 'trazabilidad__fecha_produccion',
+                'trazabilidad__estado', 'trazabilidad__cantidad_producida',
+                'trazabilidad__hoja_procesos__tarea__linea__nombre',
+                'trazabilidad__hoja_procesos__tarea__turno__nombre',
+                'trazabilidad__hoja_procesos__tarea__producto__codigo',
+                'trazabilidad__hoja_procesos__tarea__producto__nombre',
+            )
+        )
+        
+        estados = dict(Trazabilidad.ESTADOS)
+        return Response({
+            'materia_prima': codigo,
+            'lote': lote,
+            'prefijo': prefijo,
+            'total': len(afectadas),
+            'trazabilidades': [
+                {
+                    'id': fila['trazabilidad_id'],
+                    'lote': fila['trazabilidad__lote'],
+                    'fecha_produccion': fila['trazabilidad__fecha_produccion'],
+                    'linea': fila['trazabilidad__hoja_procesos__tarea__linea__nombre'],
+                    'turno': fila['trazabilidad__hoja_procesos__tarea__turno__nombre'],
+                    'producto_codigo': fila['trazabilidad__hoja_procesos__tarea__producto__codigo'],
+                    'producto_nombre': fila['trazabilidad__hoja_procesos__tarea__producto__nombre'],
+                    'cantidad_producida': fila['trazabilidad__cantidad_producida'],
+                    'estado': fila['trazabilidad__estado'],
+                    'estado_display': estados.get(fila['trazabilidad__estado']),
+                    'lote_materia_prima': fila['lote'],
+                    'cantidad_usada': fila['cantidad_usada'],
+                    'unidad_medida': fila['unidad_medida'],
+                }
+                for fila in afectadas
+            ],
+        })
+
+
+class InsumosLoteView(APIView):
+    """
+    Lotes de materia prima usados en un lote terminado. El lote (producto-
+    juliano-colaborador) se repite cada año, así que puede haber varias
+    trazabilidades; ?anio= deja sólo las de ese año.
+    
+    GET /api/recall/insumos/?lote=<lote terminado>&anio=YYYY
+    """
+    permission_classes = [AllowAnyAccess]
+    
+    def get(self, request):
+        lote = request.query_params.get('lote')
+        if not lote:
+            return Response(
+                {'error': 'Se requiere "lote"'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        trazabilidades = Trazabilidad.objects.filter(lote=lote).select_related(
+            'hoja_procesos__tarea__linea',
+            'hoja_procesos__tarea__turno',
+            'hoja_procesos__tarea__producto',
+        ).prefetch_related(
+            Prefetch(
+                'materias_primas_usadas',
+                queryset=TrazabilidadMateriaPrima.objects.select_related('materia_prima')
+            )
+        ).order_by('-fecha_produccion', '-id')
+        
+        anio = request.query_params.get('anio')
+        if anio:
+            try:
+                trazabilidades = trazabilidades.filter(fecha_produccion__year=int(anio))
+            except ValueError:
+                return Response(
+                    {'error': f'Año inválido: {anio}'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        
+        return Response({
+            'lote': lote,
+            'trazabilidades': [
+                {
+                    'id': trazabilidad.id,
+                    'fecha_produccion': trazabilidad.fecha_produccion,
+                    'linea': trazabilidad.hoja_procesos.tarea.linea.nombre,
+                    'turno': trazabilidad.hoja_procesos.tarea.turno.nombre,
+                    'producto_codigo': trazabilidad.hoja_procesos.tarea.producto.codigo,
+                    'producto_nombre': trazabilidad.hoja_procesos.tarea.producto.nombre,
+                    'cantidad_producida': trazabilidad.cantidad_producida,
+                    'estado': trazabilidad.estado,
+                    'estado_display': trazabilidad.get_estado_display(),
+                    'insumos': [
+                        {
+                            'materia_prima_codigo': mp_usada.materia_prima.codigo,
+                            'materia_prima_nombre': mp_usada.materia_prima.nombre,
+                            'lote': mp_usada.lote,
+                            'cantidad_usada': mp_usada.cantidad_usada,
+                            'unidad_medida': mp_usada.unidad_medida,
+                        }
+                        for mp_usada in trazabilidad.materias_primas_usadas.all()
+                    ],
+                }
+                for trazabilidad in trazabilidades
+            ],
+        })
+
+
+# ============================================================================
+# VIEWSET: Resumen de producción diario
+# ============================================================================
+class ResumenProduccionDiarioViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Totales precalculados por fecha, línea, turno y producto para dashboards.
+    
+    GET /api/resumenes-diarios/?desde=YYYY-MM-DD&hasta=YYYY-MM-DD&linea=&turno=&producto=
+    GET /api/resumenes-diarios/totales/?agrupar=fecha|linea|turno|producto
+    """
+    permission_classes = [AllowAnyAccess]
+    serializer_class = ResumenProduccionDiarioSerializer
+    pagination_class = PaginacionProduccion
+    ordering = ('-fecha', 'id')
+    # Mismo caso que las tareas: varias filas por fecha
+    ordering_cursor = ('-id',)
+    
+    # Campos sumables de ResumenProduccionDiario
+    CAMPOS_TOTALES = [
+        'trazabilidades', 'cantidad_producida', 'meta_produccion',
+        'materia_prima_kg', 'materia_prima_unidades',
+        'merma_kg', 'merma_unidades', 'reproceso_kg', 'reproceso_unidades',
+    ]
+    
+    # ?agrupar= -> campos de agrupación
+    AGRUPACIONES = {
+        'fecha': ['fecha'],
+        'linea': ['linea_id', 'linea__nombre'],
+        'turno': ['turno_id', 'turno__nombre'],
+        'producto': ['producto_id', 'producto__codigo', 'producto__nombre'],
+    }
+    
+    def get_queryset(self):
+        queryset = ResumenProduccionDiario.objects.select_related('linea', 'turno', 'producto')
+        if self.action == 'retrieve':
+            return queryset
+        
+        desde, hasta = rango_fechas(self.request)
+        return queryset.filter(fecha__range=(desde, hasta), **filtros_tarea(self.request))
+    
+    def list(self, request, *args, **kwargs):
+        try:
+            return super().list(request, *args, **kwargs)
+        except ValueError as e:
+            return Response(
+                {'error': f'Rango de fechas inválido: {e}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+    
+    @action(detail=False, methods=['get'])
+    def totales(self, request):
+        agrupar = request.query_params.get('agrupar')
+        if agrupar and agrupar not in self.AGRUPACIONES:
+            return Response(
+                {'error': f'"agrupar" debe ser uno de: {", ".join(self.AGRUPACIONES)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            queryset = self.get_queryset().select_related(None)
+        except ValueError as e:
+            return Response(
+                {'error': f'Rango de fechas inválido: {e}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        sumas = {campo: Sum(campo) for campo in self.CAMPOS_TOTALES}
+        if not agrupar:
+            return Response(queryset.aggregate(**sumas))
+        
+        campos = self.AGRUPACIONES[agrupar]
+        return Response(list(
+            queryset.values(*campos).annotate(**sumas).order_by(*campos)
+        ))
+
+
 # ============================================================================
 # VIEWSET: Hoja de Procesos
 # ============================================================================
 class HojaProcesosViewSet(viewsets.ModelViewSet):
     permission_classes = [AllowAnyAccess]
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [filters.OrderingFilter, BusquedaFilter]
     search_fields = ['tarea__producto__nombre', 'tarea__linea__nombre']
     ordering_fields = ['fecha_inicio', 'finalizada']
+    pagination_class = PaginacionProduccion
+    ordering = ('-fecha_inicio', '-id')
     
     def get_queryset(self):
-        queryset = HojaProcesos.objects.select_related(
-            'tarea__linea',
-            'tarea__turno',
-            'tarea__producto'
-        ).prefetch_related('eventos__tipo_evento')
+        if self.action == 'list':
+            queryset = HojaProcesos.objects.select_related(
+                'tarea__linea',
+                'tarea__producto'
+            )
+        else:
+            queryset = hojas_procesos_detalle()
         
         # Filtros opcionales
         finalizada = self.request.query_params.get('finalizada', None)
@@ -437,11 +1009,7 @@ class HojaProcesosViewSet(viewsets.ModelViewSet):
             )
         
         try:
-            hoja = HojaProcesos.objects.select_related(
-                'tarea__linea',
-                'tarea__turno',
-                'tarea__producto'
-            ).prefetch_related('eventos__tipo_evento').get(tarea_id=tarea_id)
+            hoja = hojas_procesos_detalle().get(tarea_id=tarea_id)
             
             serializer = HojaProcesosDetailSerializer(hoja)
             return Response(serializer.data)
@@ -464,7 +1032,7 @@ class EventoProcesoViewSet(viewsets.ModelViewSet):
         queryset = EventoProceso.objects.select_related(
             'hoja_procesos__tarea',
             'tipo_evento'
-        ).prefetch_related('evento_maquinas__maquina')
+        ).prefetch_related(prefetch_maquinas_evento())
         
         # Filtro por hoja de procesos
         hoja_id = self.request.query_params.get('hoja_procesos', None)
@@ -507,12 +1075,15 @@ class EventoProcesoViewSet(viewsets.ModelViewSet):
 # ============================================================================
 class TrazabilidadViewSet(viewsets.ModelViewSet):
     permission_classes = [AllowAnyAccess]
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [filters.OrderingFilter, BusquedaFilter]
     search_fields = [
+        'lote',
         'hoja_procesos__tarea__producto__nombre',
         'hoja_procesos__tarea__linea__nombre'
     ]
     ordering_fields = ['fecha_creacion', 'estado']
+    pagination_class = PaginacionProduccion
+    ordering = ('-fecha_creacion', '-id')
     
     def get_queryset(self):
         """
@@ -528,6 +1099,11 @@ class TrazabilidadViewSet(viewsets.ModelViewSet):
             'materias_primas_usadas__mermas',
             'firmas__usuario'
         )
+        if self.action != 'list':
+            # El detalle recorre los colaboradores reales y la foto de etiqueta
+            queryset = queryset.select_related('foto_etiqueta').prefetch_related(
+                'colaboradores_reales__colaborador'
+            )
         
         # Filtros opcionales
         estado = self.request.query_params.get('estado', None)
@@ -540,25 +1116,38 @@ class TrazabilidadViewSet(viewsets.ModelViewSet):
         if estado:
             queryset = queryset.filter(estado=estado)
         
-        if fecha:
+        # Fecha real de elaboración, guardada e indexada en la trazabilidad
+        filtros_fecha = {
+            'fecha_produccion': fecha,
+            'fecha_produccion__gte': self.request.query_params.get('fecha_desde', None),
+            'fecha_produccion__lte': self.request.query_params.get('fecha_hasta', None),
+        }
+        for campo, valor in filtros_fecha.items():
+            if not valor:
+                continue
             try:
-                fecha_obj = datetime.strptime(fecha, '%Y-%m-%d').date()
-                queryset = queryset.filter(
-                    hoja_procesos__tarea__fecha_inicio__date=fecha_obj
-                )
-                print(f'Filtrando por fecha_inicio (elaboración real): {fecha_obj}')
+                fecha_obj = datetime.strptime(valor, '%Y-%m-%d').date()
+                queryset = queryset.filter(**{campo: fecha_obj})
             except ValueError:
-                print(f'Fecha inválida: {fecha}')
+                logger.debug('Filtro de fecha inválido ignorado', extra={'campo': campo, 'valor': valor})
 
-        if juliano:
+        # Juliano y año van por la columna juliano + fecha_produccion (índice
+        # compuesto), no por el texto del lote. El año es el de elaboración,
+        # del que sale el juliano: un lote del 31/12 registrado el 1/1 sigue
+        # siendo del año anterior
+        filtros_juliano = {
+            'juliano': juliano,
+            'juliano__gte': self.request.query_params.get('juliano_desde', None),
+            'juliano__lte': self.request.query_params.get('juliano_hasta', None),
+            'fecha_produccion__year': self.request.query_params.get('anio', None),
+        }
+        for campo, valor in filtros_juliano.items():
+            if not valor:
+                continue
             try:
-                juliano_int = int(juliano)
-                queryset = queryset.filter(
-                    Q(lote__contains=f'-{juliano_int:03d}-')
-                )
-                print(f'Filtrando por juliano: {juliano_int:03d}')
+                queryset = queryset.filter(**{campo: int(valor)})
             except (ValueError, TypeError):
-                print(f'Juliano inválido: {juliano}')
+                logger.debug('Filtro numérico inválido ignorado', extra={'campo': campo, 'valor': valor})
         
         if turno_id:
             queryset = queryset.filter(hoja_procesos__tarea__turno_id=turno_id)
@@ -589,14 +1178,56 @@ class TrazabilidadViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        try:
+            fecha_obj = datetime.strptime(fecha, '%Y-%m-%d').date()
+        except ValueError:
+            return Response(
+                {'error': 'Formato de fecha inválido. Use YYYY-MM-DD'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
         trazabilidades = self.get_queryset().filter(
-            hoja_procesos__tarea__fecha=fecha,
+            fecha_produccion=fecha_obj,
             hoja_procesos__tarea__turno_id=turno_id
         )
         
         serializer = TrazabilidadListSerializer(trazabilidades, many=True)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['get'])
+    def exportar(self, request):
+        """
+        Exporta las trazabilidades filtradas (mismos filtros que el listado)
+        con colaboradores, firmas, materias primas, mermas y reprocesos: una
+        fila por materia prima usada. Sin paginación; memoria constante.
+        
+        GET /api/trazabilidades/exportar/?formato=csv|xlsx&fecha_desde=&fecha_hasta=&linea=...
+        """
+        formato = request.query_params.get('formato', 'csv')
+        if formato not in ('csv', 'xlsx'):
+            return Response(
+                {'error': '"formato" debe ser csv o xlsx'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        queryset = self.filter_queryset(self.get_queryset()).order_by('fecha_produccion', 'id')
+        nombre_archivo = f'trazabilidades_{date.today():%Y%m%d}.{formato}'
+        
+        if formato == 'xlsx':
+            return FileResponse(
+                exportar_xlsx(queryset),
+                as_attachment=True,
+                filename=nombre_archivo,
+                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            )
+        
+        respuesta = StreamingHttpResponse(
+            exportar_csv(queryset),
+            content_type='text/csv; charset=utf-8'
+        )
+        respuesta['Content-Disposition'] = f'attachment; filename="{nombre_archivo}"'
+        return respuesta
+    
     @action(detail=True, methods=['post'], permission_classes=[AllowAnyAccess])
     def cambiar_estado(self, request, pk=None):
         trazabilidad = self.get_object()
@@ -643,39 +1274,19 @@ class TrazabilidadViewSet(viewsets.ModelViewSet):
             )
         
     def create(self, request, *args, **kwargs):
-        for key, value in request.data.items():
-            if key == 'foto_etiquetas':
-                print(f'  {key}: <IMAGE FILE>')
-            elif isinstance(value, str) and len(value) > 100:
-                print(f'  {key}: {value[:100]}...')
-            else:
-                print(f'  {key}: {value}')
-        
-        for key, file in request.FILES.items():
-            print(f'  {key}: {file.name} ({file.size} bytes, {file.content_type})')
-        
-        # Intentar serializar
+        registrar_payload(logger, 'Trazabilidad recibida', request.data)
+        
         serializer = self.get_serializer(data=request.data)
-
-        try:
+        if not serializer.is_valid():
+            logger.info('Trazabilidad rechazada por validación', extra={'errores': serializer.errors})
+            # DRF arma la respuesta 400
             serializer.is_valid(raise_exception=True)
-        except Exception as e:
-            print(f'\n ERROR DE VALIDACIÓN:')
-            print(f'Tipo: {type(e).__name__}')
-            print(f'Mensaje: {str(e)}')
-            
-            if hasattr(e, 'detail'):
-                print(f'Detalle: {e.detail}')
-            
-            import traceback
-            traceback.print_exc()
-            
-            # Re-raise para que DRF maneje la respuesta
-            raise
         
-        # Si llegamos aquí, crear el objeto
-        print('\n Guardando...')
         self.perform_create(serializer)
+        logger.info('Trazabilidad creada', extra={
+            'trazabilidad': serializer.instance.id,
+            'lote': serializer.instance.lote,
+        })
         
         headers = self.get_success_headers(serializer.data)
 
@@ -788,83 +1399,35 @@ class TrazabilidadViewSet(viewsets.ModelViewSet):
         
     @action(detail=False, methods=['get'])
     def inspeccionar_modelo(self, request):
-        from .models import Trazabilidad
-        # Obtener una trazabilidad de ejemplo
-        trazabilidad = Trazabilidad.objects.first()
-        
-        if not trazabilidad:
-            return Response({'error': 'No hay trazabilidades en la BD'})
-
-        
-        for field in trazabilidad._meta.fields:
-            print(f'   - {field.name} ({field.__class__.__name__})')
-        
-        # Listar relaciones many-to-many
-        for field in trazabilidad._meta.many_to_many:
-            print(f'   - {field.name} ({field.__class__.__name__})')
-            print(f'     → Modelo relacionado: {field.related_model.__name__}')
-            if field.remote_field.through:
-                print(f'     → Modelo intermedio: {field.remote_field.through.__name__}')
-        
-        # Listar relaciones inversas (related objects)
-        for related in trazabilidad._meta.related_objects:
-            print(f'   - {related.name} ({related.__class__.__name__})')
-            print(f'     → Desde modelo: {related.related_model.__name__}')
-            print(f'     → Campo: {related.field.name}')
-        
-        # Intentar acceder a colaboradores de diferentes formas
-        
-        # Método 1: colaboradores_reales
-        if hasattr(trazabilidad, 'colaboradores_reales'):
-            print(f'      Tipo: {type(trazabilidad.colaboradores_reales)}')
-            print(f'      Clase: {trazabilidad.colaboradores_reales.__class__.__name__}')
-            print(f'      Atributos: {dir(trazabilidad.colaboradores_reales)[:10]}...')
-            
-            # Intentar obtener datos
-            try:
-                cols = trazabilidad.colaboradores_reales.all()
-                print(f' .all() retorna: {cols.count()} colaboradores')
-            except Exception as e:
-                print(f' .all() falló: {e}')
-        
-        # Método 2: trazabilidadcolaborador_set (relación inversa típica)
-        if hasattr(trazabilidad, 'trazabilidadcolaborador_set'):
-            try:
-                relaciones = trazabilidad.trazabilidadcolaborador_set.all()
-                print(f'      Count: {relaciones.count()}')
-                for rel in relaciones:
-                    print(f'   - {rel}')
-            except Exception as e:
-                print(f'   Error: {e}')
-        
-        # Método 3: colaborador_set
-        if hasattr(trazabilidad, 'colaborador_set'):
-            print(f'\n  Tiene atributo "colaborador_set"')
-            try:
-                cols = trazabilidad.colaborador_set.all()
-                print(f'  Count: {cols.count()}')
-            except Exception as e:
-                print(f'  Error: {e}')
-        
-        # Buscar todos los atributos que contengan "colabor"
-        for attr in dir(trazabilidad):
-            if 'colabor' in attr.lower():
-                print(f'   - {attr}')
-        return Response({'status': 'Ver terminal de Django para detalles'})
+        """Campos y relaciones de Trazabilidad, para depurar desde el cliente"""
+        meta = Trazabilidad._meta
+        return Response({
+            'campos': [
+                {'nombre': field.name, 'tipo': field.__class__.__name__}
+                for field in meta.fields
+            ],
+            'many_to_many': [
+                {
+                    'nombre': field.name,
+                    'modelo': field.related_model.__name__,
+                    'intermedio': field.remote_field.through.__name__,
+                }
+                for field in meta.many_to_many
+            ],
+            'relaciones_inversas': [
+                {
+                    'nombre': related.name,
+                    'modelo': related.related_model.__name__,
+                    'campo': related.field.name,
+                }
+                for related in meta.related_objects
+            ],
+        })
 
     def update(self, request, *args, **kwargs):
         partial = kwargs.pop('partial', False)
         instance = self.get_object()
-    
-        for key, value in request.data.items():
-            if isinstance(value, list):
-                print(f'  {key}: [{len(value)} elementos]')
-                if value:
-                    print(f'    Primer elemento: {value[0]}')
-            elif isinstance(value, str) and len(str(value)) > 100:
-                print(f'  {key}: {str(value)[:100]}...')
-            else:
-                print(f'  {key}: {value}')
+        registrar_payload(logger, 'Actualización de trazabilidad recibida', request.data)
         
         # Verificar que no esté firmada por supervisor
         if instance.firmas.filter(tipo_firma='supervisor').exists():
@@ -876,19 +1439,13 @@ class TrazabilidadViewSet(viewsets.ModelViewSet):
         # Usar el serializer para validar y actualizar
         serializer = self.get_serializer(instance, data=request.data, partial=partial)
         
-        # 🔍 VALIDACIÓN CON LOGGING DETALLADO
-        try:
+        if not serializer.is_valid():
+            logger.info('Actualización de trazabilidad rechazada por validación', extra={
+                'trazabilidad': instance.id,
+                'errores': serializer.errors,
+            })
+            # DRF arma la respuesta 400
             serializer.is_valid(raise_exception=True)
-        except Exception as e:
-            print('ERROR DE VALIDACIÓN EN SERIALIZER')
-            print(f'Tipo de error: {type(e).__name__}')
-            print(f'Mensaje: {str(e)}')
-            
-            if hasattr(serializer, 'errors'):
-                print('\n🔍 ERRORES DEL SERIALIZER:')
-                import json
-                print(json.dumps(serializer.errors, indent=2, default=str))
-            raise  # Re-lanzar para que DRF maneje la respuesta
         
         self.perform_update(serializer)
         
@@ -970,13 +1527,6 @@ class FirmaTrazabilidadViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_401_UNAUTHORIZED
             )
         
-        # LOGGING PARA DEBUGGING
-        print(f' Usuario firmando: {request.user}')
-        print(f'   - Username: {request.user.username}')
-        print(f'   - First name: {request.user.first_name}')
-        print(f'   - Last name: {request.user.last_name}')
-        print(f'   - Rol: {request.user.rol}')
-        
         # Determinar tipo de firma según el rol del usuario
         if request.user.rol == 'supervisor':
             tipo_firma = 'supervisor'
@@ -1038,15 +1588,15 @@ class FirmaTrazabilidadViewSet(viewsets.ModelViewSet):
             tipo_firma=tipo_firma
         )
         
-        print(f'✅ Firma creada:')
-        print(f'   - ID: {firma.id}')
-        print(f'   - Usuario: {firma.usuario}')
-        print(f'   - Tipo: {firma.tipo_firma}')
+        logger.info('Trazabilidad firmada', extra={
+            'firma': firma.id,
+            'trazabilidad': trazabilidad.id,
+            'usuario': request.user.username,
+            'tipo_firma': tipo_firma,
+        })
         
         # Serializar y retornar
         serializer = FirmaTrazabilidadSerializer(firma)
-
-        print(f'📦 Datos serializados: {serializer.data}')
         
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -1055,6 +1605,8 @@ class MateriaPrimaViewSet(viewsets.ModelViewSet):
     queryset = MateriaPrima.objects.filter(activo=True).order_by('nombre')
     serializer_class = MateriaPrimaSerializer
     lookup_field = 'codigo' 
+    filter_backends = [BusquedaFilter]
+    search_fields = ['codigo', 'nombre']
     
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
@@ -1063,21 +1615,9 @@ class MateriaPrimaViewSet(viewsets.ModelViewSet):
             permission_classes = [IsAuthenticated]
         return [permission() for permission in permission_classes]
     
-    def get_queryset(self):
-        queryset = self.queryset
-        
-        # Búsqueda por nombre o código
-        search = self.request.query_params.get('search', None)
-        if search:
-            queryset = queryset.filter(
-                Q(nombre__icontains=search) | 
-                Q(codigo__icontains=search)
-            )
-        
-        return queryset
-    
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
+        # Búsqueda por nombre o código (?search=), sin paginar
+        queryset = self.filter_queryset(self.get_queryset())
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
     
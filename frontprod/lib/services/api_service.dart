@@ -17,6 +17,10 @@ class ApiService {
 
   String? _token;
 
+  // Catálogo en memoria y su versión (ETag) para revalidar con 304
+  Map<String, dynamic>? _catalogo;
+  String? _catalogoEtag;
+
   /// Establece el token de autenticación
   void setToken(String token) {
     _token = token;
@@ -532,6 +536,12 @@ class ApiService {
       if (response.statusCode == 200) {
         final jsonResponse = json.decode(utf8.decode(response.bodyBytes));
         return jsonResponse;
+      } else if (response.statusCode == 409) {
+        // La línea ya tiene otra tarea en curso (no hace falta verificar antes)
+        final jsonResponse = json.decode(utf8.decode(response.bodyBytes));
+        final tareaEnCurso = jsonResponse['tarea_en_curso'];
+        final detalle = tareaEnCurso != null ? ': ${tareaEnCurso['producto']}' : '';
+        throw Exception('${jsonResponse['error']}$detalle');
       } else {
         _handleError(response);
         throw Exception('Error al iniciar tarea');
@@ -852,6 +862,102 @@ class ApiService {
     }
   }
 
+  /// Catálogo completo (líneas, turnos, productos, materias primas, máquinas
+  /// y tipos de eventos) en una sola petición. Si no cambió desde la última
+  /// consulta el servidor responde 304 y se reutiliza la copia en memoria.
+  Future<Map<String, dynamic>> getCatalogo() async {
+    try {
+      final headers = _getHeaders(needsAuth: false);
+      if (_catalogo != null && _catalogoEtag != null) {
+        headers['If-None-Match'] = _catalogoEtag!;
+      }
+
+      final response = await http.get(
+        Uri.parse('$baseUrl/catalogo/'),
+        headers: headers,
+      );
+
+      if (response.statusCode == 304 && _catalogo != null) {
+        return _catalogo!;
+      } else if (response.statusCode == 200) {
+        _catalogo = json.decode(utf8.decode(response.bodyBytes));
+        _catalogoEtag = response.headers['etag'];
+        return _catalogo!;
+      } else {
+        _handleError(response);
+        throw Exception('Error al obtener catálogo');
+      }
+    } catch (e) {
+      throw Exception('Error de conexión: $e');
+    }
+  }
+
+  /// Cambios en tiempo real (Server-Sent Events) de tareas, eventos de
+  /// proceso, trazabilidades y firmas. Cada elemento es
+  /// {'tipo': String, 'datos': Map}. El servidor cierra la conexión cada
+  /// pocos minutos: al terminar el stream hay que volver a llamar.
+  Stream<Map<String, dynamic>> escucharTiempoReal({
+    int? lineaId,
+    int? hojaProcesosId,
+  }) async* {
+    final params = <String, String>{
+      if (lineaId != null) 'linea': '$lineaId',
+      if (hojaProcesosId != null) 'hoja_procesos': '$hojaProcesosId',
+    };
+    final uri = Uri.parse('$baseUrl/tiempo-real/').replace(
+      queryParameters: params.isEmpty ? null : params,
+    );
+
+    final client = http.Client();
+    try {
+      final request = http.Request('GET', uri)
+        ..headers['Accept'] = 'text/event-stream';
+      final response = await client.send(request);
+
+      String tipo = 'message';
+      final datos = StringBuffer();
+      await for (final linea in response.stream
+          .transform(utf8.decoder)
+          .transform(const LineSplitter())) {
+        if (linea.isEmpty) {
+          if (datos.isNotEmpty) {
+            yield {'tipo': tipo, 'datos': json.decode(datos.toString())};
+          }
+          tipo = 'message';
+          datos.clear();
+        } else if (linea.startsWith('event:')) {
+          tipo = linea.substring(6).trim();
+        } else if (linea.startsWith('data:')) {
+          datos.write(linea.substring(5).trim());
+        }
+      }
+    } finally {
+      client.close();
+    }
+  }
+
+  /// Envía en una sola petición las operaciones acumuladas sin conexión.
+  /// Cada operación: {'clave': uuid, 'tipo', 'accion', 'datos'}; para usar un
+  /// objeto creado en otra operación: {'ref': clave}. Reenviar es seguro.
+  Future<Map<String, dynamic>> sincronizar(List<Map<String, dynamic>> operaciones) async {
+    try {
+      final response = await http.post(
+        Uri.parse('$baseUrl/sync/'),
+        headers: _getHeaders(),
+        body: json.encode({'operaciones': operaciones}),
+      );
+
+      if (response.statusCode == 200) {
+        return json.decode(utf8.decode(response.bodyBytes));
+      } else {
+        _handleError(response);
+        throw Exception('Error al sincronizar');
+      }
+    } catch (e) {
+      throw Exception('Error de conexión: $e');
+    }
+  }
+
   Future<List<dynamic>> getMateriasPrimas({String? search}) async {
     try {
       String url = '$baseUrl/materias-primas/';
@@ -982,6 +1088,50 @@ class ApiService {
     }
   }
 
+  // ========================================================================
+  // Historial de trazabilidades por páginas (paginación por cursor)
+  // ========================================================================
+  /// Retorna {'results': [...], 'next': url o null}. Para la página siguiente
+  /// pasar el 'next' recibido como [siguienteUrl].
+  Future<Map<String, dynamic>> getTrazabilidadesPagina({
+    Map<String, String>? queryParams,
+    String? siguienteUrl,
+    int tamanoPagina = 50,
+  }) async {
+    try {
+      String url = siguienteUrl ?? '';
+      if (url.isEmpty) {
+        final params = {
+          ...?queryParams,
+          'paginacion': 'cursor',
+          'page_size': '$tamanoPagina',
+        };
+        final queryString = params.entries
+            .map((e) => '${e.key}=${Uri.encodeComponent(e.value)}')
+            .join('&');
+        url = '$baseUrl/trazabilidades/?$queryString';
+      }
+
+      final response = await http.get(
+        Uri.parse(url),
+        headers: _getHeaders(),
+      );
+
+      if (response.statusCode == 200) {
+        final jsonResponse = json.decode(utf8.decode(response.bodyBytes));
+        return {
+          'results': jsonResponse['results'],
+          'next': jsonResponse['next'],
+        };
+      } else {
+        _handleError(response);
+        throw Exception('Error al obtener trazabilidades');
+      }
+    } catch (e) {
+      throw Exception('Error de conexión: $e');
+    }
+  }
+
   // ========================================================================
   // Actualizar trazabilidad
   // ========================================================================